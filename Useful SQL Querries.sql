@@ -22,9 +22,10 @@ SELECT agent_name, COUNT(*) AS memory_count
 FROM agent_memory
 GROUP BY agent_name;
 
-Search Memories by Keyword
-SELECT id, agent_name, memory_text, timestamp
+Search Memories by Keyword (uses the ft_qa FULLTEXT index; the LIKE '%spaceship%' form scans the whole table)
+SELECT id, agent_name, question, answer, timestamp
 FROM agent_memory
-WHERE memory_text LIKE '%spaceship%'
-ORDER BY timestamp DESC;
+WHERE MATCH(question, answer) AGAINST ('+spaceship*' IN BOOLEAN MODE)
+ORDER BY id DESC
+LIMIT 20;
 
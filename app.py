@@ -1,7 +1,7 @@
 import streamlit as st
 import sidebar
 from config import MultiAgentOrchestrator
-from memory import MemoryDB
+from memory_loader import MemoryDBLoader
 
 APP_TITLE = "Peacemaker Guild"
 APP_VERSION = "0.3.0"
@@ -19,6 +19,27 @@ st.set_page_config(page_title=APP_TITLE, page_icon="🤖")
 import logging
 
 
+def render_streamed_replies(orch, user_query):
+    """Render each agent's reply progressively from `orch.chat_stream` and return the final texts."""
+    texts = {}
+    placeholders = {}
+    for name, delta in orch.chat_stream(user_query, st.session_state["messages"]):
+        if name not in placeholders:
+            style = orch.agent_styles.get(name, {"emoji": "🤖", "color": "#000"})
+            with st.chat_message("assistant"):
+                st.write(f"{style['emoji']} **{name}**")
+                placeholders[name] = st.empty()
+            texts[name] = ""
+        # a None delta means the agent's reply is being replaced (primary rephrase)
+        texts[name] = "" if delta is None else texts[name] + delta
+        style = orch.agent_styles.get(name, {"emoji": "🤖", "color": "#000"})
+        placeholders[name].markdown(
+            f"<span style='color:{style['color']}'>{texts[name]}</span>",
+            unsafe_allow_html=True,
+        )
+    return {name: text.strip() for name, text in texts.items()}
+
+
 def render_app():
     st.title(f"🤖 {APP_TITLE}")
 
@@ -26,22 +47,15 @@ def render_app():
     if "orchestrator" not in st.session_state:
         orch = MultiAgentOrchestrator()
         orch.load_config()  # loads servers, agent_styles, agents, moderator
-        # Try to initialize the MemoryDB for this Streamlit session so the UI has DB-backed memory
-        try:
-            if orch.memory_db is None:
-                orch.memory_db = MemoryDB()
-                logging.getLogger(__name__).info(f"[App] Initialized MemoryDB in session, connected={orch.memory_db.is_connected()}")
-        except Exception as e:
-            logging.getLogger(__name__).warning(f"[App] Could not initialize MemoryDB in session: {e}")
-        # Debug: report memory DB state when orchestrator is first created in this session
-        try:
-            mdb = orch.memory_db
-            if mdb is None:
-                logging.getLogger(__name__).info("[App] Orchestrator.memory_db is None (no DB configured in this session)")
-            else:
-                logging.getLogger(__name__).info(f"[App] Orchestrator.memory_db present, connected={mdb.is_connected()}")
-        except Exception as e:
-            logging.getLogger(__name__).warning(f"[App] Error checking memory_db: {e}")
+        # Connect the MemoryDB in the background so a slow or unreachable DB never
+        # blocks the first render; chats run without memory until it is ready.
+        if orch.memory_db is None:
+            def attach(db, orch=orch):
+                orch.memory_db = db
+                logging.getLogger(__name__).info("[App] MemoryDB ready; memory enabled for this session")
+
+            st.session_state["memory_loader"] = MemoryDBLoader(on_ready=attach).start()
+            logging.getLogger(__name__).info("[App] Connecting MemoryDB in the background")
         st.session_state["orchestrator"] = orch
 
     orch = st.session_state["orchestrator"]
@@ -82,6 +96,12 @@ def render_app():
         st.session_state["messages"].append({"role": "user", "content": user_query})
         st.session_state.setdefault("query_history", []).append(user_query)
 
+        if getattr(orch, "use_streaming", False):
+            replies = render_streamed_replies(orch, user_query)
+            for name, reply in replies.items():
+                st.session_state["messages"].append({"role": "assistant", "content": f"{name}: {reply}"})
+            return
+
         with st.spinner("Thinking..."):
             # Debug: report memory DB state right before calling chat
             try:
@@ -0,0 +1,31 @@
+import time
+from typing import Optional
+
+
+class LatencyBudget:
+    """End-to-end deadline for one chat request, shared by every stage.
+
+    Each stage asks `timeout(cap)` for its HTTP timeout (its usual fixed
+    timeout, clipped to what is left) and optional stages check `exhausted()`
+    before starting. A budget created with `deadline_s=None` never expires, so
+    callers can use it unconditionally.
+    """
+
+    def __init__(self, deadline_s: Optional[float] = None):
+        self.deadline_s = deadline_s
+        self._expires = time.monotonic() + deadline_s if deadline_s else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None for an unlimited budget."""
+        if self._expires is None:
+            return None
+        return max(0.0, self._expires - time.monotonic())
+
+    def timeout(self, cap: float) -> float:
+        remaining = self.remaining()
+        return cap if remaining is None else min(cap, remaining)
+
+    def exhausted(self, reserve: float = 0.0) -> bool:
+        """True once less than `reserve` seconds are left (never for unlimited budgets)."""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= reserve
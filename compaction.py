@@ -0,0 +1,180 @@
+"""Background summarization of old memories into compact long-term summaries.
+
+`CompactionJob.run_once()` takes, per agent, the oldest QA rows that are
+older than `min_age_days` and not yet compacted, groups them by day (a
+`conv_id` is a single chat turn here, so a day of an agent's turns is one
+group, split every `max_rows` rows) and asks a small local model to write
+a few bullet points of what is worth remembering. Each summary is stored in
+`memory_summaries` and its rows are marked `compacted` in the same
+transaction (`MemoryDB.save_summary`); if the model is unreachable nothing
+is marked and the rows are retried on the next pass.
+
+`PromptBuilder` injects the newest summaries and drops raw memories they
+already cover. `CompactionWorker` repeats the job on a daemon thread;
+`MemoryDB.enable_compaction` (or `MEMORY_COMPACTION=1`) starts it.
+
+Configuration: `COMPACTION_HOST` (Ollama server URL), `COMPACTION_MODEL`
+(a cheap model, e.g. `qwen2.5:1.5b`), `COMPACTION_MIN_AGE_DAYS` (7),
+`COMPACTION_INTERVAL_S` (3600).
+"""
+
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import transport
+
+logger = logging.getLogger(__name__)
+
+_THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
+
+
+def summary_prompt(agent_name: str, rows: List[tuple], max_chars: int = 6000) -> str:
+    """Prompt asking for a short summary of `rows` ((question, answer) pairs, oldest first)."""
+    who = "the group chat" if agent_name == "__group__" else agent_name
+    lines = []
+    used = 0
+    for q, a in rows:
+        line = f"Q: {(q or '').strip()[:400]}\nA: {(a or '').strip()[:600]}"
+        if used + len(line) > max_chars:
+            break
+        lines.append(line)
+        used += len(line)
+    return (
+        f"Below are past exchanges between a user and {who}. Summarize them in at most 5 short bullet "
+        "points: facts about the user, decisions, preferences and open questions worth remembering. "
+        "Leave out greetings and anything that will not matter later. Reply with the bullet points only.\n\n"
+        + "\n\n".join(lines)
+    )
+
+
+class OllamaSummarizer:
+    """Calls `/api/generate` on a (cheap, local) model; `__call__(agent, rows) -> summary text`."""
+
+    def __init__(self, host: str, model: str, timeout: float = 120.0, max_tokens: int = 200):
+        self.host = host.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+
+    @classmethod
+    def from_env(cls) -> Optional["OllamaSummarizer"]:
+        host, model = os.getenv("COMPACTION_HOST"), os.getenv("COMPACTION_MODEL")
+        if not host or not model:
+            return None
+        return cls(host, model)
+
+    def __call__(self, agent_name: str, rows: List[tuple]) -> str:
+        payload = {
+            "model": self.model,
+            "prompt": summary_prompt(agent_name, rows),
+            "stream": False,
+            "options": {"num_predict": self.max_tokens, "temperature": 0.2},
+        }
+        resp = transport.post(f"{self.host}/api/generate", json=payload, timeout=self.timeout)
+        resp.raise_for_status()
+        # reasoning models wrap their scratchpad in <think> tags
+        return _THINK_RE.sub("", resp.json().get("response") or "").strip()
+
+
+def _day(ts):
+    return ts.date() if hasattr(ts, "date") else None
+
+
+class CompactionJob:
+    def __init__(self, db, summarizer: Callable[[str, List[tuple]], str], min_age_days: float = 7,
+                 max_rows: int = 40, max_groups: int = 20):
+        self.db = db
+        self.summarizer = summarizer
+        self.min_age_days = min_age_days
+        self.max_rows = max_rows
+        self.max_groups = max_groups
+
+    def _groups(self, agent_name: str, cutoff: datetime) -> List[List[tuple]]:
+        with self.db.cursor() as cur:
+            cur.execute(
+                "SELECT id, question, answer, conv_id, timestamp FROM agent_memory "
+                "WHERE agent_name=%s AND compacted=0 AND timestamp < %s "
+                "AND (question IS NOT NULL OR answer IS NOT NULL) ORDER BY timestamp, id LIMIT %s",
+                (agent_name, cutoff, self.max_rows * self.max_groups),
+            )
+            rows = cur.fetchall()
+        groups: List[List[tuple]] = []
+        for row in rows:
+            if not groups or len(groups[-1]) >= self.max_rows or _day(groups[-1][-1][4]) != _day(row[4]):
+                groups.append([])
+            groups[-1].append(row)
+        return groups
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Summarize up to `max_groups` groups; returns {'summaries', 'rows'} written."""
+        now = now or datetime.now()
+        cutoff = now - timedelta(days=self.min_age_days)
+        done = {"summaries": 0, "rows": 0}
+        with self.db.cursor() as cur:
+            cur.execute("SELECT DISTINCT agent_name FROM agent_memory WHERE compacted=0 AND timestamp < %s", (cutoff,))
+            agents = [r[0] for r in cur.fetchall()]
+        for agent in agents:
+            for group in self._groups(agent, cutoff):
+                if done["summaries"] >= self.max_groups:
+                    return done
+                ids = [r[0] for r in group]
+                # error replies carry nothing worth summarizing but are compacted with the rest
+                useful = [(q, a) for _, q, a, _, _ in group if a and not a.startswith("(")]
+                if not useful:
+                    self.db.mark_compacted(ids)
+                    done["rows"] += len(ids)
+                    continue
+                try:
+                    summary = self.summarizer(agent, useful)
+                except Exception as e:
+                    summary = ""
+                    logger.warning(f"[compaction] summarizer failed for {agent}: {e}")
+                if not summary:
+                    # leave the rows for the next pass
+                    return done
+                self.db.save_summary(
+                    agent,
+                    summary,
+                    ids,
+                    first_ts=group[0][4],
+                    last_ts=group[-1][4],
+                    conversations=len({r[3] for r in group if r[3]}),
+                    model=getattr(self.summarizer, "model", None),
+                )
+                done["summaries"] += 1
+                done["rows"] += len(ids)
+        return done
+
+
+class CompactionWorker:
+    """Runs `job.run_once()` every `interval_s` seconds on a daemon thread."""
+
+    def __init__(self, job: CompactionJob, interval_s: float = 3600.0):
+        self.job = job
+        self.interval_s = interval_s
+        self.last_result: Optional[Dict[str, int]] = None
+        self.last_run: Optional[datetime] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-compaction", daemon=True)
+
+    def start(self) -> "CompactionWorker":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.last_result = self.job.run_once()
+                self.last_run = datetime.now()
+            except Exception as e:
+                logger.warning(f"[compaction] pass failed: {e}")
+            self._stop.wait(self.interval_s)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
@@ -0,0 +1,175 @@
+"""Bounded, thread-safe pool of MySQL connections for `MemoryDB`.
+
+Each database operation checks a connection out, runs on its own cursor and
+returns the connection. Connections idle for longer than `ping_interval_s`
+are health-checked on checkout and replaced if the server dropped them.
+`run()` retries an operation once on a fresh connection after the
+"server has gone away" / "lost connection" errors (2006 / 2013).
+
+`stats()` reports checkout wait times and utilization for the sidebar.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, Optional, Tuple
+
+RETRYABLE_ERROR_CODES = {2013, 2006}  # 2013: Lost connection during query, 2006: MySQL server has gone away
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout."""
+
+
+class ConnectionPool:
+    def __init__(self,
+                 factory: Callable[[], object],
+                 max_size: int = 5,
+                 timeout_s: float = 10.0,
+                 ping_interval_s: float = 30.0):
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self.timeout_s = timeout_s
+        self.ping_interval_s = ping_interval_s
+        self._idle: Deque[Tuple[object, float]] = deque()
+        self._cond = threading.Condition()
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self.checkouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.timeouts = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.logger = logging.getLogger(__name__)
+
+    def _healthy(self, conn, idle_s: float) -> bool:
+        if idle_s < self.ping_interval_s:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _close_quietly(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout_s: Optional[float] = None):
+        """Check out a healthy connection, creating one if the pool has room."""
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        started = time.monotonic()
+        deadline = started + timeout_s
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    self._in_use += 1
+                    create = False
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    self._in_use += 1
+                    create = True
+                    conn, last_used = None, 0.0
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"no MySQL connection free after {timeout_s:.1f}s")
+                self._cond.wait(remaining)
+        try:
+            if not create and not self._healthy(conn, time.monotonic() - last_used):
+                self._close_quietly(conn)
+                with self._cond:
+                    self.discarded += 1
+                create = True
+            if create:
+                conn = self.factory()
+                with self._cond:
+                    self.created += 1
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        waited = time.monotonic() - started
+        with self._cond:
+            self.checkouts += 1
+            self.wait_total_s += waited
+            self.wait_max_s = max(self.wait_max_s, waited)
+        return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        if discard:
+            self._close_quietly(conn)
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._size -= 1
+                if discard:
+                    self.discarded += 1
+                else:
+                    self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout_s: Optional[float] = None) -> Iterator[object]:
+        conn = self.acquire(timeout_s)
+        broken = False
+        try:
+            yield conn
+        except Exception as e:
+            broken = getattr(e, "errno", None) in RETRYABLE_ERROR_CODES
+            raise
+        finally:
+            self.release(conn, discard=broken)
+
+    def run(self, fn: Callable[[object], object], retries: int = 1):
+        """Call `fn(conn)` on a pooled connection, retrying lost connections."""
+        attempt = 0
+        while True:
+            try:
+                with self.connection() as conn:
+                    return fn(conn)
+            except Exception as e:
+                if attempt >= retries or getattr(e, "errno", None) not in RETRYABLE_ERROR_CODES:
+                    raise
+                attempt += 1
+                self.logger.warning(f"[MemoryDB] connection lost ({e}); retrying on a fresh connection")
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "size": self._size,
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "utilization": self._in_use / self.max_size,
+                "checkouts": self.checkouts,
+                "created": self.created,
+                "discarded": self.discarded,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": (self.wait_total_s / self.checkouts * 1000.0) if self.checkouts else 0.0,
+                "max_wait_ms": self.wait_max_s * 1000.0,
+            }
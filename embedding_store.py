@@ -0,0 +1,142 @@
+"""On-disk FAISS index of QA embeddings keyed by `agent_memory.id`.
+
+Written by `scripts/backfill_embeddings.py` and read by
+`MemoryDB.enable_semantic_memory(index_path=...)`, which reuses stored
+vectors instead of re-embedding history at startup.
+
+Layout of the directory at `path`:
+
+- `seg-<generation>.npz`: immutable segments holding `ids` and `vectors`;
+- `state.json`: the manifest, `{"model", "dim", "last_id", "rows",
+  "generation", "segments": [{"file", "rows"}, ...]}`; `last_id` is the
+  highest row id covered, so an interrupted backfill resumes after it.
+
+`checkpoint()` writes only the vectors added since the previous checkpoint
+as a new segment, then swaps the manifest in with a single `os.replace`.
+That rename is the commit point: after a crash the directory holds either
+the old or the new checkpoint, never vectors from one and `last_id` from
+the other. A new segment is merged into the previous one while it is at
+least as large (like a binary counter), so each vector is rewritten
+O(log n) times over a backfill rather than at every checkpoint.
+
+`load()` raises ValueError when a segment's ids and vectors, or the
+segments and the manifest, disagree on the row count.
+"""
+
+import json
+import os
+from typing import List, Optional
+
+import numpy as np
+
+
+class EmbeddingStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.index = None
+        self.state = {"model": None, "dim": None, "last_id": 0, "rows": 0, "generation": 0, "segments": []}
+        # vectors added since the last checkpoint
+        self._pending_ids: List[np.ndarray] = []
+        self._pending_vectors: List[np.ndarray] = []
+
+    @property
+    def state_file(self) -> str:
+        return os.path.join(self.path, "state.json")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.state_file)
+
+    def load(self) -> "EmbeddingStore":
+        if not self.exists():
+            return self
+        with open(self.state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        index = None
+        for seg in state["segments"]:
+            ids, vectors = self._read_segment(seg)
+            if index is None:
+                index = self._new_index(vectors.shape[1])
+            index.add_with_ids(vectors, ids)
+        total = index.ntotal if index is not None else 0
+        if total != state.get("rows", 0):
+            raise ValueError(f"{self.state_file}: manifest lists {state.get('rows', 0)} rows, the index holds {total}")
+        self.state, self.index = state, index
+        return self
+
+    @staticmethod
+    def _new_index(dim: int):
+        import faiss
+
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+
+    def add(self, ids, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype="float32")
+        if self.index is None:
+            self.index = self._new_index(vectors.shape[1])
+            self.state["dim"] = int(vectors.shape[1])
+        if len(ids):
+            ids = np.asarray(ids, dtype="int64")
+            self.index.add_with_ids(vectors, ids)
+            self._pending_ids.append(ids)
+            self._pending_vectors.append(vectors)
+            self.state["rows"] = int(self.index.ntotal)
+
+    def vector(self, row_id: int) -> Optional[np.ndarray]:
+        if self.index is None:
+            return None
+        try:
+            return self.index.reconstruct(int(row_id))
+        except RuntimeError:
+            # id not in the index
+            return None
+
+    def _read_segment(self, seg: dict) -> tuple:
+        with np.load(os.path.join(self.path, seg["file"])) as data:
+            ids, vectors = data["ids"].astype("int64"), data["vectors"].astype("float32")
+        if len(ids) != len(vectors) or len(ids) != seg["rows"]:
+            raise ValueError(f"{self.path}: segment {seg['file']} holds {len(ids)} ids and {len(vectors)} vectors, "
+                             f"the manifest lists {seg['rows']}")
+        return ids, vectors
+
+    def _write_segment(self, generation: int, ids: np.ndarray, vectors: np.ndarray) -> dict:
+        name = f"seg-{generation:06d}.npz"
+        # a fresh name: a crash before the manifest swap leaves an unlisted file, removed later
+        with open(os.path.join(self.path, name), "wb") as f:
+            np.savez(f, ids=ids, vectors=vectors)
+            f.flush()
+            os.fsync(f.fileno())
+        return {"file": name, "rows": int(len(ids))}
+
+    def checkpoint(self, last_id: int) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        segments = list(self.state.get("segments") or [])
+        generation = int(self.state.get("generation") or 0)
+        if self._pending_ids:
+            ids = np.concatenate(self._pending_ids)
+            vectors = np.concatenate(self._pending_vectors)
+            while segments and segments[-1]["rows"] <= len(ids):
+                old_ids, old_vectors = self._read_segment(segments.pop())
+                ids = np.concatenate([old_ids, ids])
+                vectors = np.concatenate([old_vectors, vectors])
+            generation += 1
+            segments.append(self._write_segment(generation, ids, vectors))
+        state = dict(self.state, last_id=int(last_id), generation=generation, segments=segments)
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_file)
+        self.state = state
+        self._pending_ids, self._pending_vectors = [], []
+        self._remove_unlisted()
+
+    def _remove_unlisted(self) -> None:
+        """Delete merged segments and leftovers of interrupted checkpoints."""
+        listed = {seg["file"] for seg in self.state["segments"]}
+        for name in os.listdir(self.path):
+            if name.startswith("seg-") and name.endswith(".npz") and name not in listed:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
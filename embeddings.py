@@ -0,0 +1,55 @@
+"""Local sentence embeddings shared by the semantic cache and memory retrieval.
+
+Uses `sentence-transformers` (pinned in requirements.txt). The model is
+loaded lazily on first use so importing this module stays cheap; set
+`EMBEDDING_MODEL` to pick a different local model.
+"""
+
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+
+class Embedder:
+    """Encode text into L2-normalised float32 vectors (cosine similarity == inner product)."""
+
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name or os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL)
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+
+                self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def dim(self) -> int:
+        return int(self._load().get_sentence_embedding_dimension())
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vecs = self._load().encode(list(texts), convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vecs, dtype="float32")
+
+
+_default: Optional[Embedder] = None
+_default_lock = threading.Lock()
+
+
+def get_embedder() -> Embedder:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Embedder()
+        return _default
@@ -1,7 +1,7 @@
 """Quick start examples for Peacemaker Guild.
 
 This script demonstrates programmatic usage of `MultiAgentOrchestrator` in a
-safe, offline-friendly way by monkeypatching `requests.post` with fake
+safe, offline-friendly way by monkeypatching `transport.post` with fake
 responses. It's suitable as a copy-paste starting point when scripting against
 the project.
 
@@ -14,11 +14,11 @@ import os
 import sys
 import uuid
 import json
-import requests
 
 # Ensure project root is on sys.path when running this example from the examples/ folder
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+import transport
 from config import MultiAgentOrchestrator
 import logging
 
@@ -33,7 +33,7 @@ class FakeResponse:
 
 
 def make_fake_post(mapping: dict):
-    """Return a replacement for `requests.post` that responds based on prompt."""
+    """Return a replacement for `transport.post` that responds based on prompt."""
 
     def _post(url, json=None, timeout=None):
         prompt = (json or {}).get("prompt", "")
@@ -63,8 +63,8 @@ def main():
         "Hello all": "Broadcast reply",
     }
 
-    orig_post = requests.post
-    requests.post = make_fake_post(mapping)
+    orig_post = transport.post
+    transport.post = make_fake_post(mapping)
 
     try:
         # Addressed example
@@ -102,8 +102,8 @@ def main():
             logging.getLogger(__name__).exception('Could not write example config: %s', e)
 
     finally:
-        # restore requests
-        requests.post = orig_post
+        # restore transport
+        transport.post = orig_post
 
 
 if __name__ == "__main__":
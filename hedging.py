@@ -0,0 +1,220 @@
+"""Hedged `/api/generate` requests across replica servers.
+
+If the primary host has not answered within the agent's p95 latency, the same
+request is fired at a replica server that also hosts the model. Whichever
+finishes first wins; the other request is cancelled at once by closing its
+streaming response (handed over through `stream_fn`'s `on_open` callback),
+which frees the pooled connection and makes Ollama stop generating.
+
+`hedged_stream` is the variant for streamed replies: the race is for the
+first token, after which only the winner's deltas are passed on.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per agent."""
+
+    def __init__(self, window: int = 50, min_samples: int = 5):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+
+    def last(self, name: str) -> Optional[float]:
+        with self._lock:
+            samples = self._samples.get(name)
+            return samples[-1] if samples else None
+
+    def percentile(self, name: str, pct: float = 95.0) -> Optional[float]:
+        """Return the `pct` percentile latency, or None until `min_samples` are recorded."""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if len(samples) < self.min_samples:
+            return None
+        idx = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[idx]
+
+
+class _Attempt:
+    """One hedged request: its cancel flag and, once open, the response to close on cancel."""
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._resp = None
+        self._lock = threading.Lock()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def opened(self, resp) -> None:
+        with self._lock:
+            self._resp = resp
+            cancelled = self._cancelled.is_set()
+        if cancelled:
+            _close(resp)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled.set()
+            resp = self._resp
+        if resp is not None:
+            # unblocks a worker waiting on the socket; it then ends with an error nobody reads
+            _close(resp)
+
+
+def _close(resp) -> None:
+    try:
+        resp.close()
+    except Exception:
+        pass
+
+
+StreamFn = Callable[[str, dict, float, Callable[[object], None]], Iterator[str]]
+
+
+def hedged_generate(hosts: List[str],
+                    payload: dict,
+                    timeout: float,
+                    hedge_after: float,
+                    stream_fn: StreamFn) -> Tuple[str, str]:
+    """Run `payload` on `hosts[0]`, hedging to `hosts[1]` after `hedge_after` seconds.
+
+    `stream_fn(host, payload, timeout, on_open)` must yield response deltas
+    and pass its HTTP response to `on_open` (see
+    `MultiAgentOrchestrator._stream_generate`). Returns `(text, host)` from the
+    first request that completes, closing the other one right away; raises the
+    last error if every attempt fails.
+    """
+    attempts = {host: _Attempt() for host in hosts[:2]}
+    stream_payload = dict(payload, stream=True)
+
+    def run(host: str) -> Tuple[str, str]:
+        attempt = attempts[host]
+        gen = stream_fn(host, stream_payload, timeout, attempt.opened)
+        parts: List[str] = []
+        try:
+            for delta in gen:
+                if attempt.is_cancelled():
+                    raise RuntimeError("hedged request cancelled")
+                parts.append(delta)
+        finally:
+            # closing the generator closes the HTTP response (and the server-side generation)
+            gen.close()
+        return "".join(parts).strip(), host
+
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hedge")
+    try:
+        started = time.monotonic()
+        futures = [pool.submit(run, hosts[0])]
+        done, _ = wait(futures, timeout=hedge_after)
+        if not done and len(hosts) > 1:
+            futures.append(pool.submit(run, hosts[1]))
+        pending = set(futures)
+        last_exc: Optional[BaseException] = None
+        while pending:
+            remaining = timeout - (time.monotonic() - started)
+            done, pending = wait(pending, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for fut in done:
+                exc = fut.exception()
+                if exc is None:
+                    return fut.result()
+                last_exc = exc
+        raise last_exc or TimeoutError("hedged request timed out")
+    finally:
+        for attempt in attempts.values():
+            attempt.cancel()
+        pool.shutdown(wait=False)
+
+
+# end-of-stream marker for `hedged_stream` workers
+_END = object()
+
+
+def hedged_stream(hosts: List[str],
+                  payload: dict,
+                  timeout: float,
+                  hedge_after: float,
+                  stream_fn: StreamFn,
+                  on_winner: Optional[Callable[[str], None]] = None) -> Iterator[str]:
+    """Stream `payload` from `hosts[0]`, racing `hosts[1]` if no token arrives within `hedge_after` seconds.
+
+    The first host to produce a token wins (`on_winner(host)` is called) and
+    only its deltas are yielded; the other request's response is closed at
+    that moment. Raises the winner's error, or the last error if every
+    started request fails before producing anything.
+    """
+    events: "queue.Queue[tuple]" = queue.Queue()
+    attempts = {host: _Attempt() for host in hosts[:2]}
+
+    def run(host: str) -> None:
+        attempt = attempts[host]
+        gen = stream_fn(host, payload, timeout, attempt.opened)
+        try:
+            for delta in gen:
+                if attempt.is_cancelled():
+                    return
+                events.put((host, delta, None))
+            events.put((host, _END, None))
+        except Exception as e:
+            events.put((host, _END, e))
+        finally:
+            # closing the generator closes the HTTP response (and the server-side generation)
+            gen.close()
+
+    def start(host: str) -> None:
+        threading.Thread(target=run, args=(host,), name="hedge-stream", daemon=True).start()
+
+    started = [hosts[0]]
+    start(hosts[0])
+    hedge_at = time.monotonic() + hedge_after
+    winner: Optional[str] = None
+    failed = 0
+    last_exc: Optional[BaseException] = None
+    try:
+        while True:
+            wait_s = None
+            if winner is None and len(started) < len(attempts):
+                wait_s = max(0.0, hedge_at - time.monotonic())
+            try:
+                host, delta, exc = events.get(timeout=wait_s)
+            except queue.Empty:
+                started.append(hosts[1])
+                start(hosts[1])
+                continue
+            if winner is not None and host != winner:
+                continue
+            if delta is _END:
+                if winner is not None or exc is None:
+                    # the winner finished, or a request completed without producing any text
+                    if exc is not None:
+                        raise exc
+                    return
+                failed += 1
+                last_exc = exc
+                if failed == len(started):
+                    raise last_exc
+                continue
+            if winner is None:
+                winner = host
+                for other, attempt in attempts.items():
+                    if other != host:
+                        attempt.cancel()
+                if on_winner is not None:
+                    on_winner(host)
+            yield delta
+    finally:
+        for attempt in attempts.values():
+            attempt.cancel()
@@ -0,0 +1,126 @@
+"""BM25 keyword retrieval over memories, with no model to load.
+
+Each agent (and `__group__`) gets an inverted index over its question/answer
+text: term -> {doc: term frequency}. `save_qa` adds documents incrementally
+and `MemoryDB.enable_keyword_memory` rebuilds the index from the table by
+keyset pagination, which takes a few seconds for 100k+ rows.
+
+Scores use Okapi BM25 (k1=1.2, b=0.75); ties go to the newer memory. Only
+memories sharing at least one non-stopword term with the query are returned.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from heapq import nlargest
+from typing import Dict, List, Optional
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from had has have how i if in is it its me my no not of on or "
+    "our so than that the their them then there these they this to was we were what when where which who why "
+    "will with would you your q".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index for one agent. Documents are identified by increasing ints."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_len: Dict[int, int] = {}
+        self.docs: Dict[int, tuple] = {}
+        self.total_len = 0
+
+    def add(self, doc_id: int, text: str, payload: tuple) -> None:
+        terms = Counter(tokenize(text))
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        length = sum(terms.values())
+        self.doc_len[doc_id] = length
+        self.total_len += length
+        self.docs[doc_id] = payload
+
+    def search(self, query: str, k: int) -> List[tuple]:
+        """Return up to `k` (score, doc_id) pairs, best first."""
+        n = len(self.docs)
+        if not n:
+            return []
+        avgdl = self.total_len / n or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            for doc_id, tf in posting.items():
+                norm = tf + self.k1 * (1.0 - self.b + self.b * self.doc_len[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / norm
+        return nlargest(k, ((score, doc_id) for doc_id, score in scores.items()))
+
+
+class KeywordMemoryIndex:
+    def __init__(self):
+        self._indexes: Dict[str, BM25Index] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        # False while a rebuild from the DB is running; searches fall back to recency meanwhile
+        self.ready = True
+
+    def add(self, agent: str, question: str, answer: str, ts=None) -> None:
+        self.add_many([(agent, question, answer, ts)])
+
+    def add_many(self, rows: List[tuple]) -> None:
+        """Index `(agent, question, answer, ts)` rows given oldest first; error replies are skipped."""
+        with self._lock:
+            for agent, q, a, ts in rows:
+                if not a or a.startswith("("):
+                    continue
+                index = self._indexes.get(agent)
+                if index is None:
+                    index = self._indexes[agent] = BM25Index()
+                index.add(self._next_id, f"{q or ''} {a}", (q or "", a, ts))
+                self._next_id += 1
+
+    def search(self, agent: str, query: str, limit: int = 3) -> Optional[List[dict]]:
+        """Return up to `limit` matching memories as {'q', 'a', 'ts', 'score'} dicts, best first.
+
+        None means the index cannot answer (still rebuilding, or nothing
+        indexed for `agent`) and the caller should fall back to recency.
+        """
+        if not self.ready or not query:
+            return None
+        with self._lock:
+            index = self._indexes.get(agent)
+            if index is None:
+                return None
+            out = []
+            for score, doc_id in index.search(query, limit):
+                q, a, ts = index.docs[doc_id]
+                out.append({"q": q, "a": a, "ts": ts, "score": score})
+            return out
+
+    def drop(self, agent: str) -> None:
+        with self._lock:
+            self._indexes.pop(agent, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "agents": len(self._indexes),
+                "memories": sum(len(i.docs) for i in self._indexes.values()),
+                "terms": sum(len(i.postings) for i in self._indexes.values()),
+            }
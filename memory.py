@@ -1,137 +1,354 @@
 # memory.py
+import csv
 import os
-from typing import List, Optional
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import mysql.connector
-from mysql.connector import Error
 from dotenv import load_dotenv
 
+import migrations
+from db_pool import RETRYABLE_ERROR_CODES, ConnectionPool
+from embedding_store import EmbeddingStore
+from keyword_memory import KeywordMemoryIndex
+from memory_export import EXPORT_COLUMNS, write_rows
+from semantic_memory import SemanticMemoryIndex
+from write_behind import WriteBehindQueue
+
 # Load environment variables
 load_dotenv()
 
-RETRYABLE_ERROR_CODES = {2013, 2006}  # 2013: Lost connection during query, 2006: MySQL server has gone away
+GROUP_KEY = "__group__"
+UNREACHABLE_ERROR_CODES = RETRYABLE_ERROR_CODES | {2003}  # 2003: Can't connect to MySQL server
+
+
+class RecentQABuffer:
+    """Hot tier: the newest `size` QA pairs per agent (and `__group__`), newest first.
+
+    Once warmed from the table it mirrors every successful write made through
+    this `MemoryDB`, so reads of up to `size` rows never touch MySQL. Rows
+    written by other processes or sessions are caught by a `MAX(id)` check at
+    most once per `ttl_s` seconds (`due` / `stale`), which triggers a
+    re-warm; `ttl_s <= 0` turns the check off. Agents whose only rows are
+    legacy `memory_text` entries keep those in a separate buffer, served only
+    while the agent has no structured QA.
+    """
+
+    def __init__(self, size: int = 20, ttl_s: float = 15.0):
+        self.size = size
+        self.ttl_s = ttl_s
+        self.warm = False
+        # MAX(id) of agent_memory at the last warm-up, and rows added through `add` since
+        self.max_id: Optional[int] = None
+        self._own_writes = 0
+        self._checked_at = 0.0
+        self._qa: Dict[str, Deque[dict]] = {}
+        self._legacy: Dict[str, Deque[dict]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, qa: Dict[str, List[dict]], legacy: Dict[str, List[dict]], max_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._qa = {k: deque(v[:self.size], maxlen=self.size) for k, v in qa.items()}
+            self._legacy = {k: deque(v[:self.size], maxlen=self.size) for k, v in legacy.items()}
+            self.max_id = max_id
+            self._own_writes = 0
+            self._checked_at = time.monotonic()
+            self.warm = True
+
+    def add(self, agent_name: str, q: str, a: str, legacy: bool = False) -> None:
+        if not self.warm:
+            return
+        target = self._legacy if legacy else self._qa
+        with self._lock:
+            buf = target.setdefault(agent_name, deque(maxlen=self.size))
+            buf.appendleft({"q": q, "a": a, "ts": datetime.now()})
+            self._own_writes += 1
+
+    def due(self) -> bool:
+        """True at most once per `ttl_s`: time to look for rows written elsewhere."""
+        if not self.warm or self.ttl_s <= 0:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.ttl_s:
+                return False
+            self._checked_at = now
+            return True
+
+    def stale(self, max_id: Optional[int]) -> bool:
+        """Whether the table's `max_id` is ahead of the warm-up plus this buffer's own writes."""
+        if max_id is None:
+            return False
+        with self._lock:
+            return self.max_id is None or max_id > self.max_id + self._own_writes
+
+    def get(self, agent_name: str, limit: int) -> Optional[List[dict]]:
+        """Return up to `limit` rows, or None when the buffer cannot answer."""
+        if not self.warm or limit > self.size:
+            return None
+        with self._lock:
+            rows = self._qa.get(agent_name) or self._legacy.get(agent_name) or ()
+            return [dict(r) for r in list(rows)[:limit]]
+
+    def drop(self, agent_name: str) -> None:
+        with self._lock:
+            self._qa.pop(agent_name, None)
+            self._legacy.pop(agent_name, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._qa.clear()
+            self._legacy.clear()
+
+
+def _relevant(semantic: Optional[SemanticMemoryIndex], keyword: Optional[KeywordMemoryIndex],
+              agent_name: Optional[str], query: str, limit: int) -> Optional[List[dict]]:
+    # embeddings first, then BM25; None means "fall back to recency"
+    key = GROUP_KEY if agent_name is None else agent_name
+    for index in (semantic, keyword):
+        if index is not None:
+            hits = index.search(key, query, limit)
+            if hits is not None:
+                return hits
+    return None
+
+
+_SEARCH_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fulltext_query(text: str) -> str:
+    """Turn free text into a BOOLEAN MODE query requiring every word as a prefix.
+
+    Operators typed by the user are dropped; words shorter than InnoDB's
+    default `innodb_ft_min_token_size` (3) would never match and are skipped.
+    """
+    return " ".join(f"+{t}*" for t in _SEARCH_TERM_RE.findall(text or "") if len(t) >= 3)
+
+
+class MemorySnapshot:
+    """Recent QA pairs for a fixed set of agents, loaded once per chat.
+
+    Exposes the same `load_recent_qa(agent_name, limit)` read API as
+    `MemoryDB`, so `PromptBuilder` can build every prompt of a chat from it
+    without further round trips. Agents outside the snapshot have no memories.
+    `relevant_qa` answers from the in-process semantic / keyword indexes when set.
+    """
+
+    def __init__(self, rows: Dict[str, List[dict]],
+                 semantic: Optional[SemanticMemoryIndex] = None,
+                 keyword: Optional[KeywordMemoryIndex] = None,
+                 summaries: Optional[Dict[str, List[dict]]] = None):
+        self.rows = rows
+        self.semantic = semantic
+        self.keyword = keyword
+        self.summaries = summaries or {}
+
+    def load_recent_qa(self, agent_name: Optional[str] = None, limit: int = 10) -> List[dict]:
+        key = GROUP_KEY if agent_name is None else agent_name
+        return list(self.rows.get(key, [])[:limit])
+
+    def relevant_qa(self, agent_name: Optional[str], query: str, limit: int = 3) -> Optional[List[dict]]:
+        return _relevant(self.semantic, self.keyword, agent_name, query, limit)
+
+    def load_summaries(self, agent_name: Optional[str] = None, limit: int = 2) -> List[dict]:
+        key = GROUP_KEY if agent_name is None else agent_name
+        return list(self.summaries.get(key, [])[:limit])
+
 
 class MemoryDB:
-    def __init__(self):
+    def __init__(self, hot_size: Optional[int] = None, pool_size: Optional[int] = None, connect: bool = True):
         self.host = os.getenv("DB_HOST")
         self.port = int(os.getenv("DB_PORT", "3306"))
         self.user = os.getenv("DB_USER")
         self.password = os.getenv("DB_PASSWORD")
         self.database = os.getenv("DB_NAME")
-        self.conn = None
-        self.cursor = None
+        # every operation checks out its own connection + cursor, so one MemoryDB
+        # can serve concurrent agent calls, Streamlit sessions and the write-behind flusher
+        self.pool = ConnectionPool(
+            self._new_connection,
+            max_size=pool_size or int(os.getenv("MEMORY_DB_POOL_SIZE", "5")),
+            timeout_s=float(os.getenv("MEMORY_DB_POOL_TIMEOUT", "10")),
+        )
+        # in-process ring buffer of recent QA per agent; MEMORY_HOT_SIZE=0 disables it,
+        # MEMORY_HOT_TTL_S is how often it checks for rows written by other processes
+        if hot_size is None:
+            hot_size = int(os.getenv("MEMORY_HOT_SIZE", "20"))
+        self.hot = RecentQABuffer(hot_size, ttl_s=float(os.getenv("MEMORY_HOT_TTL_S", "15")))
+        self.writer: Optional[WriteBehindQueue] = None
+        self.semantic: Optional[SemanticMemoryIndex] = None
+        self.keyword: Optional[KeywordMemoryIndex] = None
+        # newest conversation summaries per agent (see compaction.py), newest first
+        self.summaries: Dict[str, List[dict]] = {}
+        self.compactor = None
+        self._connected = False
+        # connect=False leaves connecting to the caller (see memory_loader.MemoryDBLoader)
+        if connect:
+            self.connect()
+        if os.getenv("MEMORY_WRITE_BEHIND", "").lower() in ("1", "true", "yes"):
+            self.enable_write_behind()
+
+    def connect(self) -> bool:
+        """Connect, migrate the schema and warm the recent-QA buffer. Returns True when connected."""
         self._connect()
-        self._ensure_schema()
+        if self._connected:
+            self._ensure_schema()
+            if self.hot.size > 0:
+                self.warm_hot_tier()
+            if os.getenv("SEMANTIC_MEMORY", "").lower() in ("1", "true", "yes"):
+                self.enable_semantic_memory()
+            if os.getenv("KEYWORD_MEMORY", "").lower() in ("1", "true", "yes"):
+                self.enable_keyword_memory()
+            self.refresh_summaries()
+            if os.getenv("MEMORY_COMPACTION", "").lower() in ("1", "true", "yes"):
+                self.enable_compaction()
+        return self._connected
+
+    def _new_connection(self):
+        """Pool factory: open one autocommit MySQL connection."""
+        return mysql.connector.connect(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            autocommit=True,
+            connection_timeout=10,  # less brittle than 5
+        )
 
     def _connect(self):
+        """Open the first pooled connection so startup logs whether MySQL is reachable."""
+        import logging
+        logging.getLogger(__name__).info(f"[MemoryDB] Connecting to {self.host}:{self.port} as {self.user}")
         try:
-            import logging
-            logging.getLogger(__name__).info(f"[MemoryDB] Connecting to {self.host}:{self.port} as {self.user}")
-            self.conn = mysql.connector.connect(
-                host=self.host,
-                port=self.port,
-                user=self.user,
-                password=self.password,
-                database=self.database,
-                autocommit=True,
-                connection_timeout=10,  # less brittle than 5
-            )
-            if self.conn.is_connected():
-                import logging
-                logging.getLogger(__name__).info("[MemoryDB] Connected successfully")
-                self.cursor = self.conn.cursor(buffered=True)
-            else:
-                import logging
-                logging.getLogger(__name__).warning("[MemoryDB] Connection failed")
-                self.cursor = None
-        except Error as e:
-            import logging
+            self.pool.run(lambda conn: conn.is_connected())
+            self._connected = True
+            logging.getLogger(__name__).info("[MemoryDB] Connected successfully")
+        except Exception as e:
+            self._connected = False
             logging.getLogger(__name__).warning(f"[MemoryDB] Error connecting to MySQL: {e}")
-            self.cursor = None
+
+    @contextmanager
+    def cursor(self) -> Iterator[object]:
+        """Check out a pooled connection and yield a buffered cursor on it."""
+        with self.pool.connection() as conn:
+            cur = conn.cursor(buffered=True)
+            try:
+                yield cur
+            finally:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
 
     def _ensure_schema(self):
-        if not self.cursor:
+        """Bring the schema up to date (see `migrations.py`); a no-op once current."""
+        if not self._connected:
             return
         try:
-            # Create table with columns for structured QA storage. If table exists this is a no-op.
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS agent_memory (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    agent_name VARCHAR(100) NOT NULL,
-                    memory_text TEXT,
-                    question TEXT,
-                    answer TEXT,
-                    conv_id VARCHAR(128),
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            # Ensure columns exist (ALTER TABLE will fail harmlessly if they already exist)
-            try:
-                self.cursor.execute("ALTER TABLE agent_memory ADD COLUMN IF NOT EXISTS question TEXT")
-            except Exception:
-                pass
-            try:
-                self.cursor.execute("ALTER TABLE agent_memory ADD COLUMN IF NOT EXISTS answer TEXT")
-            except Exception:
-                pass
-            try:
-                self.cursor.execute("ALTER TABLE agent_memory ADD COLUMN IF NOT EXISTS conv_id VARCHAR(128)")
-            except Exception:
-                pass
-        except Error as e:
+            with self.cursor() as cur:
+                migrations.migrate(cur, key=f"{self.host}:{self.port}/{self.database}")
+        except Exception as e:
             import logging
             logging.getLogger(__name__).warning(f"[MemoryDB] Error ensuring schema: {e}")
 
-    def _reconnect_if_needed(self, err: Optional[Error]) -> bool:
-        """Return True if we reconnected due to a retryable error."""
-        code = getattr(err, "errno", None)
-        if code in RETRYABLE_ERROR_CODES or not self.is_connected():
-            try:
-                if self.cursor:
-                    try: self.cursor.close()
-                    except: pass
-                if self.conn:
-                    try: self.conn.close()
-                    except: pass
-            except:
-                pass
-            self._connect()
-            return self.is_connected()
-        return False
+    def explain_hot_queries(self) -> Dict[str, dict]:
+        """EXPLAIN the hot-path queries; see `migrations.explain_hot_queries`."""
+        with self.cursor() as cur:
+            return migrations.explain_hot_queries(cur)
 
     def _try_execute(self, sql: str, params: tuple = (), fetch: bool = False, retries: int = 1):
-        if not self.cursor:
-            self._connect()
-            if not self.cursor:
-                return [] if fetch else None
+        """Run one statement on a pooled connection; lost connections are retried by the pool.
+
+        Returns the rows when `fetch` is set (`[]` on error), else True on
+        success and None on error.
+        """
+        def op(conn):
+            cur = conn.cursor(buffered=True)
+            try:
+                cur.execute(sql, params)
+                return cur.fetchall() if fetch else True
+            finally:
+                cur.close()
+
         try:
-            self.cursor.execute(sql, params)
-            if fetch:
-                return self.cursor.fetchall()
-            return None
-        except Error as e:
+            result = self.pool.run(op, retries=retries)
+            self._connected = True
+            return result
+        except Exception as e:
             import logging
             logging.getLogger(__name__).warning(f"[MemoryDB] DB error: {e}")
-            # Attempt a single reconnect and retry
-            if retries > 0 and self._reconnect_if_needed(e):
-                try:
-                    self.cursor.execute(sql, params)
-                    if fetch:
-                        return self.cursor.fetchall()
-                    return None
-                except Error as e2:
-                    import logging
-                    logging.getLogger(__name__).warning(f"[MemoryDB] Retry failed: {e2}")
-            # Give up
+            if getattr(e, "errno", None) in UNREACHABLE_ERROR_CODES:
+                self._connected = False
             return [] if fetch else None
 
+    _INSERT_QA_SQL = "INSERT INTO agent_memory (agent_name, memory_text, question, answer, conv_id) VALUES (%s, %s, %s, %s, %s)"
+
+    def _insert_qa_rows(self, rows: List[tuple]) -> None:
+        """Insert many QA rows with `executemany` in one transaction (write-behind flush)."""
+        def op(conn):
+            cur = conn.cursor()
+            try:
+                conn.start_transaction()
+                cur.executemany(self._INSERT_QA_SQL, rows)
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+            finally:
+                cur.close()
+
+        self.pool.run(op)
+
+    def enable_write_behind(self,
+                            max_queue: Optional[int] = None,
+                            batch_size: Optional[int] = None,
+                            flush_interval_ms: Optional[float] = None,
+                            on_full: Optional[str] = None) -> WriteBehindQueue:
+        """Queue `save_qa` inserts and write them in batches on a background thread.
+
+        Defaults come from `MEMORY_WB_MAX_QUEUE` (1000), `MEMORY_WB_BATCH_SIZE`
+        (50), `MEMORY_WB_FLUSH_MS` (200) and `MEMORY_WB_ON_FULL`
+        (block | sync | drop). Reads served by the recent-QA buffer see queued
+        rows immediately; direct SQL reads see them after the next flush.
+        """
+        if self.writer is not None:
+            return self.writer
+        self.writer = WriteBehindQueue(
+            self._insert_qa_rows,
+            max_queue=max_queue or int(os.getenv("MEMORY_WB_MAX_QUEUE", "1000")),
+            batch_size=batch_size or int(os.getenv("MEMORY_WB_BATCH_SIZE", "50")),
+            flush_interval_ms=flush_interval_ms if flush_interval_ms is not None else float(os.getenv("MEMORY_WB_FLUSH_MS", "200")),
+            on_full=on_full or os.getenv("MEMORY_WB_ON_FULL", "block"),
+        )
+        return self.writer
+
+    def disable_write_behind(self) -> None:
+        """Flush anything queued and go back to synchronous inserts."""
+        writer, self.writer = self.writer, None
+        if writer is not None:
+            writer.close()
+
+    def flush(self) -> None:
+        """Block until queued write-behind rows are in the database."""
+        if self.writer is not None:
+            self.writer.flush()
+
     def save_memory(self, agent_name: str, memory_text: str):
         if not memory_text:
             return
         # Avoid oversized rows
         trimmed = memory_text[:4000]
         sql = "INSERT INTO agent_memory (agent_name, memory_text) VALUES (%s, %s)"
-        self._try_execute(sql, (agent_name, trimmed), fetch=False, retries=1)
+        if self._try_execute(sql, (agent_name, trimmed), fetch=False, retries=1):
+            self.hot.add(agent_name, "", trimmed, legacy=True)
 
     def save_qa(self, agent_name: str, question: str, answer: str, conv_id: Optional[str] = None):
         """Save a structured QA pair into the DB. Stores question, answer and a combined memory_text for backward compatibility."""
@@ -140,8 +357,19 @@ class MemoryDB:
         q_trim = (question or "")[:2000]
         a_trim = (answer or "")[:4000]
         combined = f"Q: {q_trim} A: {a_trim}"
-        sql = "INSERT INTO agent_memory (agent_name, memory_text, question, answer, conv_id) VALUES (%s, %s, %s, %s, %s)"
-        self._try_execute(sql, (agent_name, combined, q_trim, a_trim, conv_id), fetch=False, retries=1)
+        row = (agent_name, combined, q_trim, a_trim, conv_id)
+        if self.writer is not None:
+            stored = self.writer.submit(row)
+        else:
+            stored = self._try_execute(self._INSERT_QA_SQL, row, fetch=False, retries=1)
+        # only rows that reached the table (or its write-behind queue) are served from memory
+        if not stored:
+            return
+        self.hot.add(agent_name, q_trim, a_trim)
+        if self.semantic is not None:
+            self.semantic.add(agent_name, q_trim, a_trim)
+        if self.keyword is not None:
+            self.keyword.add(agent_name, q_trim, a_trim)
 
     def load_memory(self, agent_name: str, limit: int = 10) -> List[str]:
         sql = "SELECT memory_text FROM agent_memory WHERE agent_name=%s ORDER BY timestamp DESC LIMIT %s"
@@ -152,8 +380,11 @@ class MemoryDB:
         """Return recent QA pairs as list of dicts: {'q':..., 'a':..., 'ts':...}.
         If agent_name is None, return recent group QA entries.
         """
-        GROUP_KEY = "__group__"
         key = GROUP_KEY if agent_name is None else agent_name
+        self._refresh_hot_tier()
+        cached = self.hot.get(key, limit)
+        if cached is not None:
+            return cached
         sql = "SELECT question, answer, timestamp FROM agent_memory WHERE agent_name=%s AND (question IS NOT NULL OR answer IS NOT NULL) ORDER BY timestamp DESC LIMIT %s"
         rows = self._try_execute(sql, (key, limit), fetch=True, retries=1)
         result = []
@@ -168,6 +399,277 @@ class MemoryDB:
                 result.append({"q": "", "a": mt or "", "ts": ts})
         return result
 
+    # agents per UNION ALL statement when warming the buffers
+    _RECENT_BATCH = 100
+
+    @staticmethod
+    def _split_recent(rows) -> tuple:
+        qa: Dict[str, List[dict]] = {}
+        legacy: Dict[str, List[dict]] = {}
+        # UNION ALL does not promise branch order: newest first per agent, ties by id
+        for agent_name, q, a, mt, ts, _ in sorted(rows or [], key=lambda r: (r[4] is not None, r[4], r[5]), reverse=True):
+            if q is not None or a is not None:
+                qa.setdefault(agent_name, []).append({"q": q or "", "a": a or "", "ts": ts})
+            else:
+                legacy.setdefault(agent_name, []).append({"q": "", "a": mt or "", "ts": ts})
+        return qa, legacy
+
+    def _load_recent(self, keys: List[str], limit: int, fetch: Callable[[str, tuple], list]) -> tuple:
+        """(qa, legacy) rows for `keys`; legacy rows are only read for agents without QA rows."""
+        qa, _ = self._split_recent(fetch(migrations.recent_rows_sql(len(keys)), migrations.recent_rows_params(keys, limit)))
+        missing = [k for k in keys if k not in qa]
+        legacy: Dict[str, List[dict]] = {}
+        if missing:
+            _, legacy = self._split_recent(fetch(migrations.recent_rows_sql(len(missing), legacy=True),
+                                                 migrations.recent_rows_params(missing, limit)))
+        return qa, legacy
+
+    def warm_hot_tier(self) -> bool:
+        """Fill the ring buffers from the table with indexed per-agent reads. Returns True when warm."""
+        if not self._connected or self.hot.size <= 0:
+            return False
+        qa: Dict[str, List[dict]] = {}
+        legacy: Dict[str, List[dict]] = {}
+        try:
+            with self.cursor() as cur:
+                def fetch(sql, params):
+                    cur.execute(sql, params)
+                    return cur.fetchall()
+
+                # read first: rows landing during the warm-up make the next check re-warm
+                cur.execute("SELECT MAX(id) FROM agent_memory")
+                max_id = cur.fetchall()[0][0]
+                # a loose index scan of idx_agent_ts, not a table scan
+                cur.execute("SELECT DISTINCT agent_name FROM agent_memory")
+                keys = [r[0] for r in cur.fetchall()]
+                for i in range(0, len(keys), self._RECENT_BATCH):
+                    batch_qa, batch_legacy = self._load_recent(keys[i:i + self._RECENT_BATCH], self.hot.size, fetch)
+                    qa.update(batch_qa)
+                    legacy.update(batch_legacy)
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).warning(f"[MemoryDB] Could not warm recent-QA buffer: {e}")
+            return False
+        self.hot.load(qa, legacy, max_id=max_id)
+        return True
+
+    def _refresh_hot_tier(self) -> None:
+        """Re-warm the ring buffers when other processes added rows (checked every `MEMORY_HOT_TTL_S`)."""
+        if not self.hot.due():
+            return
+        rows = self._try_execute("SELECT MAX(id) FROM agent_memory", (), fetch=True, retries=1)
+        if rows and self.hot.stale(rows[0][0]):
+            self.warm_hot_tier()
+
+    def load_recent_qa_many(self, agent_names: Iterable[Optional[str]], limit: int = 10) -> Dict[str, List[dict]]:
+        """Batched `load_recent_qa`: one query for several agents (None = group).
+
+        Returns {agent_name: [{'q', 'a', 'ts'}, ...]} keyed like the table
+        (`__group__` for the group). Each agent gets its own indexed
+        `LIMIT` branch of a UNION ALL (`migrations.recent_rows_sql`); agents with no QA rows
+        fall back to their legacy `memory_text` entries, as `load_recent_qa`
+        does, with a second query only for them. Served from the ring
+        buffers without SQL when they are warm.
+        """
+        keys = list(dict.fromkeys(GROUP_KEY if n is None else n for n in agent_names))
+        if not keys:
+            return {}
+        self._refresh_hot_tier()
+        cached = {k: self.hot.get(k, limit) for k in keys}
+        if all(v is not None for v in cached.values()):
+            return cached
+        qa, legacy = self._load_recent(keys, limit, lambda sql, params: self._try_execute(sql, params, fetch=True, retries=1))
+        return {k: qa.get(k) or legacy.get(k, []) for k in keys}
+
+    def snapshot(self, agent_names: Iterable[Optional[str]], limit: int = 10) -> MemorySnapshot:
+        """Load recent QA for `agent_names` and the group in a single query."""
+        return MemorySnapshot(self.load_recent_qa_many(list(agent_names) + [None], limit=limit), semantic=self.semantic, keyword=self.keyword, summaries=self.summaries)
+
+    def enable_semantic_memory(self, warm_rows: Optional[int] = None, index_path: Optional[str] = None, **kwargs) -> SemanticMemoryIndex:
+        """Rank injected memories by relevance to the query (see `semantic_memory.py`).
+
+        The newest `warm_rows` QA pairs per agent (`SEMANTIC_MEMORY_WARM_ROWS`,
+        default 500) are indexed in the background, reusing vectors from the
+        backfilled index at `index_path` (`SEMANTIC_MEMORY_INDEX`, see
+        `scripts/backfill_embeddings.py`) and embedding the rest. Later
+        `save_qa` calls are embedded as they are written.
+        """
+        if self.semantic is not None:
+            return self.semantic
+        self.semantic = SemanticMemoryIndex(**kwargs)
+        if warm_rows is None:
+            warm_rows = int(os.getenv("SEMANTIC_MEMORY_WARM_ROWS", "500"))
+        index_path = index_path or os.getenv("SEMANTIC_MEMORY_INDEX")
+        if warm_rows > 0 and self._connected:
+            sql = (
+                "SELECT id, agent_name, question, answer, timestamp FROM ("
+                " SELECT id, agent_name, question, answer, timestamp,"
+                " ROW_NUMBER() OVER (PARTITION BY agent_name ORDER BY timestamp DESC, id DESC) AS rn"
+                " FROM agent_memory WHERE question IS NOT NULL OR answer IS NOT NULL"
+                ") ranked WHERE rn <= %s ORDER BY timestamp ASC, id ASC"
+            )
+            rows = self._try_execute(sql, (warm_rows,), fetch=True, retries=1)
+            store = self._open_embedding_store(index_path) if index_path else None
+            vectors = [store.vector(rid) for rid, *_ in rows] if store is not None else None
+            self.semantic.add_many([(agent, q or "", a or "", ts) for _, agent, q, a, ts in rows], vectors)
+        return self.semantic
+
+    def _open_embedding_store(self, index_path: str) -> Optional[EmbeddingStore]:
+        """The backfilled store at `index_path`, or None if it is unreadable or built with another model."""
+        import logging
+        logger = logging.getLogger(__name__)
+        try:
+            store = EmbeddingStore(index_path).load()
+        except ValueError as e:
+            logger.warning(f"[MemoryDB] Ignoring embedding index: {e}")
+            return None
+        # vectors from another model are not comparable, even at the same dimension
+        model = getattr(self.semantic.embedder, "model_name", None)
+        if store.state.get("model") != model:
+            logger.warning(f"[MemoryDB] Ignoring embedding index at {index_path}: built with "
+                           f"{store.state.get('model')}, semantic memory uses {model}")
+            return None
+        return store
+
+    def disable_semantic_memory(self) -> None:
+        self.semantic = None
+
+    def enable_keyword_memory(self, background: bool = True) -> KeywordMemoryIndex:
+        """Rank injected memories with BM25 (see `keyword_memory.py`); no model needed.
+
+        The index is rebuilt from every QA row in the table (keyset pages
+        over `id`), on a background thread unless `background=False`; until
+        then prompts use recent memories. `save_qa` keeps it up to date.
+        """
+        if self.keyword is not None:
+            return self.keyword
+        self.keyword = KeywordMemoryIndex()
+        if self._connected:
+            self.keyword.ready = False
+            if background:
+                threading.Thread(target=self._rebuild_keyword_index, args=(self.keyword,), name="keyword-index", daemon=True).start()
+            else:
+                self._rebuild_keyword_index(self.keyword)
+        return self.keyword
+
+    def _rebuild_keyword_index(self, index: KeywordMemoryIndex, page_size: int = 10000) -> None:
+        import logging
+        import time
+        started = time.monotonic()
+        # rows saved after this point reach the index through save_qa
+        top = self._try_execute("SELECT COALESCE(MAX(id), 0) FROM agent_memory", fetch=True)
+        upper = top[0][0] if top else 0
+        sql = ("SELECT id, agent_name, question, answer, timestamp FROM agent_memory "
+               "WHERE id > %s AND id <= %s AND (question IS NOT NULL OR answer IS NOT NULL) ORDER BY id LIMIT %s")
+        after_id, total = 0, 0
+        try:
+            while True:
+                rows = self._try_execute(sql, (after_id, upper, page_size), fetch=True)
+                if not rows:
+                    break
+                index.add_many([(agent, q, a, ts) for _, agent, q, a, ts in rows])
+                total += len(rows)
+                after_id = rows[-1][0]
+        finally:
+            index.ready = True
+        logging.getLogger(__name__).info(f"[MemoryDB] Keyword index rebuilt from {total} rows in {time.monotonic() - started:.1f}s")
+
+    def disable_keyword_memory(self) -> None:
+        self.keyword = None
+
+    def relevant_qa(self, agent_name: Optional[str], query: str, limit: int = 3) -> Optional[List[dict]]:
+        """Most relevant QA pairs for `query` (semantic, else BM25), or None to fall back to recency."""
+        return _relevant(self.semantic, self.keyword, agent_name, query, limit)
+
+    _SUMMARIES_KEPT = 3
+
+    def refresh_summaries(self) -> None:
+        """Reload the newest summaries per agent into memory (one windowed query)."""
+        sql = (
+            "SELECT agent_name, summary, first_ts, last_ts, row_count FROM ("
+            "SELECT agent_name, summary, first_ts, last_ts, row_count, "
+            "ROW_NUMBER() OVER (PARTITION BY agent_name ORDER BY last_ts DESC, id DESC) AS rn "
+            "FROM memory_summaries) ranked WHERE rn <= %s ORDER BY agent_name, rn"
+        )
+        rows = self._try_execute(sql, (self._SUMMARIES_KEPT,), fetch=True, retries=1)
+        summaries: Dict[str, List[dict]] = {}
+        for agent_name, summary, first_ts, last_ts, row_count in rows or []:
+            summaries.setdefault(agent_name, []).append(
+                {"summary": summary, "first_ts": first_ts, "last_ts": last_ts, "rows": row_count})
+        self.summaries = summaries
+
+    def load_summaries(self, agent_name: Optional[str] = None, limit: int = 2) -> List[dict]:
+        """Newest conversation summaries for an agent (None = group), as {'summary', 'first_ts', 'last_ts', 'rows'}."""
+        key = GROUP_KEY if agent_name is None else agent_name
+        return list(self.summaries.get(key, [])[:limit])
+
+    def save_summary(self, agent_name: str, summary: str, row_ids: List[int], first_ts=None, last_ts=None,
+                     conversations: int = 0, model: Optional[str] = None) -> None:
+        """Store a summary and mark the rows it covers as compacted, in one transaction."""
+        def op(conn):
+            cur = conn.cursor()
+            try:
+                conn.start_transaction()
+                cur.execute(
+                    "INSERT INTO memory_summaries (agent_name, summary, row_count, conversations, first_id, last_id, "
+                    "first_ts, last_ts, model) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                    (agent_name, summary, len(row_ids), conversations, min(row_ids), max(row_ids), first_ts, last_ts, model),
+                )
+                cur.execute(f"UPDATE agent_memory SET compacted=1 WHERE id IN ({', '.join(['%s'] * len(row_ids))})", tuple(row_ids))
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+            finally:
+                cur.close()
+
+        self.pool.run(op)
+        entry = {"summary": summary, "first_ts": first_ts, "last_ts": last_ts, "rows": len(row_ids)}
+        kept = sorted(self.summaries.get(agent_name, []) + [entry], key=lambda s: s["last_ts"] or datetime.min, reverse=True)
+        # replace rather than mutate so snapshots already handed out stay consistent
+        self.summaries = {**self.summaries, agent_name: kept[:self._SUMMARIES_KEPT]}
+
+    def mark_compacted(self, row_ids: List[int]) -> None:
+        """Flag rows as compacted without a summary (nothing in them worth keeping)."""
+        if row_ids:
+            self._try_execute(f"UPDATE agent_memory SET compacted=1 WHERE id IN ({', '.join(['%s'] * len(row_ids))})",
+                              tuple(row_ids), retries=1)
+
+    def enable_compaction(self, summarizer=None, interval_s: Optional[float] = None,
+                          min_age_days: Optional[float] = None):
+        """Start background summarization of old memories (see `compaction.py`).
+
+        `summarizer(agent_name, [(q, a), ...]) -> str` defaults to an
+        `OllamaSummarizer` on `COMPACTION_HOST` / `COMPACTION_MODEL`; without
+        one configured this logs a warning and returns None.
+        """
+        from compaction import CompactionJob, CompactionWorker, OllamaSummarizer
+
+        if self.compactor is not None:
+            return self.compactor
+        summarizer = summarizer or OllamaSummarizer.from_env()
+        if summarizer is None:
+            import logging
+            logging.getLogger(__name__).warning("[MemoryDB] Compaction needs COMPACTION_HOST and COMPACTION_MODEL")
+            return None
+        job = CompactionJob(
+            self,
+            summarizer,
+            min_age_days=min_age_days if min_age_days is not None else float(os.getenv("COMPACTION_MIN_AGE_DAYS", "7")),
+        )
+        self.compactor = CompactionWorker(
+            job, interval_s=interval_s if interval_s is not None else float(os.getenv("COMPACTION_INTERVAL_S", "3600"))
+        ).start()
+        return self.compactor
+
+    def disable_compaction(self) -> None:
+        compactor, self.compactor = self.compactor, None
+        if compactor is not None:
+            compactor.stop()
+
     def get_recent_memories(self, agent_name: Optional[str] = None, limit: int = 10) -> List[str]:
         """
         If agent_name is provided, return recent memories for that agent.
@@ -202,28 +704,286 @@ class MemoryDB:
             })
         return result
 
+    def search(self, text: str, agent: Optional[str] = None, limit: int = 20,
+               cursor: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+        """Full-text search over question/answer, newest first.
+
+        Uses the `ft_qa` FULLTEXT index (migration 4); every word must match
+        (as a prefix). `agent` restricts to one agent or `__group__`; None
+        searches all. Pages are keyset-paginated on `id`: pass the returned
+        cursor back to get the next page; it is None after the last page.
+
+        Returns (rows, next_cursor) with rows shaped like `fetch_recent_rows`.
+        """
+        query = fulltext_query(text)
+        if not query or limit <= 0:
+            return [], None
+        sql = ("SELECT id, agent_name, question, answer, conv_id, timestamp FROM agent_memory "
+               "WHERE MATCH(question, answer) AGAINST (%s IN BOOLEAN MODE)")
+        params: list = [query]
+        if agent is not None:
+            sql += " AND agent_name=%s"
+            params.append(agent)
+        if cursor is not None:
+            sql += " AND id < %s"
+            params.append(int(cursor))
+        # one extra row tells us whether another page exists
+        sql += " ORDER BY id DESC LIMIT %s"
+        params.append(limit + 1)
+        rows = self._try_execute(sql, tuple(params), fetch=True, retries=1) or []
+        result = [
+            {"id": rid, "agent_name": agent_name, "question": q, "answer": a, "conv_id": conv, "timestamp": ts}
+            for rid, agent_name, q, a, conv, ts in rows[:limit]
+        ]
+        next_cursor = result[-1]["id"] if len(rows) > limit else None
+        return result, next_cursor
+
+    def iter_export_rows(self, agent: Optional[str] = None, conv_id: Optional[str] = None,
+                         chunk_size: int = 5000, after_id: int = 0,
+                         before: Optional[datetime] = None) -> Iterator[tuple]:
+        """Yield rows (`EXPORT_COLUMNS` order) in id order, optionally for one agent or conversation.
+
+        `before` keeps only rows with an older timestamp (retention archives).
+
+        Each chunk is one `WHERE id > last_id ORDER BY id LIMIT chunk_size`
+        query read through an unbuffered cursor; the pooled connection is
+        returned before the chunk is yielded, so holding the generator open
+        pins neither a connection nor more than one chunk of rows. Unlike
+        `_try_execute`, errors propagate: a failed export must not look complete.
+        """
+        sql = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM agent_memory WHERE id > %s"
+        filters: list = []
+        if agent is not None:
+            sql += " AND agent_name=%s"
+            filters.append(agent)
+        if conv_id is not None:
+            sql += " AND conv_id=%s"
+            filters.append(conv_id)
+        if before is not None:
+            sql += " AND timestamp < %s"
+            filters.append(before)
+        sql += " ORDER BY id LIMIT %s"
+
+        def read_chunk(conn, params):
+            cur = conn.cursor(buffered=False)
+            try:
+                cur.execute(sql, params)
+                rows = []
+                while True:
+                    batch = cur.fetchmany(1000)
+                    if not batch:
+                        return rows
+                    rows.extend(batch)
+            finally:
+                cur.close()
+
+        last_id = after_id
+        while True:
+            params = (last_id, *filters, chunk_size)
+            chunk = self.pool.run(lambda conn, params=params: read_chunk(conn, params))
+            if not chunk:
+                return
+            yield from chunk
+            if len(chunk) < chunk_size:
+                return
+            last_id = chunk[-1][0]
+
+    def export(self, out, fmt: str = "csv", agent: Optional[str] = None, conv_id: Optional[str] = None,
+               chunk_size: int = 5000) -> int:
+        """Stream rows to `out` as csv, jsonl or json, or parquet; returns the row count.
+
+        `out` is a path or text file object; for `parquet` it is the archive
+        directory (see `memory_parquet.py`, needs pyarrow). Queued
+        write-behind rows are flushed first so they are included.
+        """
+        self.flush()
+        rows = self.iter_export_rows(agent=agent, conv_id=conv_id, chunk_size=chunk_size)
+        if fmt == "parquet":
+            from memory_parquet import write_parquet
+            return write_parquet(rows, os.fspath(out))["rows"]
+        if hasattr(out, "write"):
+            return write_rows(rows, out, fmt)
+        with open(out, "w", encoding="utf-8", newline="") as f:
+            return write_rows(rows, f, fmt)
+
+    def import_rows(self, rows: Iterable[tuple], batch_size: int = 1000, keep_ids: bool = False,
+                    progress: Optional[Callable[[int], None]] = None) -> int:
+        """Bulk-insert exported rows (`EXPORT_COLUMNS` order) and return how many were written.
+
+        Rows go in with `executemany` (a multi-row INSERT per batch), one
+        transaction per batch; `memory_text` is rebuilt the way `save_qa`
+        writes it and rows without a timestamp get the current time.
+        `keep_ids=True` restores the original ids, e.g. into an emptied
+        table. `progress(total)` is called after each batch. The recent-QA
+        buffer is re-warmed afterwards; the semantic / keyword indexes only
+        see imported rows after a rebuild.
+        """
+        self.flush()
+        columns = "agent_name, memory_text, question, answer, conv_id, timestamp"
+        placeholders = "%s, %s, %s, %s, %s, COALESCE(%s, CURRENT_TIMESTAMP)"
+        if keep_ids:
+            columns = "id, " + columns
+            placeholders = "%s, " + placeholders
+        sql = f"INSERT INTO agent_memory ({columns}) VALUES ({placeholders})"
+
+        def op(conn, batch):
+            cur = conn.cursor()
+            try:
+                conn.start_transaction()
+                cur.executemany(sql, batch)
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+            finally:
+                cur.close()
+
+        total = 0
+        batch: List[tuple] = []
+
+        def write():
+            nonlocal total, batch
+            self.pool.run(lambda conn: op(conn, batch))
+            total += len(batch)
+            batch = []
+            if progress is not None:
+                progress(total)
+
+        for rid, agent_name, q, a, conv_id, ts in rows:
+            values = (agent_name, f"Q: {q or ''} A: {a or ''}", q, a, conv_id or None, ts or None)
+            if keep_ids:
+                if rid is None:
+                    raise ValueError("keep_ids needs an export with an id column")
+                values = (rid,) + values
+            batch.append(values)
+            if len(batch) >= batch_size:
+                write()
+        if batch:
+            write()
+        if total and self.hot.size > 0:
+            self.warm_hot_tier()
+        return total
+
+    def load_csv_infile(self, path: str, keep_ids: bool = False) -> int:
+        """Load a CSV export server-side with `LOAD DATA LOCAL INFILE`; returns the rows loaded.
+
+        Much faster than INSERTs for large files, but needs `local_infile=ON`
+        on the server. Uses its own connection (the pool does not enable
+        local infile). Columns are matched by the file's header, so CSVs
+        without `id` work unless `keep_ids` is set.
+        """
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f), [])
+        if "agent_name" not in header:
+            raise ValueError(f"{path} is not a memory CSV export (no agent_name column)")
+        if keep_ids and "id" not in header:
+            raise ValueError("keep_ids needs an export with an id column")
+        # every file column goes into a user variable; missing ones read as NULL
+        names = [f"@{c}" if c in EXPORT_COLUMNS else "@unused" for c in header]
+        assignments = [
+            "agent_name = @agent_name",
+            "question = COALESCE(@question, '')",
+            "answer = COALESCE(@answer, '')",
+            "memory_text = CONCAT('Q: ', COALESCE(@question, ''), ' A: ', COALESCE(@answer, ''))",
+            "conv_id = NULLIF(@conv_id, '')",
+            "timestamp = COALESCE(NULLIF(@timestamp, ''), CURRENT_TIMESTAMP)",
+        ]
+        if keep_ids:
+            assignments.insert(0, "id = @id")
+        # csv.writer quotes with doubled quotes and ends lines with \r\n
+        sql = (
+            "LOAD DATA LOCAL INFILE %s INTO TABLE agent_memory CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            "LINES TERMINATED BY '\\r\\n' IGNORE 1 LINES "
+            f"({', '.join(names)}) SET {', '.join(assignments)}"
+        )
+        self.flush()
+        conn = mysql.connector.connect(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            autocommit=True,
+            allow_local_infile=True,
+            allow_local_infile_in_path=os.path.dirname(os.path.abspath(path)),
+        )
+        try:
+            cur = conn.cursor()
+            cur.execute(sql, (os.path.abspath(path),))
+            loaded = cur.rowcount
+            cur.close()
+        finally:
+            conn.close()
+        if loaded and self.hot.size > 0:
+            self.warm_hot_tier()
+        return loaded
+
+    @contextmanager
+    def deferred_indexes(self) -> Iterator[List[str]]:
+        """Drop agent_memory's secondary indexes for a bulk load and rebuild them on exit.
+
+        Index maintenance per row is what makes big restores slow; building
+        each index once afterwards is much cheaper. Queries that need the
+        indexes are slow until the block exits.
+        """
+        with self.cursor() as cur:
+            dropped = migrations.drop_secondary_indexes(cur)
+        try:
+            yield dropped
+        finally:
+            with self.cursor() as cur:
+                migrations.create_secondary_indexes(cur, dropped)
+
     def save_group_memory(self, memory_text: str):
         """Save a memory entry into the group memory bucket."""
         GROUP_KEY = "__group__"
         self.save_memory(GROUP_KEY, memory_text)
 
     def clear_memory(self, agent_name: str):
+        self.flush()
         sql = "DELETE FROM agent_memory WHERE agent_name=%s"
         self._try_execute(sql, (agent_name,), fetch=False, retries=1)
+        self._try_execute("DELETE FROM memory_summaries WHERE agent_name=%s", (agent_name,), fetch=False, retries=1)
+        self.summaries = {k: v for k, v in self.summaries.items() if k != agent_name}
+        self.hot.drop(agent_name)
+        if self.semantic is not None:
+            self.semantic.drop(agent_name)
+        if self.keyword is not None:
+            self.keyword.drop(agent_name)
 
     def clear_all(self):
+        self.flush()
         sql = "TRUNCATE TABLE agent_memory"
         self._try_execute(sql, (), fetch=False, retries=1)
+        self._try_execute("TRUNCATE TABLE memory_summaries", (), fetch=False, retries=1)
+        self.summaries = {}
+        self.hot.clear()
+        if self.semantic is not None:
+            self.semantic.clear()
+        if self.keyword is not None:
+            self.keyword.clear()
 
     def is_connected(self) -> bool:
+        """True when a pooled connection can be checked out and is alive.
+
+        Returns False without dialling MySQL once a connection attempt has
+        failed; the next successful `_try_execute` marks the store connected again.
+        """
+        if not self._connected:
+            return False
         try:
-            return self.conn is not None and self.conn.is_connected()
-        except:
+            return bool(self.pool.run(lambda conn: conn.is_connected()))
+        except Exception:
             return False
 
+    def pool_stats(self) -> Dict[str, float]:
+        return self.pool.stats()
+
     def close(self):
-        try:
-            if self.cursor: self.cursor.close()
-            if self.conn: self.conn.close()
-        except Error:
-            pass
+        self.disable_compaction()
+        self.disable_write_behind()
+        self.pool.close()
@@ -0,0 +1,173 @@
+"""Incremental CSV / JSON Lines / JSON writers and readers for `agent_memory` exports.
+
+Rows come from `MemoryDB.iter_export_rows`, which reads the table in
+keyset-paginated chunks, and are written as they arrive, so peak memory
+depends on the chunk size, not on the table size. `write_rows` targets a
+text file or stream.
+
+`iter_file_rows` reads an export back (for `MemoryDB.import_rows`), also
+one record at a time. It accepts older exports too: CSVs without the `id`
+column and JSON from the sidebar's per-agent export (`q` / `a` / `ts`).
+"""
+
+import csv
+import json
+import os
+from datetime import datetime
+from typing import IO, Iterable, Iterator, Optional
+
+EXPORT_COLUMNS = ("id", "agent_name", "question", "answer", "conv_id", "timestamp")
+
+FORMATS = ("csv", "jsonl", "json")
+
+MIME_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "json": "application/json"}
+
+_TS_COL = EXPORT_COLUMNS.index("timestamp")
+
+
+def _ts(value) -> str:
+    if value is None:
+        return ""
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def _record(row: tuple) -> dict:
+    rec = dict(zip(EXPORT_COLUMNS, row))
+    rec["timestamp"] = _ts(rec.get("timestamp")) or None
+    return rec
+
+
+class _Writer:
+    """Formats one row at a time; `header()` / `footer()` wrap the stream."""
+
+    def __init__(self, out: IO[str], fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+        self.out = out
+        self.fmt = fmt
+        self.count = 0
+        self._csv = csv.writer(out) if fmt == "csv" else None
+
+    def header(self) -> None:
+        if self.fmt == "csv":
+            self._csv.writerow(EXPORT_COLUMNS)
+        elif self.fmt == "json":
+            self.out.write("[")
+
+    def row(self, row: tuple) -> None:
+        if self.fmt == "csv":
+            self._csv.writerow([_ts(v) if i == _TS_COL else ("" if v is None else v) for i, v in enumerate(row)])
+        elif self.fmt == "jsonl":
+            self.out.write(json.dumps(_record(row), ensure_ascii=False, default=str))
+            self.out.write("\n")
+        else:
+            self.out.write(",\n" if self.count else "\n")
+            self.out.write(json.dumps(_record(row), ensure_ascii=False, default=str))
+        self.count += 1
+
+    def footer(self) -> None:
+        if self.fmt == "json":
+            self.out.write("\n]\n" if self.count else "]\n")
+
+
+def write_rows(rows: Iterable[tuple], out: IO[str], fmt: str = "csv") -> int:
+    """Write `rows` (in `EXPORT_COLUMNS` order) to a text stream; returns the row count."""
+    writer = _Writer(out, fmt)
+    writer.header()
+    for row in rows:
+        writer.row(row)
+    writer.footer()
+    return writer.count
+
+
+def detect_format(path: str) -> str:
+    """Export format from the path: a directory or `.parquet` is parquet, else the extension."""
+    if os.path.isdir(path):
+        return "parquet"
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    if ext == "ndjson":
+        return "jsonl"
+    if ext not in FORMATS + ("parquet",):
+        raise ValueError(f"cannot tell the export format of {path!r}")
+    return ext
+
+
+def _parse_ts(value) -> Optional[datetime]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _from_record(rec: dict) -> tuple:
+    rid = rec.get("id")
+    return (
+        int(rid) if rid not in (None, "") else None,
+        rec.get("agent_name") or rec.get("agent") or "__group__",
+        rec.get("question", rec.get("q")) or "",
+        rec.get("answer", rec.get("a")) or "",
+        rec.get("conv_id") or rec.get("conv") or None,
+        _parse_ts(rec.get("timestamp", rec.get("ts"))),
+    )
+
+
+def _iter_json_array(f: IO[str], chunk_chars: int = 1 << 16) -> Iterator[dict]:
+    # incremental decode of a top-level JSON array, one element at a time
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if not started and pos < len(buf):
+            if buf[pos] != "[":
+                raise ValueError("JSON export must be an array of records")
+            started = True
+            pos += 1
+            continue
+        if started and pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield obj
+                pos = end
+                continue
+        if eof:
+            if started:
+                raise ValueError("JSON export ends before its closing ']'")
+            return
+        chunk = f.read(chunk_chars)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def iter_file_rows(path: str, fmt: Optional[str] = None) -> Iterator[tuple]:
+    """Yield rows in `EXPORT_COLUMNS` order from an export file; `id` is None if the file has none."""
+    fmt = fmt or detect_format(path)
+    if fmt == "parquet":
+        from memory_parquet import iter_parquet_rows
+        yield from iter_parquet_rows(path)
+        return
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            for rec in csv.DictReader(f):
+                yield _from_record(rec)
+        elif fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    yield _from_record(json.loads(line))
+        else:
+            for rec in _iter_json_array(f):
+                yield _from_record(rec)
@@ -0,0 +1,86 @@
+"""Background MemoryDB initialisation for the Streamlit app.
+
+Constructing a connected `MemoryDB` can block for the full connection timeout
+when MySQL is slow or down. `MemoryDBLoader` does it on a daemon thread and
+retries with exponential backoff, so the first page renders immediately and
+chats simply run without memory until `on_ready` hands the store over.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from memory import MemoryDB
+
+CONNECTING = "connecting"
+RETRYING = "retrying"
+READY = "ready"
+STOPPED = "stopped"
+
+
+class MemoryDBLoader:
+    def __init__(self,
+                 on_ready: Optional[Callable[[MemoryDB], None]] = None,
+                 factory: Callable[[], MemoryDB] = lambda: MemoryDB(connect=False),
+                 initial_backoff_s: float = 1.0,
+                 max_backoff_s: float = 60.0):
+        self.on_ready = on_ready
+        self.factory = factory
+        self.initial_backoff_s = initial_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.state = CONNECTING
+        self.db: Optional[MemoryDB] = None
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.next_retry_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.logger = logging.getLogger(__name__)
+
+    def start(self) -> "MemoryDBLoader":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="memory-db-loader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the store is ready (tests, scripts). Returns True when ready."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.state != READY:
+            if self._stop.is_set() or (deadline is not None and time.monotonic() >= deadline):
+                return False
+            time.sleep(0.05)
+        return True
+
+    def retry_in(self) -> Optional[float]:
+        if self.next_retry_at is None:
+            return None
+        return max(0.0, self.next_retry_at - time.monotonic())
+
+    def _run(self) -> None:
+        backoff = self.initial_backoff_s
+        while not self._stop.is_set():
+            self.attempts += 1
+            try:
+                if self.db is None:
+                    self.db = self.factory()
+                if self.db.connect():
+                    self.state = READY
+                    self.next_retry_at = None
+                    self.logger.info(f"[MemoryDB] Ready after {self.attempts} attempt(s)")
+                    if self.on_ready is not None:
+                        self.on_ready(self.db)
+                    return
+                self.last_error = "MySQL is not reachable"
+            except Exception as e:
+                self.last_error = str(e)
+            self.state = RETRYING
+            self.next_retry_at = time.monotonic() + backoff
+            self.logger.warning(f"[MemoryDB] Connect attempt {self.attempts} failed ({self.last_error}); retrying in {backoff:.0f}s")
+            self._stop.wait(backoff)
+            backoff = min(self.max_backoff_s, backoff * 2)
+        self.state = STOPPED
@@ -0,0 +1,137 @@
+"""Parquet archives of `agent_memory` rows (optional, needs pyarrow).
+
+`write_parquet` consumes rows from `MemoryDB.iter_export_rows` one batch at
+a time and appends each batch as a row group, so memory stays bounded by
+`batch_rows` however large the table is. Output is partitioned by day
+(hive style: `<dir>/date=YYYY-MM-DD/part-<run>-<n>.parquet`); `agent_name` and
+`conv_id` are dictionary-encoded and every column is compressed (zstd by
+default). Each export run writes its own part files, so repeated backups
+into one directory never overwrite each other. Rows arrive in id order, so
+days are nearly sequential; at most `max_open_files` day writers stay
+open and a day seen again after its writer was closed gets another part.
+
+`iter_parquet_rows` reads a file or archive directory back as tuples in
+`EXPORT_COLUMNS` order, ready for `MemoryDB.import_rows`.
+"""
+
+import os
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List
+
+from memory_export import EXPORT_COLUMNS
+
+PARTITION_COLUMN = "date"
+# partition for rows without a usable timestamp
+UNDATED = "unknown"
+DICTIONARY_COLUMNS = ["agent_name", "conv_id"]
+_TS_COL = EXPORT_COLUMNS.index("timestamp")
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.int64()),
+        ("agent_name", pa.dictionary(pa.int32(), pa.string())),
+        ("question", pa.string()),
+        ("answer", pa.string()),
+        ("conv_id", pa.dictionary(pa.int32(), pa.string())),
+        ("timestamp", pa.timestamp("us")),
+    ])
+
+
+def _partition(ts) -> str:
+    if isinstance(ts, datetime):
+        return ts.date().isoformat()
+    if isinstance(ts, date):
+        return ts.isoformat()
+    return UNDATED
+
+
+def _table(rows: List[tuple], schema):
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    arrays = []
+    for values, field in zip(columns, schema):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(rows: Iterable[tuple], out_dir: str, batch_rows: int = 50000, compression: str = "zstd",
+                  max_open_files: int = 16) -> Dict[str, int]:
+    """Write `rows` (in `EXPORT_COLUMNS` order) as a date-partitioned Parquet archive.
+
+    Returns {'rows', 'files', 'row_groups'}.
+    """
+    import pyarrow.parquet as pq
+
+    schema = _schema()
+    run = uuid.uuid4().hex[:12]
+    writers: "OrderedDict[str, object]" = OrderedDict()
+    parts: Dict[str, int] = {}
+    stats = {"rows": 0, "files": 0, "row_groups": 0}
+
+    def write_batch(batch: List[tuple]) -> None:
+        by_day: Dict[str, List[tuple]] = {}
+        for row in batch:
+            by_day.setdefault(_partition(row[_TS_COL]), []).append(row)
+        for day, day_rows in by_day.items():
+            writer = writers.get(day)
+            if writer is not None:
+                writers.move_to_end(day)
+            else:
+                if len(writers) >= max_open_files:
+                    writers.popitem(last=False)[1].close()
+                part_dir = os.path.join(out_dir, f"{PARTITION_COLUMN}={day}")
+                os.makedirs(part_dir, exist_ok=True)
+                part = parts[day] = parts.get(day, -1) + 1
+                writer = writers[day] = pq.ParquetWriter(
+                    os.path.join(part_dir, f"part-{run}-{part}.parquet"),
+                    schema,
+                    compression=compression,
+                    use_dictionary=DICTIONARY_COLUMNS,
+                )
+                stats["files"] += 1
+            writer.write_table(_table(day_rows, schema), row_group_size=len(day_rows))
+            stats["row_groups"] += 1
+        stats["rows"] += len(batch)
+
+    try:
+        batch: List[tuple] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                write_batch(batch)
+                batch = []
+        if batch:
+            write_batch(batch)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return stats
+
+
+def parquet_files(path: str) -> List[str]:
+    """`path` itself if it is a file, else every `.parquet` file under it in partition order."""
+    if os.path.isfile(path):
+        return [path]
+    found = []
+    for root, _, files in os.walk(path):
+        found.extend(os.path.join(root, f) for f in files if f.endswith(".parquet"))
+    return sorted(found)
+
+
+def iter_parquet_rows(path: str, batch_rows: int = 50000) -> Iterator[tuple]:
+    """Yield rows in `EXPORT_COLUMNS` order from a Parquet file or archive directory."""
+    import pyarrow.parquet as pq
+
+    for file in parquet_files(path):
+        for batch in pq.ParquetFile(file).iter_batches(batch_size=batch_rows, columns=list(EXPORT_COLUMNS)):
+            data = batch.to_pydict()
+            yield from zip(*(data[c] for c in EXPORT_COLUMNS))
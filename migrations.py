@@ -0,0 +1,281 @@
+"""Versioned schema migrations for the memory database.
+
+Applied steps are recorded in a `schema_version` table, so `MemoryDB()` only
+runs the steps that are still pending (normally none: one `SELECT`). Each
+process checks a given database once. Steps run under a MySQL named lock so
+concurrent sessions don't migrate twice.
+
+To change the schema, append a `Migration` to `MIGRATIONS` with the next
+version number; never edit a step that has shipped.
+
+`explain_hot_queries` reports the plans of the queries on the hot path
+(`scripts/check_query_plans.py` prints them) and flags full scans and
+filesorts.
+"""
+
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = "perry_schema_migrations"
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[object], None]  # receives a cursor
+
+
+def _column_exists(cur, table: str, column: str) -> bool:
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column),
+    )
+    return cur.fetchone()[0] > 0
+
+
+def _index_exists(cur, table: str, index: str) -> bool:
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, index),
+    )
+    return cur.fetchone()[0] > 0
+
+
+def _create_agent_memory(cur) -> None:
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS agent_memory (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            agent_name VARCHAR(100) NOT NULL,
+            memory_text TEXT,
+            question TEXT,
+            answer TEXT,
+            conv_id VARCHAR(128),
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _add_qa_columns(cur) -> None:
+    # tables created before structured QA storage only have memory_text
+    for column, ddl in (("question", "TEXT"), ("answer", "TEXT"), ("conv_id", "VARCHAR(128)")):
+        if not _column_exists(cur, "agent_memory", column):
+            cur.execute(f"ALTER TABLE agent_memory ADD COLUMN {column} {ddl}")
+
+
+def _add_lookup_indexes(cur) -> None:
+    # load_recent_qa / snapshots / clear_memory filter on agent_name and sort by timestamp;
+    # conversation exports filter on conv_id and sort by timestamp
+    for index, columns in (("idx_agent_ts", "agent_name, timestamp"), ("idx_conv_ts", "conv_id, timestamp")):
+        if not _index_exists(cur, "agent_memory", index):
+            cur.execute(f"CREATE INDEX {index} ON agent_memory ({columns})")
+
+
+def _add_fulltext_index(cur) -> None:
+    # MemoryDB.search: MATCH(question, answer) instead of LIKE '%...%' scans
+    if not _index_exists(cur, "agent_memory", "ft_qa"):
+        cur.execute("CREATE FULLTEXT INDEX ft_qa ON agent_memory (question, answer)")
+
+
+def _create_rollup_table(cur) -> None:
+    # per-agent, per-day counts of rows removed by retention (see retention.py)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS agent_memory_rollup (
+            agent_name VARCHAR(100) NOT NULL,
+            day DATE NOT NULL,
+            row_count INT NOT NULL,
+            first_ts TIMESTAMP NULL,
+            last_ts TIMESTAMP NULL,
+            PRIMARY KEY (agent_name, day)
+        )
+    """)
+
+
+def _add_compaction(cur) -> None:
+    # compaction.py: summaries of old rows, and a flag on the rows they cover
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS memory_summaries (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            agent_name VARCHAR(100) NOT NULL,
+            summary TEXT NOT NULL,
+            row_count INT NOT NULL,
+            conversations INT NOT NULL,
+            first_id INT NOT NULL,
+            last_id INT NOT NULL,
+            first_ts TIMESTAMP NULL,
+            last_ts TIMESTAMP NULL,
+            model VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_summary_agent_ts (agent_name, last_ts)
+        )
+    """)
+    if not _column_exists(cur, "agent_memory", "compacted"):
+        cur.execute("ALTER TABLE agent_memory ADD COLUMN compacted TINYINT(1) NOT NULL DEFAULT 0")
+    if not _index_exists(cur, "agent_memory", "idx_agent_compacted_ts"):
+        cur.execute("CREATE INDEX idx_agent_compacted_ts ON agent_memory (agent_name, compacted, timestamp)")
+
+
+# secondary indexes on agent_memory as created above; bulk restores drop and rebuild them
+SECONDARY_INDEXES: Dict[str, str] = {
+    "idx_agent_ts": "CREATE INDEX idx_agent_ts ON agent_memory (agent_name, timestamp)",
+    "idx_conv_ts": "CREATE INDEX idx_conv_ts ON agent_memory (conv_id, timestamp)",
+    "ft_qa": "CREATE FULLTEXT INDEX ft_qa ON agent_memory (question, answer)",
+    "idx_agent_compacted_ts": "CREATE INDEX idx_agent_compacted_ts ON agent_memory (agent_name, compacted, timestamp)",
+}
+
+
+def drop_secondary_indexes(cur) -> List[str]:
+    """Drop the secondary indexes that exist and return their names."""
+    dropped = [name for name in SECONDARY_INDEXES if _index_exists(cur, "agent_memory", name)]
+    if dropped:
+        cur.execute("ALTER TABLE agent_memory " + ", ".join(f"DROP INDEX {name}" for name in dropped))
+    return dropped
+
+
+def create_secondary_indexes(cur, names=None) -> None:
+    """(Re)create the named secondary indexes (default: all) that are missing."""
+    for name in names if names is not None else SECONDARY_INDEXES:
+        if not _index_exists(cur, "agent_memory", name):
+            logger.info(f"[MemoryDB] Building index {name}")
+            cur.execute(SECONDARY_INDEXES[name])
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create agent_memory", _create_agent_memory),
+    Migration(2, "add question/answer/conv_id columns", _add_qa_columns),
+    Migration(3, "index (agent_name, timestamp) and (conv_id, timestamp)", _add_lookup_indexes),
+    Migration(4, "FULLTEXT index on (question, answer)", _add_fulltext_index),
+    Migration(5, "create agent_memory_rollup", _create_rollup_table),
+    Migration(6, "memory_summaries table and agent_memory.compacted", _add_compaction),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+_checked: set = set()
+
+
+def current_version(cur) -> int:
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return int(cur.fetchone()[0])
+
+
+def migrate(cur, key: Optional[str] = None) -> int:
+    """Apply pending migrations and return the schema version.
+
+    `key` identifies the database (e.g. host:port/name); once a key has been
+    brought up to date in this process later calls return immediately.
+    """
+    if key is not None and key in _checked:
+        return LATEST_VERSION
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    version = current_version(cur)
+    if version < LATEST_VERSION:
+        cur.execute("SELECT GET_LOCK(%s, 30)", (LOCK_NAME,))
+        cur.fetchone()
+        try:
+            # another session may have migrated while we waited for the lock
+            version = current_version(cur)
+            for step in MIGRATIONS:
+                if step.version <= version:
+                    continue
+                logger.info(f"[MemoryDB] Applying migration {step.version}: {step.description}")
+                step.apply(cur)
+                cur.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)", (step.version, step.description))
+                version = step.version
+        finally:
+            cur.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cur.fetchone()
+    if key is not None:
+        _checked.add(key)
+    return version
+
+
+RECENT_COLUMNS = "agent_name, question, answer, memory_text, timestamp, id"
+
+
+def recent_rows_sql(n_keys: int, legacy: bool = False) -> str:
+    """One indexed `ORDER BY timestamp DESC LIMIT %s` branch per agent, joined by UNION ALL.
+
+    Each branch is a backward range scan of `idx_agent_ts` that stops after
+    `limit` rows, so the cost follows the limit, not the agent's history.
+    `legacy` selects `memory_text`-only rows instead of structured QA.
+    Params are `(agent, limit)` per branch (`recent_rows_params`). Used by
+    `MemoryDB.load_recent_qa_many` and `MemoryDB.warm_hot_tier`.
+    """
+    cond = "question IS NULL AND answer IS NULL" if legacy else "(question IS NOT NULL OR answer IS NOT NULL)"
+    branch = (f"(SELECT {RECENT_COLUMNS} FROM agent_memory WHERE agent_name=%s AND {cond} "
+              "ORDER BY timestamp DESC, id DESC LIMIT %s)")
+    return " UNION ALL ".join([branch] * n_keys)
+
+
+def recent_rows_params(keys: List[str], limit: int) -> tuple:
+    return tuple(p for key in keys for p in (key, limit))
+
+
+# name -> (SQL, sample params); mirrors the statements MemoryDB and the export scripts run
+HOT_QUERIES: Dict[str, tuple] = {
+    "load_recent_qa": (
+        "SELECT question, answer, timestamp FROM agent_memory WHERE agent_name=%s AND (question IS NOT NULL OR answer IS NOT NULL) ORDER BY timestamp DESC LIMIT %s",
+        ("__group__", 10),
+    ),
+    "recent_qa_many": (
+        recent_rows_sql(2),
+        recent_rows_params(["__group__", "__no_such_agent__"], 10),
+    ),
+    "recent_legacy_many": (
+        recent_rows_sql(2, legacy=True),
+        recent_rows_params(["__group__", "__no_such_agent__"], 10),
+    ),
+    "hot_tier_agents": (
+        "SELECT DISTINCT agent_name FROM agent_memory",
+        (),
+    ),
+    "hot_tier_max_id": (
+        "SELECT MAX(id) FROM agent_memory",
+        (),
+    ),
+    "load_memory": (
+        "SELECT memory_text FROM agent_memory WHERE agent_name=%s ORDER BY timestamp DESC LIMIT %s",
+        ("__group__", 10),
+    ),
+    "conversation_export": (
+        "SELECT id, agent_name, question, answer, conv_id, timestamp FROM agent_memory WHERE id > %s AND conv_id=%s ORDER BY id LIMIT %s",
+        (0, "00000000-0000-0000-0000-000000000000", 5000),
+    ),
+    "full_export": (
+        "SELECT id, agent_name, question, answer, conv_id, timestamp FROM agent_memory WHERE id > %s ORDER BY id LIMIT %s",
+        (0, 5000),
+    ),
+    "clear_memory": (
+        "DELETE FROM agent_memory WHERE agent_name=%s",
+        ("__no_such_agent__",),
+    ),
+}
+
+
+def explain_hot_queries(cur) -> Dict[str, dict]:
+    """Return {name: {'plan': [row dicts], 'warnings': [...]}} for `HOT_QUERIES`.
+
+    A warning is raised for full table scans (`type` ALL) and filesorts.
+    """
+    report: Dict[str, dict] = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        cur.execute("EXPLAIN " + sql, params)
+        columns = [d[0] for d in cur.description]
+        plan = [dict(zip(columns, row)) for row in cur.fetchall()]
+        warnings = []
+        for row in plan:
+            table = row.get("table")
+            if str(row.get("type") or "").upper() == "ALL":
+                warnings.append(f"full scan of {table}")
+            if "filesort" in str(row.get("Extra") or "").lower():
+                warnings.append(f"filesort on {table}")
+        report[name] = {"plan": plan, "warnings": warnings}
+    return report
@@ -5,19 +5,62 @@ This implementation supports:
 - per-agent calls via `/api/generate`
 - delegation detection ("ask <Agent> ...") with a toggle
 - persistence hooks via `memory_db.save_qa`
+- one batched memory read per chat (`MemoryDB.snapshot`) shared by every prompt
+- concurrent broadcast fan-out on a bounded worker pool (`use_concurrency`)
+- an asyncio entry point (`achat`) over `httpx.AsyncClient`
+- pooled keep-alive HTTP sessions per backend host (see `transport.py`)
+- token streaming (`chat_stream`) yielding `(agent, delta)` events
+- an optional end-to-end latency budget per request (`chat` / `chat_stream(..., deadline_s=...)`)
+- optional hedged requests to replica servers hosting the same model (`use_hedging`)
+- optional load-aware server selection per call (`use_scheduler`, see `scheduler.py`)
+- an exact-match reply cache in front of `/api/generate` (see `response_cache.py`)
+- an optional semantic cache for near-duplicate questions (see `semantic_cache.py`)
 """
 
+import asyncio
 import json
 import logging
+import os
+import queue
 import re
-import requests
+import threading
 import uuid
 import time
-from typing import Dict, List, Optional, Tuple
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from agents import Agent
+from budget import LatencyBudget
+from hedging import LatencyTracker, hedged_generate, hedged_stream
 from prompt_builder import PromptBuilder
+from response_cache import ResponseCache
+from semantic_cache import SemanticCache
 from router import Router
+from scheduler import ServerScheduler
+from server_utils import get_models_cached
+import transport
+
+# end-of-stream marker pushed by `_stream_primary` workers
+_STREAM_DONE = object()
+
+
+class ChatReplies(dict):
+    """agent -> reply mapping returned by `chat`.
+
+    `skipped_stages` maps an agent name to the stages ("primary",
+    "delegation", "rephrase", "moderator", "memory") that were skipped for its
+    reply because the request's latency budget ran out.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.skipped_stages: Dict[str, List[str]] = {}
+
+    def skip(self, agent: str, stage: str) -> None:
+        stages = self.skipped_stages.setdefault(agent, [])
+        if stage not in stages:
+            stages.append(stage)
 
 
 class MultiAgentOrchestrator:
@@ -25,6 +68,12 @@ class MultiAgentOrchestrator:
         self.agents: Dict[str, Agent] = {}
         self.moderator: Optional[Agent] = None
         self.use_moderator: bool = False
+        # Moderator quorum: summarize once N replies are in or after T seconds
+        # (None/0 for both waits for every agent, the original behaviour)
+        self.moderator_quorum: Optional[int] = None
+        self.moderator_deadline_s: Optional[float] = None
+        # Default end-to-end budget for `chat` / `chat_stream` when no `deadline_s` is passed
+        self.deadline_s: Optional[float] = None
         # Whether to ask the primary agent to rephrase/quote delegated replies
         self.use_primary_rephrase: bool = True
         self.servers: Dict[str, str] = {}
@@ -40,134 +89,118 @@ class MultiAgentOrchestrator:
         self.cooldowns: Dict[str, float] = {}
         self.cooldown_seconds: float = 30.0
         self.failure_threshold: int = 2
+        # Broadcast fan-out: call primary agents concurrently on a bounded pool
+        self.use_concurrency: bool = True
+        # Hedging: duplicate a slow primary call to a replica server with the same model
+        self.use_hedging: bool = False
+        self.hedge_delay_s: float = 5.0  # used until an agent has enough samples for a p95
+        self.latency = LatencyTracker()
+        # Load-aware server selection per model (falls back to the agent's host)
+        self.use_scheduler: bool = False
+        self.scheduler = ServerScheduler()
+        # Exact-match /api/generate reply cache (in-process LRU, optional disk tier)
+        self.use_response_cache: bool = True
+        self.response_cache = ResponseCache(disk_path=os.getenv("RESPONSE_CACHE_PATH") or None)
+        # Semantic cache: reuse answers to near-duplicate questions (loads an embedding model)
+        self.use_semantic_cache: bool = False
+        self.semantic_cache = SemanticCache()
+        # `http` pool sizing from the config file, written back by `save_config`
+        self.http_config: Dict[str, int] = {}
+        # Whether the UI should render replies via `chat_stream`
+        self.use_streaming: bool = True
+        self.max_workers: int = 4
+        self._lock = threading.Lock()
         # Logger
         self.logger = logging.getLogger(__name__)
         if not logging.getLogger().handlers:
             logging.basicConfig(level=logging.INFO)
 
-    def chat(self, user_query: str, messages=None) -> Dict[str, str]:
-        """Send user_query to one or more agents and return a mapping agent->reply."""
+    def chat(self, user_query: str, messages=None, deadline_s: Optional[float] = None, use_cache: bool = True) -> Dict[str, str]:
+        """Send user_query to one or more agents and return a mapping agent->reply.
+
+        `deadline_s` bounds the whole request: every stage gets only the time
+        that remains, and optional stages (delegation, rephrase, moderator,
+        memory persistence) are skipped once it runs out. Skipped stages are
+        recorded on the returned mapping's `skipped_stages`.
+
+        `use_cache=False` bypasses the response cache for this request.
+        """
         original_query = user_query or ""
-        replies: Dict[str, str] = {}
+        replies = ChatReplies()
+        budget = LatencyBudget(deadline_s if deadline_s is not None else self.deadline_s)
+        cache = self._response_cache(use_cache)
 
         # decide whether the query targets a specific agent
         target_agent, _ = Router.route(original_query, list(self.agents.keys()))
         conv_id = str(uuid.uuid4())
 
         # primary agent(s)
-        if target_agent:
-            agent_items = [(target_agent, self.agents[target_agent])]
-        else:
-            agent_items = [(n, a) for n, a in self.agents.items() if n != "Moderator"]
+        agent_items = self._primary_agent_items(target_agent)
 
         # detect delegated chained calls if target_agent and delegation enabled
-        chained_calls: List[Tuple[str, str]] = []
-        if target_agent and self.use_delegation:
-            lowered_q = original_query.lower()
-            prefixes = ["ask", "please ask", "can you ask", "could you ask", "please have", "tell", "relay to", "pass to"]
-            for aname in self.agents.keys():
-                if aname.lower() == target_agent.lower():
-                    continue
-                for pref in prefixes:
-                    pattern = rf"{pref}\s+{re.escape(aname.lower())}\b(?:\s+(?:to|about|if|whether|for))?[\s,:-]+(.+)"
-                    m = re.search(pattern, lowered_q, re.IGNORECASE)
-                    if m:
-                        q = m.group(1).strip()
-                        if q:
-                            chained_calls.append((aname, q))
-                            break
-                if chained_calls:
-                    break
-            # proximity fallback
-            if not chained_calls and 'ask' in lowered_q:
-                for aname in self.agents.keys():
-                    if aname.lower() == target_agent.lower():
-                        continue
-                    idx = lowered_q.find('ask')
-                    if idx >= 0:
-                        tail = lowered_q[idx: idx + 120]
-                        if aname.lower() in tail:
-                            parts = tail.split(aname.lower(), 1)
-                            if len(parts) > 1:
-                                q = parts[1].strip(" \t\n,:-\"'")
-                                if q:
-                                    chained_calls.append((aname, q))
-                                    break
-
-        # call primary agents
+        chained_calls = self._detect_chained_calls(original_query, target_agent)
+
+        # one memory query for every prompt this chat will build
+        memory = self._memory_snapshot(agent_items, chained_calls)
+
+        # call primary agents; prompts are built up front from the memory
+        # snapshot, then the HTTP calls fan out across the pool.
+        results: Dict[str, str] = {}
+        semantic = self._semantic_cache(use_cache)
+        semantic_hits = set()
+        pending: List[Tuple[str, Agent, dict]] = []
         for name, agent in agent_items:
-            # check cooldown
-            now = time.time()
-            cd = self.cooldowns.get(name)
-            if cd and cd > now:
-                self.logger.info(f"Skipping {name} due to cooldown until {cd}")
-                replies[name] = "(Agent temporarily unavailable)"
+            if self._in_cooldown(name):
                 continue
-            payload = {
-                "model": getattr(agent, "model", None),
-                "prompt": PromptBuilder.build_prompt(original_query, name, agent, self.memory_db, self.use_memory, self.use_group_memory, target_agent),
-                # include agent name in system prompt so the model answers as the agent
-                "system": f"You are {name}. " + (getattr(agent, "persona", "") or getattr(agent, "personality", "")),
-                "stream": False,
-            }
-            # try with one retry on failure
-            attempt = 0
-            resp = None
-            last_exc = None
-            while attempt < 2:
-                try:
-                    resp = requests.post(f"{agent.host}/api/generate", json=payload, timeout=30)
-                    if resp is not None and resp.status_code == 200:
-                        data = resp.json()
-                        text = (data.get("response") or data.get("output") or "").strip()
-                        replies[name] = text or "(No response)"
-                        break
-                    else:
-                        last_exc = None
-                        replies[name] = "(Agent unavailable)"
-                        # mark status down and increment failure count
-                        self.agent_status[name] = "down"
-                        self.fail_counts[name] = self.fail_counts.get(name, 0) + 1
-                        if self.fail_counts[name] >= self.failure_threshold:
-                            self.cooldowns[name] = time.time() + self.cooldown_seconds
-                except Exception as e:
-                    last_exc = e
-                    replies[name] = f"(Request error for {name}: {e})"
-                    self.agent_status[name] = "down"
-                    self.fail_counts[name] = self.fail_counts.get(name, 0) + 1
-                    if self.fail_counts[name] >= self.failure_threshold:
-                        self.cooldowns[name] = time.time() + self.cooldown_seconds
-
-                attempt += 1
-                if attempt < 2:
+            if budget.exhausted():
+                replies.skip(name, "primary")
+                continue
+            hit = self._semantic_lookup(semantic, name, original_query)
+            if hit:
+                results[name] = hit
+                semantic_hits.add(name)
+                continue
+            pending.append((name, agent, self._primary_payload(name, agent, original_query, target_agent, memory)))
+
+        # (summary_prompt, moderator reply) when the moderator ran on a quorum
+        early_moderator: Optional[Tuple[str, str]] = None
+        if self.use_concurrency and len(pending) > 1:
+            workers = max(1, min(self.max_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="orch") as pool:
+                futures = {name: pool.submit(self._call_primary, name, agent, payload, budget, cache) for name, agent, payload in pending}
+                if not target_agent and self._use_moderator_quorum():
+                    on_time = self._wait_for_quorum(futures, budget)
+                    # replies that made the cut (and semantic cache hits), in agent order;
+                    # late ones are shown but not summarized
+                    late = [n for n in futures if n not in on_time]
+                    summarized = self._quorum_replies(agent_items, {**results, **on_time}, late, self._skipped_primary(replies))
+                    if late:
+                        self.logger.info(f"[Orch] conv_id={conv_id} moderator quorum reached; late agents excluded from summary: {late}")
+                    early_moderator = self._call_moderator(original_query, summarized, budget, cache, memory)
+                for name, fut in futures.items():
                     try:
-                        self.logger.info(f"[Orch] retrying {name} (attempt {attempt+1})")
-                        time.sleep(1)
-                    except Exception:
-                        pass
-            # if the final outcome looked successful, mark agent ok
-            try:
-                if replies.get(name) and not replies.get(name).startswith("("):
-                    self.agent_status[name] = "ok"
-                    # reset failure counts on success
-                    self.fail_counts[name] = 0
-                    if name in self.cooldowns:
-                        del self.cooldowns[name]
-            except Exception:
-                pass
+                        results[name] = fut.result()
+                    except Exception as e:
+                        results[name] = f"(Request error for {name}: {e})"
+        else:
+            for name, agent, payload in pending:
+                results[name] = self._call_primary(name, agent, payload, budget, cache)
 
-            # persist per-agent QA
-            try:
-                if self.memory_db and replies.get(name) is not None:
-                    ans = replies.get(name)
-                    low = (ans or "").lower()
-                    is_err = ans.startswith("(") and ("timed out" in low or "request error" in low)
-                    if is_err:
-                        self.memory_db.save_qa(name, original_query, "", conv_id=conv_id)
-                    else:
-                        self.memory_db.save_qa(name, original_query, ans, conv_id=conv_id)
-            except Exception:
-                pass
+        # collect replies and persist in agent order so output is deterministic
+        for name, _ in agent_items:
+            if name not in results:
+                if "primary" in replies.skipped_stages.get(name, []):
+                    replies[name] = "(Skipped: latency budget exhausted)"
+                else:
+                    replies[name] = "(Agent temporarily unavailable)"
+                continue
+            replies[name] = results[name]
+            if name not in semantic_hits:
+                self._semantic_add(semantic, name, original_query, replies[name])
+            if budget.exhausted():
+                replies.skip(name, "memory")
+                continue
+            self._persist_primary(name, original_query, replies[name], conv_id)
 
         # Debug: report primary replies collected so far
         try:
@@ -176,11 +209,8 @@ class MultiAgentOrchestrator:
             pass
 
         # broadcast question-only group memory row (when no target agent)
-        if not target_agent and self.use_group_memory and self.memory_db:
-            try:
-                self.memory_db.save_qa("__group__", original_query, "", conv_id=conv_id)
-            except Exception:
-                pass
+        if not budget.exhausted():
+            self._persist_group_question(target_agent, original_query, conv_id)
 
         # handle chained delegated calls
         if target_agent and chained_calls:
@@ -189,24 +219,23 @@ class MultiAgentOrchestrator:
                 if not cagent:
                     replies[cname] = f"(Agent {cname} not found)"
                     continue
-                primary = replies.get(target_agent, "")[:800]
-                chained_prompt = f"[Requested by {target_agent}]\nPrimary reply: {primary}\n---\n" + cquestion
-                payload = {
-                    "model": cagent.model,
-                    "prompt": PromptBuilder.build_prompt(chained_prompt, cname, cagent, self.memory_db, self.use_memory, self.use_group_memory, target_agent=cname),
-                    "system": getattr(cagent, "persona", "") or getattr(cagent, "personality", ""),
-                    "stream": False,
-                }
-                # chained call: also retry once on failure
-                attempt = 0
+                if budget.exhausted():
+                    replies.skip(target_agent, "delegation")
+                    continue
+                payload = self._chained_payload(cname, cagent, cquestion, target_agent, replies, memory)
+                chost = self._pick_host(cagent)
+                cached = self._cache_get(cache, payload)
+                if cached:
+                    replies[cname] = cached
+                # chained call: also retry once on failure (a cache hit skips the call)
+                attempt = 2 if cached else 0
                 while attempt < 2:
                     try:
-                        cresp = requests.post(f"{cagent.host}/api/generate", json=payload, timeout=60)
+                        cresp = self._post_generate(chost, payload, timeout=budget.timeout(60))
                         if cresp is not None and cresp.status_code == 200:
-                            cdata = cresp.json()
-                            creply = (cdata.get("response") or cdata.get("output") or "").strip()
-                            replies[cname] = creply or "(No response)"
+                            replies[cname] = self._reply_text(cresp.json()) or "(No response)"
                             self.agent_status[cname] = "ok"
+                            self._cache_put(cache, payload, replies[cname])
                             break
                         else:
                             replies[cname] = "(Agent unavailable)"
@@ -216,6 +245,8 @@ class MultiAgentOrchestrator:
                         self.agent_status[cname] = "down"
 
                     attempt += 1
+                    if attempt < 2 and budget.exhausted(reserve=1.0):
+                        break
                     if attempt < 2:
                         try:
                             self.logger.info(f"[Orch] retrying chained call {cname} (attempt {attempt+1})")
@@ -224,78 +255,40 @@ class MultiAgentOrchestrator:
                             pass
 
                 # persist chained QA
-                try:
-                    if self.memory_db and replies.get(cname) is not None:
-                        self.memory_db.save_qa(cname, cquestion, replies.get(cname), conv_id=conv_id)
-                except Exception:
-                    pass
+                if budget.exhausted():
+                    replies.skip(cname, "memory")
+                else:
+                    self._persist_qa(cname, cquestion, replies.get(cname), conv_id)
+
+            # drop chained calls skipped for lack of budget so they are not quoted as "(no reply)"
+            chained_calls = [(cname, cq) for cname, cq in chained_calls if cname in replies]
 
             # If we have chained replies, append them to the primary agent's reply
-            try:
-                if target_agent in replies and chained_calls:
-                    parts = []
-                    for cname, _ in chained_calls:
-                        ctext = replies.get(cname, "(no reply)")
-                        parts.append(f"[{cname} replied]: {ctext}")
-                    if parts:
-                        # Append quoted replies to primary agent's reply so it can quote others
-                        replies[target_agent] = replies.get(target_agent, "") + "\n\n" + "\n\n".join(parts)
-            except Exception:
-                pass
+            self._append_chained_replies(replies, target_agent, chained_calls)
 
             # Ask the primary agent to rephrase/quote other agents' replies for a natural quote
             # This step can be toggled via `use_primary_rephrase` to avoid extra agent calls.
-            if self.use_primary_rephrase:
+            if self.use_primary_rephrase and budget.exhausted():
+                replies.skip(target_agent, "rephrase")
+            elif self.use_primary_rephrase and chained_calls:
                 try:
                     primary_agent = self.agents.get(target_agent)
-                    if primary_agent:
-                        primary_before = replies.get(target_agent, "")
-                    rephrase_parts = [f"Original question: {original_query}", f"Your original reply: {primary_before}", "Other agents replied:"]
-                    for cname, _ in chained_calls:
-                        retext = replies.get(cname, "(no reply)")
-                        rephrase_parts.append(f"- {cname}: {retext}")
-                    # Strongly instruct the primary agent to produce a predictable quoting format
-                    # The response must be in the primary agent's voice and follow this exact structure:
-                    # <AgentName>: "<final reply content>"
-                    # Quoted replies:
-                    # - <OtherAgentName>: "<their reply>"
-                    # The primary reply should be 1-3 sentences and may include a short justification.
-                    rephrase_prompt = (
-                        "\n".join(rephrase_parts)
-                        + "\n\nPlease produce a revised reply in the voice of "
-                        + target_agent
-                        + ". Follow this exact format (do not add extra sections):\n"
-                        + f"{target_agent}: \"<your reply here>\"\n\nQuoted replies:\n"
-                    )
-                    for cname, _ in chained_calls:
-                        crep = replies.get(cname, "(no reply)")
-                        rephrase_prompt += f"- {cname}: \"{crep}\"\n"
-                    rephrase_prompt += (
-                        "\nKeep the final reply concise (1-3 sentences). If you rely on another agent's answer, briefly cite them in parentheses."
-                    )
-
-                    rpayload = {
-                        "model": getattr(primary_agent, "model", None),
-                        "prompt": PromptBuilder.build_prompt(rephrase_prompt, target_agent, primary_agent, self.memory_db, self.use_memory, self.use_group_memory, target_agent=target_agent),
-                        "system": f"You are {target_agent}. " + (getattr(primary_agent, "persona", "") or getattr(primary_agent, "personality", "")),
-                        "stream": False,
-                    }
+                    rpayload = self._rephrase_payload(original_query, target_agent, primary_agent, chained_calls, replies, memory)
                     try:
-                        rresp = requests.post(f"{primary_agent.host}/api/generate", json=rpayload, timeout=30)
-                        if rresp is not None and rresp.status_code == 200:
-                            rdata = rresp.json()
-                            rtext = (rdata.get("response") or rdata.get("output") or "").strip()
-                            if rtext:
-                                replies[target_agent] = rtext
-                                # persist rephrased primary reply
-                                try:
-                                    if self.memory_db:
-                                        self.memory_db.save_qa(target_agent, original_query, rtext, conv_id=conv_id)
-                                except Exception:
-                                    pass
-                        else:
-                            # keep existing primary reply
-                            pass
+                        rtext = self._cache_get(cache, rpayload)
+                        if not rtext:
+                            rresp = self._post_generate(self._pick_host(primary_agent), rpayload, timeout=budget.timeout(30))
+                            if rresp is not None and rresp.status_code == 200:
+                                rtext = self._reply_text(rresp.json())
+                                self._cache_put(cache, rpayload, rtext)
+                        # an empty or failed rephrase keeps the existing primary reply
+                        if rtext:
+                            replies[target_agent] = rtext
+                            # persist rephrased primary reply
+                            if budget.exhausted():
+                                replies.skip(target_agent, "memory")
+                            else:
+                                self._persist_qa(target_agent, original_query, rtext, conv_id)
                     except Exception:
                         pass
                 except Exception:
@@ -309,51 +302,1016 @@ class MultiAgentOrchestrator:
 
         # If this was a broadcast and a moderator is enabled, ask the moderator to summarize
         if not target_agent and self.use_moderator and self.moderator:
+            if early_moderator is None and budget.exhausted():
+                replies.skip("Moderator", "moderator")
+                return replies
+            summary_prompt, mtext = early_moderator or self._call_moderator(original_query, dict(replies), budget, cache, memory)
+            replies["Moderator"] = mtext
+            if summary_prompt is not None:
+                # persist moderator QA
+                if budget.exhausted():
+                    replies.skip("Moderator", "memory")
+                else:
+                    self._persist_qa("Moderator", summary_prompt, mtext, conv_id)
+
+        return replies
+
+    async def achat(self, user_query: str, messages=None, client=None, deadline_s: Optional[float] = None, use_cache: bool = True) -> Dict[str, str]:
+        """Async counterpart of `chat` built on `httpx.AsyncClient`.
+
+        Covers the same stages (primary fan-out, semantic and response
+        caches, moderator quorum, chained delegation, primary rephrase,
+        moderator summary) under the same `deadline_s` latency budget, with
+        skipped stages recorded on the returned mapping's `skipped_stages`.
+        Blocking MemoryDB and embedding work runs in a worker thread so the
+        event loop never waits on it. The call runs inside the caller's
+        cancellation scope: cancelling the task (or an enclosing
+        `asyncio.timeout()`) cancels every in-flight request.
+
+        Pass `client` (e.g. from `transport.async_client()`) to reuse pooled
+        connections across calls; otherwise one is created for this call.
+        Hedging (`use_hedging`) only applies to `chat` and `chat_stream`.
+        """
+        if client is None:
+            async with transport.async_client() as own_client:
+                return await self.achat(user_query, messages, client=own_client, deadline_s=deadline_s, use_cache=use_cache)
+
+        original_query = user_query or ""
+        replies = ChatReplies()
+        budget = LatencyBudget(deadline_s if deadline_s is not None else self.deadline_s)
+        cache = self._response_cache(use_cache)
+        semantic = self._semantic_cache(use_cache)
+        target_agent, _ = Router.route(original_query, list(self.agents.keys()))
+        conv_id = str(uuid.uuid4())
+        agent_items = self._primary_agent_items(target_agent)
+        chained_calls = self._detect_chained_calls(original_query, target_agent)
+        memory = await asyncio.to_thread(self._memory_snapshot, agent_items, chained_calls)
+
+        # prompts read the snapshot; to_thread covers stores without one
+        results: Dict[str, str] = {}
+        semantic_hits = set()
+        pending: List[Tuple[str, Agent, dict]] = []
+        for name, agent in agent_items:
+            if self._in_cooldown(name):
+                continue
+            if budget.exhausted():
+                replies.skip(name, "primary")
+                continue
+            hit = await asyncio.to_thread(self._semantic_lookup, semantic, name, original_query)
+            if hit:
+                results[name] = hit
+                semantic_hits.add(name)
+                continue
+            payload = await asyncio.to_thread(self._primary_payload, name, agent, original_query, target_agent, memory)
+            pending.append((name, agent, payload))
+
+        # (summary_prompt, moderator reply) when the moderator ran on a quorum
+        early_moderator: Optional[Tuple[Optional[str], str]] = None
+        tasks = {name: asyncio.ensure_future(self._acall_primary(client, name, agent, payload, cache, budget)) for name, agent, payload in pending}
+        try:
+            if len(tasks) > 1 and not target_agent and self._use_moderator_quorum():
+                on_time = await self._await_quorum(tasks, budget)
+                late = [n for n in tasks if n not in on_time]
+                summarized = self._quorum_replies(agent_items, {**results, **on_time}, late, self._skipped_primary(replies))
+                if late:
+                    self.logger.info(f"[Orch] conv_id={conv_id} moderator quorum reached; late agents excluded from summary: {late}")
+                early_moderator = await self._acall_moderator(client, original_query, summarized, budget, cache, memory)
+            if tasks:
+                await asyncio.wait(tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        for name, task in tasks.items():
             try:
-                # Build a concise summary prompt containing the question and agent replies
-                summary_parts = [f"Question: {original_query}", "Replies:"]
-                for n, txt in replies.items():
-                    summary_parts.append(f"- {n}: {txt}")
-                summary_prompt = "\n".join(summary_parts)
-
-                # Instruct the Moderator to rank and recommend the best answer
-                moderator_instruction = (
-                    "You are Moderator. Read the question and the replies and: "
-                    "(1) identify which agent gave the best answer, (2) provide a concise authoritative recommendation that cites the chosen reply, "
-                    "and (3) include a short justification (1-2 sentences)."
-                )
-
-                mpayload = {
-                    "model": getattr(self.moderator, "model", None),
-                    "prompt": PromptBuilder.build_prompt(summary_prompt + "\n\nPlease rank these replies and give a single recommended answer.", self.moderator.name, self.moderator, self.memory_db, self.use_memory, self.use_group_memory, target_agent=None),
-                    "system": moderator_instruction + " " + (getattr(self.moderator, "persona", "") or getattr(self.moderator, "personality", "")),
-                    "stream": False,
-                }
-                mresp = None
-                try:
-                    mresp = requests.post(f"{self.moderator.host}/api/generate", json=mpayload, timeout=30)
-                    if mresp is not None and mresp.status_code == 200:
-                        mdata = mresp.json()
-                        mtext = (mdata.get("response") or mdata.get("output") or "").strip()
-                        replies["Moderator"] = mtext or "(No moderator response)"
-                        # persist moderator QA
+                results[name] = task.result()
+            except Exception as e:
+                results[name] = f"(Request error for {name}: {e})"
+
+        for name, _ in agent_items:
+            if name not in results:
+                if "primary" in replies.skipped_stages.get(name, []):
+                    replies[name] = "(Skipped: latency budget exhausted)"
+                else:
+                    replies[name] = "(Agent temporarily unavailable)"
+                continue
+            replies[name] = results[name]
+            if name not in semantic_hits:
+                await asyncio.to_thread(self._semantic_add, semantic, name, original_query, replies[name])
+            if budget.exhausted():
+                replies.skip(name, "memory")
+                continue
+            await asyncio.to_thread(self._persist_primary, name, original_query, replies[name], conv_id)
+
+        self.logger.info(f"[Orch] conv_id={conv_id} primary_replies={replies}")
+        if not budget.exhausted():
+            await asyncio.to_thread(self._persist_group_question, target_agent, original_query, conv_id)
+
+        if target_agent and chained_calls:
+            for cname, cquestion in chained_calls:
+                cagent = self.agents.get(cname)
+                if not cagent:
+                    replies[cname] = f"(Agent {cname} not found)"
+                    continue
+                if budget.exhausted():
+                    replies.skip(target_agent, "delegation")
+                    continue
+                payload = await asyncio.to_thread(self._chained_payload, cname, cagent, cquestion, target_agent, replies, memory)
+                cached = self._cache_get(cache, payload)
+                if cached:
+                    replies[cname] = cached
+                else:
+                    chost = await asyncio.to_thread(self._pick_host, cagent)
+                    for attempt in range(2):
                         try:
-                            if self.memory_db:
-                                self.memory_db.save_qa("Moderator", summary_prompt, replies.get("Moderator"), conv_id=conv_id)
-                        except Exception:
-                            pass
-                        # mark moderator ok
-                        self.agent_status["Moderator"] = "ok"
+                            with self._track_host(chost):
+                                cresp = await client.post(f"{chost}/api/generate", json=payload, timeout=budget.timeout(60))
+                            if cresp.status_code == 200:
+                                replies[cname] = self._reply_text(cresp.json()) or "(No response)"
+                                self.agent_status[cname] = "ok"
+                                self._cache_put(cache, payload, replies[cname])
+                                break
+                            replies[cname] = "(Agent unavailable)"
+                            self.agent_status[cname] = "down"
+                        except Exception as e:
+                            replies[cname] = f"(Request error for {cname}: {e})"
+                            self.agent_status[cname] = "down"
+                        if attempt == 0:
+                            if budget.exhausted(reserve=1.0):
+                                break
+                            self.logger.info(f"[Orch] retrying chained call {cname} (attempt {attempt+2})")
+                            await asyncio.sleep(1)
+                if budget.exhausted():
+                    replies.skip(cname, "memory")
+                else:
+                    await asyncio.to_thread(self._persist_qa, cname, cquestion, replies.get(cname), conv_id)
+
+            # drop chained calls skipped for lack of budget so they are not quoted as "(no reply)"
+            chained_calls = [(cname, cq) for cname, cq in chained_calls if cname in replies]
+            self._append_chained_replies(replies, target_agent, chained_calls)
+
+            primary_agent = self.agents.get(target_agent)
+            if self.use_primary_rephrase and budget.exhausted():
+                replies.skip(target_agent, "rephrase")
+            elif self.use_primary_rephrase and primary_agent and chained_calls:
+                rpayload = await asyncio.to_thread(self._rephrase_payload, original_query, target_agent, primary_agent, chained_calls, replies, memory)
+                try:
+                    rtext = self._cache_get(cache, rpayload)
+                    if not rtext:
+                        rhost = await asyncio.to_thread(self._pick_host, primary_agent)
+                        with self._track_host(rhost):
+                            rresp = await client.post(f"{rhost}/api/generate", json=rpayload, timeout=budget.timeout(30))
+                        if rresp.status_code == 200:
+                            rtext = self._reply_text(rresp.json())
+                            self._cache_put(cache, rpayload, rtext)
+                    if rtext:
+                        replies[target_agent] = rtext
+                        if budget.exhausted():
+                            replies.skip(target_agent, "memory")
+                        else:
+                            await asyncio.to_thread(self._persist_qa, target_agent, original_query, rtext, conv_id)
+                except Exception:
+                    pass
+
+        if not target_agent and self.use_moderator and self.moderator:
+            if early_moderator is None and budget.exhausted():
+                replies.skip("Moderator", "moderator")
+                return replies
+            summary_prompt, mtext = early_moderator or await self._acall_moderator(client, original_query, dict(replies), budget, cache, memory)
+            replies["Moderator"] = mtext
+            if summary_prompt is not None:
+                if budget.exhausted():
+                    replies.skip("Moderator", "memory")
+                else:
+                    await asyncio.to_thread(self._persist_qa, "Moderator", summary_prompt, mtext, conv_id)
+
+        return replies
+
+    def chat_stream(self, user_query: str, messages=None, deadline_s: Optional[float] = None, use_cache: bool = True) -> Iterator[Tuple[str, Optional[str]]]:
+        """Like `chat`, but yields `(agent, delta)` events as tokens arrive.
+
+        Payloads are sent with `"stream": True` and Ollama's NDJSON chunks are
+        parsed incrementally. Broadcast agents stream concurrently, so events
+        from different agents interleave. A `None` delta means the agent's
+        reply is being replaced (primary rephrase) and callers should clear
+        what they have rendered for it. The generator's return value is the
+        final replies dict, identical in shape to `chat`. Cached primary
+        replies arrive as a single delta. With `moderator_quorum` /
+        `moderator_deadline_s` the moderator starts streaming once enough
+        agents have finished, and late agents keep streaming alongside it.
+
+        `deadline_s` (default `self.deadline_s`) is the same end-to-end budget
+        as in `chat`: streams stop when it runs out, keeping the text so far,
+        and skipped stages are listed on the returned `skipped_stages`.
+        """
+        original_query = user_query or ""
+        cache = self._response_cache(use_cache)
+        replies = ChatReplies()
+        budget = LatencyBudget(deadline_s if deadline_s is not None else self.deadline_s)
+        target_agent, _ = Router.route(original_query, list(self.agents.keys()))
+        conv_id = str(uuid.uuid4())
+        agent_items = self._primary_agent_items(target_agent)
+        chained_calls = self._detect_chained_calls(original_query, target_agent)
+        memory = self._memory_snapshot(agent_items, chained_calls)
+
+        results: Dict[str, str] = {}
+        semantic = self._semantic_cache(use_cache)
+        semantic_hits = set()
+        # replies whose stream stopped when the budget ran out
+        cut_short = set()
+        pending: List[Tuple[str, Agent, dict]] = []
+        for name, agent in agent_items:
+            if self._in_cooldown(name):
+                continue
+            if budget.exhausted():
+                replies.skip(name, "primary")
+                continue
+            hit = self._semantic_lookup(semantic, name, original_query)
+            if hit:
+                results[name] = hit
+                semantic_hits.add(name)
+                yield name, hit
+                continue
+            payload = self._primary_payload(name, agent, original_query, target_agent, memory)
+            payload["stream"] = True
+            pending.append((name, agent, payload))
+
+        # workers push (name, delta) and finally (name, _STREAM_DONE, text, cut_short)
+        events: "queue.Queue[tuple]" = queue.Queue()
+        # {'prompt', 'text'} once a quorum moderator has finished streaming
+        early_moderator: Optional[dict] = None
+        if pending:
+            workers = max(1, min(self.max_workers, len(pending))) if self.use_concurrency else 1
+            quorum_mode = not target_agent and self._use_moderator_quorum()
+            quorum = min(self.moderator_quorum or len(pending), len(pending))
+            quorum_deadline = self._quorum_deadline(budget)
+            names = {name for name, _, _ in pending}
+            finished = set()
+            moderator_running = False
+            # the moderator gets its own thread so it never queues behind agent streams
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="orch-stream") as pool, \
+                    ThreadPoolExecutor(max_workers=1, thread_name_prefix="orch-moderator") as mod_pool:
+                for name, agent, payload in pending:
+                    pool.submit(self._stream_primary, name, agent, payload, events, cache, budget)
+                while len(finished) < len(pending) or moderator_running:
+                    if quorum_mode and early_moderator is None and not moderator_running and (
+                            len(finished) >= quorum or (quorum_deadline is not None and time.monotonic() >= quorum_deadline)):
+                        late = sorted(names - finished)
+                        if late:
+                            self.logger.info(f"[Orch] conv_id={conv_id} moderator quorum reached; late agents excluded from summary: {late}")
+                        summarized = self._quorum_replies(agent_items, results, late, self._skipped_primary(replies))
+                        mod_pool.submit(self._stream_moderator_worker, original_query, summarized, memory, events, budget)
+                        moderator_running = True
+                    timeout = None
+                    if quorum_mode and not moderator_running and early_moderator is None and quorum_deadline is not None:
+                        timeout = max(0.0, quorum_deadline - time.monotonic())
+                    try:
+                        event = events.get(timeout=timeout)
+                    except queue.Empty:
+                        continue
+                    if event[1] is _STREAM_DONE:
+                        if event[0] in names:
+                            results[event[0]] = event[2]
+                            finished.add(event[0])
+                            if event[3]:
+                                cut_short.add(event[0])
+                        else:
+                            early_moderator = event[2]
+                            moderator_running = False
+                    else:
+                        yield event
+
+        for name, _ in agent_items:
+            if name not in results:
+                if "primary" in replies.skipped_stages.get(name, []):
+                    replies[name] = "(Skipped: latency budget exhausted)"
+                else:
+                    replies[name] = "(Agent temporarily unavailable)"
+                yield name, replies[name]
+                continue
+            replies[name] = results[name]
+            if name not in semantic_hits and name not in cut_short:
+                self._semantic_add(semantic, name, original_query, replies[name])
+            if budget.exhausted():
+                replies.skip(name, "memory")
+                continue
+            self._persist_primary(name, original_query, replies[name], conv_id)
+
+        if not budget.exhausted():
+            self._persist_group_question(target_agent, original_query, conv_id)
+
+        if target_agent and chained_calls:
+            for cname, cquestion in chained_calls:
+                cagent = self.agents.get(cname)
+                if not cagent:
+                    replies[cname] = f"(Agent {cname} not found)"
+                    yield cname, replies[cname]
+                    continue
+                if budget.exhausted():
+                    replies.skip(target_agent, "delegation")
+                    continue
+                payload = self._chained_payload(cname, cagent, cquestion, target_agent, replies, memory)
+                payload["stream"] = True
+                parts: List[str] = []
+                try:
+                    for delta in self._stream_generate(self._pick_host(cagent), payload, timeout=budget.timeout(60)):
+                        parts.append(delta)
+                        yield cname, delta
+                        if budget.exhausted():
+                            break
+                    replies[cname] = "".join(parts).strip() or "(No response)"
+                    self.agent_status[cname] = "ok"
+                except Exception as e:
+                    replies[cname] = "".join(parts).strip() or f"(Request error for {cname}: {e})"
+                    self.agent_status[cname] = "down"
+                if not parts:
+                    yield cname, replies[cname]
+                if budget.exhausted():
+                    replies.skip(cname, "memory")
+                else:
+                    self._persist_qa(cname, cquestion, replies.get(cname), conv_id)
+
+            # drop chained calls skipped for lack of budget so they are not quoted as "(no reply)"
+            chained_calls = [(cname, cq) for cname, cq in chained_calls if cname in replies]
+
+            before = replies.get(target_agent, "")
+            self._append_chained_replies(replies, target_agent, chained_calls)
+            if replies.get(target_agent, "") != before:
+                yield target_agent, replies[target_agent][len(before):]
+
+            primary_agent = self.agents.get(target_agent)
+            if self.use_primary_rephrase and primary_agent and budget.exhausted():
+                replies.skip(target_agent, "rephrase")
+            elif self.use_primary_rephrase and primary_agent and chained_calls:
+                rpayload = self._rephrase_payload(original_query, target_agent, primary_agent, chained_calls, replies, memory)
+                rpayload["stream"] = True
+                parts = []
+                try:
+                    for delta in self._stream_generate(self._pick_host(primary_agent), rpayload, timeout=budget.timeout(30)):
+                        if not parts:
+                            yield target_agent, None
+                        parts.append(delta)
+                        yield target_agent, delta
+                        if budget.exhausted():
+                            break
+                except Exception:
+                    pass
+                rtext = "".join(parts).strip()
+                if rtext:
+                    replies[target_agent] = rtext
+                    if budget.exhausted():
+                        replies.skip(target_agent, "memory")
                     else:
-                        replies["Moderator"] = "(Moderator unavailable)"
-                        self.agent_status["Moderator"] = "down"
+                        self._persist_qa(target_agent, original_query, rtext, conv_id)
+
+        if not target_agent and self.use_moderator and self.moderator:
+            moderated = early_moderator
+            if moderated is None and budget.exhausted():
+                replies.skip("Moderator", "moderator")
+                return replies
+            if moderated is None:
+                moderated = {}
+                for delta in self._stream_moderator(original_query, dict(replies), memory, moderated, budget):
+                    yield "Moderator", delta
+            replies["Moderator"] = moderated["text"]
+            if moderated["prompt"] is not None:
+                if budget.exhausted():
+                    replies.skip("Moderator", "memory")
+                else:
+                    self._persist_qa("Moderator", moderated["prompt"], replies["Moderator"], conv_id)
+
+        return replies
+
+    def _stream_moderator(self, original_query: str, replies: Dict[str, str], memory, out: dict, budget: Optional[LatencyBudget] = None) -> Iterator[str]:
+        """Stream the Moderator's ranking of `replies`, yielding deltas.
+
+        Sets `out['text']` to the reply and `out['prompt']` to the summary
+        prompt (None when the call failed, so nothing is persisted).
+        """
+        out["prompt"], out["text"] = None, "(No moderator response)"
+        parts: List[str] = []
+        try:
+            summary_prompt, mpayload = self._moderator_payload(original_query, replies, memory)
+            mpayload["stream"] = True
+            for delta in self._stream_generate(self._pick_host(self.moderator), mpayload, timeout=budget.timeout(30) if budget else 30):
+                parts.append(delta)
+                yield delta
+                if budget and budget.exhausted():
+                    break
+            out["text"] = "".join(parts).strip() or "(No moderator response)"
+            out["prompt"] = summary_prompt
+            self.agent_status["Moderator"] = "ok"
+        except Exception as e:
+            out["text"] = "".join(parts).strip() or f"(Moderator error: {e})"
+            self.agent_status["Moderator"] = "down"
+        if not parts:
+            yield out["text"]
+
+    def _stream_moderator_worker(self, original_query: str, replies: Dict[str, str], memory, events: "queue.Queue[tuple]", budget: Optional[LatencyBudget] = None) -> None:
+        """Run `_stream_moderator` on a worker thread; always ends with `("Moderator", _STREAM_DONE, out)`."""
+        out: dict = {"prompt": None, "text": "(No moderator response)"}
+        try:
+            for delta in self._stream_moderator(original_query, replies, memory, out, budget):
+                events.put(("Moderator", delta))
+        finally:
+            events.put(("Moderator", _STREAM_DONE, out))
+
+    def _stream_generate(self, host: str, payload: dict, timeout: float, on_open=None) -> Iterator[str]:
+        """POST a streaming `/api/generate` and yield response deltas from the NDJSON body.
+
+        `on_open(resp)` receives the open response, so a hedged race can close
+        the losing request while it is still waiting for data.
+        """
+        with self._track_host(host):
+            yield from self._iter_stream(host, payload, timeout, on_open)
+
+    @staticmethod
+    def _iter_stream(host: str, payload: dict, timeout: float, on_open=None) -> Iterator[str]:
+        resp = transport.post(f"{host}/api/generate", json=payload, timeout=timeout, stream=True)
+        if on_open is not None:
+            on_open(resp)
+        try:
+            if resp.status_code != 200:
+                raise RuntimeError(f"HTTP {resp.status_code}")
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                delta = chunk.get("response") or ""
+                if delta:
+                    yield delta
+                if chunk.get("done"):
+                    break
+        finally:
+            try:
+                resp.close()
+            except Exception:
+                pass
+
+    def _response_cache(self, use_cache: bool = True) -> Optional[ResponseCache]:
+        """The cache to use for this request, or None when disabled or bypassed."""
+        if use_cache and self.use_response_cache:
+            return self.response_cache
+        return None
+
+    def _semantic_cache(self, use_cache: bool = True) -> Optional[SemanticCache]:
+        if use_cache and self.use_semantic_cache:
+            return self.semantic_cache
+        return None
+
+    def _semantic_lookup(self, semantic: Optional[SemanticCache], name: str, query: str) -> Optional[str]:
+        if semantic is None:
+            return None
+        try:
+            return semantic.lookup(name, query)
+        except Exception as e:
+            self.logger.warning(f"[Orch] semantic cache lookup failed: {e}")
+            return None
+
+    def _semantic_add(self, semantic: Optional[SemanticCache], name: str, query: str, reply: str) -> None:
+        if semantic is None:
+            return
+        try:
+            semantic.add(name, query, reply, self.latency.last(name) or 0.0)
+        except Exception as e:
+            self.logger.warning(f"[Orch] semantic cache update failed: {e}")
+
+    def _memory_snapshot(self, agent_items: List[Tuple[str, Agent]], chained_calls: List[Tuple[str, str]]):
+        """Load recent memories for every agent this chat may prompt in one query.
+
+        Returns a `MemorySnapshot` (or None when memory is off, or when the
+        store has no batched API, in which case prompts read `memory_db`).
+        """
+        if not self.use_memory or not self.memory_db or not hasattr(self.memory_db, "snapshot"):
+            return None
+        names = [name for name, _ in agent_items] + [cname for cname, _ in chained_calls]
+        if self.use_moderator and self.moderator:
+            names.append(self.moderator.name)
+        try:
+            return self.memory_db.snapshot(names)
+        except Exception as e:
+            self.logger.warning(f"[Orch] memory snapshot failed: {e}")
+            return None
+
+    def _primary_agent_items(self, target_agent: Optional[str]) -> List[Tuple[str, Agent]]:
+        if target_agent:
+            return [(target_agent, self.agents[target_agent])]
+        return [(n, a) for n, a in self.agents.items() if n != "Moderator"]
+
+    def _in_cooldown(self, name: str) -> bool:
+        cd = self.cooldowns.get(name)
+        if cd and cd > time.time():
+            self.logger.info(f"Skipping {name} due to cooldown until {cd}")
+            return True
+        return False
+
+    def _detect_chained_calls(self, original_query: str, target_agent: Optional[str]) -> List[Tuple[str, str]]:
+        """Return [(agent, question)] for "ask <Agent> ..." phrasing in an addressed query."""
+        chained_calls: List[Tuple[str, str]] = []
+        if not (target_agent and self.use_delegation):
+            return chained_calls
+        lowered_q = original_query.lower()
+        prefixes = ["ask", "please ask", "can you ask", "could you ask", "please have", "tell", "relay to", "pass to"]
+        for aname in self.agents.keys():
+            if aname.lower() == target_agent.lower():
+                continue
+            for pref in prefixes:
+                pattern = rf"{pref}\s+{re.escape(aname.lower())}\b(?:\s+(?:to|about|if|whether|for))?[\s,:-]+(.+)"
+                m = re.search(pattern, lowered_q, re.IGNORECASE)
+                if m:
+                    q = m.group(1).strip()
+                    if q:
+                        chained_calls.append((aname, q))
+                        break
+            if chained_calls:
+                break
+        # proximity fallback
+        if not chained_calls and 'ask' in lowered_q:
+            for aname in self.agents.keys():
+                if aname.lower() == target_agent.lower():
+                    continue
+                idx = lowered_q.find('ask')
+                if idx >= 0:
+                    tail = lowered_q[idx: idx + 120]
+                    if aname.lower() in tail:
+                        parts = tail.split(aname.lower(), 1)
+                        if len(parts) > 1:
+                            q = parts[1].strip(" \t\n,:-\"'")
+                            if q:
+                                chained_calls.append((aname, q))
+                                break
+        return chained_calls
+
+    @staticmethod
+    def _reply_text(data: dict) -> str:
+        return (data.get("response") or data.get("output") or "").strip()
+
+    def _primary_payload(self, name: str, agent: Agent, original_query: str, target_agent: Optional[str], memory=None) -> dict:
+        return {
+            "model": getattr(agent, "model", None),
+            "prompt": PromptBuilder.build_prompt(original_query, name, agent, memory or self.memory_db, self.use_memory, self.use_group_memory, target_agent),
+            # include agent name in system prompt so the model answers as the agent
+            "system": f"You are {name}. " + (getattr(agent, "persona", "") or getattr(agent, "personality", "")),
+            "stream": False,
+        }
+
+    def _record_failure(self, name: str) -> None:
+        """Mark `name` down and open its circuit breaker once the threshold is hit."""
+        with self._lock:
+            self.agent_status[name] = "down"
+            self.fail_counts[name] = self.fail_counts.get(name, 0) + 1
+            if self.fail_counts[name] >= self.failure_threshold:
+                self.cooldowns[name] = time.time() + self.cooldown_seconds
+
+    def _record_success(self, name: str) -> None:
+        with self._lock:
+            self.agent_status[name] = "ok"
+            # reset failure counts on success
+            self.fail_counts[name] = 0
+            self.cooldowns.pop(name, None)
+
+    def _call_primary(self, name: str, agent: Agent, payload: dict, budget: Optional[LatencyBudget] = None, cache: Optional[ResponseCache] = None) -> str:
+        """POST `payload` to the agent with one retry and return the reply text.
+
+        Safe to run from worker threads: shared circuit-breaker state is only
+        touched through `_record_failure` / `_record_success`. With a `budget`
+        the timeout is clipped to the time left and the retry is dropped when
+        there is not enough left for it. A `cache` hit skips the call.
+        """
+        cached = self._cache_get(cache, payload)
+        if cached:
+            return cached
+        reply = "(No response)"
+        host = self._pick_host(agent)
+        replicas = self._replica_hosts(agent, exclude=host) if self.use_hedging else []
+        # try with one retry on failure
+        attempt = 0
+        while attempt < 2:
+            started = time.monotonic()
+            try:
+                timeout = budget.timeout(30) if budget else 30
+                if replicas:
+                    hedge_after = self.latency.percentile(name) or self.hedge_delay_s
+                    text, winner = hedged_generate([host, replicas[0]], payload, timeout, hedge_after, self._stream_generate)
+                    if winner != host:
+                        self.logger.info(f"[Orch] hedged request for {name} won on {winner}")
+                    reply = text or "(No response)"
+                    self.latency.record(name, time.monotonic() - started)
+                    break
+                resp = self._post_generate(host, payload, timeout=timeout)
+                if resp is not None and resp.status_code == 200:
+                    reply = self._reply_text(resp.json()) or "(No response)"
+                    self.latency.record(name, time.monotonic() - started)
+                    break
+                else:
+                    reply = "(Agent unavailable)"
+                    self._record_failure(name)
+            except Exception as e:
+                reply = f"(Request error for {name}: {e})"
+                self._record_failure(name)
+
+            attempt += 1
+            if attempt < 2 and budget and budget.exhausted(reserve=1.0):
+                break
+            if attempt < 2:
+                try:
+                    self.logger.info(f"[Orch] retrying {name} (attempt {attempt+1})")
+                    time.sleep(1)
+                except Exception:
+                    pass
+        # if the final outcome looked successful, mark agent ok
+        if reply and not reply.startswith("("):
+            self._record_success(name)
+            self._cache_put(cache, payload, reply)
+        return reply
+
+    def _replica_hosts(self, agent: Agent, exclude: Optional[str] = None) -> List[str]:
+        """Other configured servers that report `agent.model` in `/api/tags`."""
+        if not agent.model:
+            return []
+        exclude = exclude or agent.host
+        hosts = []
+        for host in self.servers.values():
+            if host and host != exclude and agent.model in get_models_cached(host):
+                hosts.append(host)
+        return hosts
+
+    def _pick_host(self, agent: Agent) -> str:
+        """Host to use for this call: the scheduler's choice, or the agent's configured host."""
+        if not self.use_scheduler:
+            return agent.host
+        try:
+            self.scheduler.servers = self.servers
+            return self.scheduler.pick(getattr(agent, "model", None), agent.host)
+        except Exception:
+            return agent.host
+
+    def _track_host(self, host: str):
+        return self.scheduler.track(host) if self.use_scheduler else nullcontext()
+
+    def _post_generate(self, host: str, payload: dict, timeout: float):
+        with self._track_host(host):
+            return transport.post(f"{host}/api/generate", json=payload, timeout=timeout)
+
+    def _stream_primary(self, name: str, agent: Agent, payload: dict, events: "queue.Queue[tuple]", cache: Optional[ResponseCache] = None, budget: Optional[LatencyBudget] = None) -> None:
+        """Streaming counterpart of `_call_primary`, run on a worker thread.
+
+        Retries once only if nothing has been emitted yet (and the `budget`
+        leaves time for it); stops reading once the budget runs out, keeping
+        the text so far (such a reply is not cached). With `use_hedging` the
+        request races a replica for the first token (see `hedged_stream`).
+        Always finishes by putting `(name, _STREAM_DONE, final_text, cut_short)`
+        on `events`, even if the cache or the stream raises.
+        """
+        reply = "(No response)"
+        parts: List[str] = []
+        completed = False
+        cut_short = False
+        try:
+            cached = self._cache_get(cache, payload)
+            if cached:
+                reply = cached
+                parts.append(cached)
+                events.put((name, cached))
+                return
+            for attempt in range(2):
+                started = time.monotonic()
+                try:
+                    for delta in self._primary_stream(name, agent, payload, timeout=budget.timeout(30) if budget else 30):
+                        if not parts:
+                            self.latency.record(f"{name}:first_token", time.monotonic() - started)
+                        parts.append(delta)
+                        events.put((name, delta))
+                        if budget and budget.exhausted():
+                            cut_short = True
+                            break
+                    reply = "".join(parts).strip() or "(No response)"
+                    completed = True
+                    if not cut_short:
+                        self.latency.record(name, time.monotonic() - started)
+                    break
                 except Exception as e:
-                    replies["Moderator"] = f"(Moderator error: {e})"
-                    self.agent_status["Moderator"] = "down"
+                    reply = f"(Request error for {name}: {e})"
+                    self._record_failure(name)
+                    if parts:
+                        # keep the partial text already shown rather than restarting
+                        reply = "".join(parts).strip()
+                        break
+                if attempt == 0:
+                    if budget and budget.exhausted(reserve=1.0):
+                        break
+                    self.logger.info(f"[Orch] retrying {name} (attempt {attempt+2})")
+                    time.sleep(1)
+            if completed and not reply.startswith("("):
+                self._record_success(name)
+                if not cut_short:
+                    self._cache_put(cache, payload, reply)
+        except Exception as e:
+            self.logger.warning(f"[Orch] stream for {name} failed: {e}")
+            if not parts:
+                reply = f"(Request error for {name}: {e})"
+        finally:
+            if not parts:
+                events.put((name, reply))
+            # the consumer in chat_stream waits for this marker from every worker
+            events.put((name, _STREAM_DONE, reply, cut_short))
+
+    def _cache_get(self, cache: Optional[ResponseCache], payload: dict) -> Optional[str]:
+        """`cache.get`, treating a failing cache (e.g. a broken disk tier) as a miss."""
+        if not cache:
+            return None
+        try:
+            return cache.get(payload)
+        except Exception as e:
+            self.logger.warning(f"[Orch] response cache lookup failed: {e}")
+            return None
+
+    def _cache_put(self, cache: Optional[ResponseCache], payload: dict, reply: str) -> None:
+        if not cache:
+            return
+        try:
+            cache.put(payload, reply)
+        except Exception as e:
+            self.logger.warning(f"[Orch] response cache update failed: {e}")
+
+    def _primary_stream(self, name: str, agent: Agent, payload: dict, timeout: float) -> Iterator[str]:
+        """Deltas for a primary call, hedged to a replica server when `use_hedging` is on."""
+        host = self._pick_host(agent)
+        replicas = self._replica_hosts(agent, exclude=host) if self.use_hedging else []
+        if not replicas:
+            return self._stream_generate(host, payload, timeout)
+        # hedge on time to first token, the latency a streaming reader sees
+        hedge_after = self.latency.percentile(f"{name}:first_token") or self.hedge_delay_s
+
+        def won(winner: str) -> None:
+            if winner != host:
+                self.logger.info(f"[Orch] hedged stream for {name} won on {winner}")
+
+        return hedged_stream([host, replicas[0]], payload, timeout, hedge_after, self._stream_generate, on_winner=won)
+
+    def _persist_primary(self, name: str, original_query: str, reply: Optional[str], conv_id: str) -> None:
+        """Persist a primary agent's QA row; timeouts/request errors store the question only."""
+        try:
+            if self.memory_db and reply is not None:
+                low = (reply or "").lower()
+                is_err = reply.startswith("(") and ("timed out" in low or "request error" in low)
+                if is_err:
+                    self.memory_db.save_qa(name, original_query, "", conv_id=conv_id)
+                else:
+                    self.memory_db.save_qa(name, original_query, reply, conv_id=conv_id)
+        except Exception:
+            pass
+
+    async def _acall_primary(self, client, name: str, agent: Agent, payload: dict, cache: Optional[ResponseCache] = None, budget: Optional[LatencyBudget] = None) -> str:
+        """Async variant of `_call_primary` (one retry, same circuit-breaker, budget and cache handling)."""
+        cached = self._cache_get(cache, payload)
+        if cached:
+            return cached
+        reply = "(No response)"
+        for attempt in range(2):
+            started = time.monotonic()
+            try:
+                host = await asyncio.to_thread(self._pick_host, agent)
+                with self._track_host(host):
+                    resp = await client.post(f"{host}/api/generate", json=payload, timeout=budget.timeout(30) if budget else 30)
+                if resp.status_code == 200:
+                    reply = self._reply_text(resp.json()) or "(No response)"
+                    self.latency.record(name, time.monotonic() - started)
+                    break
+                reply = "(Agent unavailable)"
+                self._record_failure(name)
+            except Exception as e:
+                reply = f"(Request error for {name}: {e})"
+                self._record_failure(name)
+            if attempt == 0:
+                if budget and budget.exhausted(reserve=1.0):
+                    break
+                self.logger.info(f"[Orch] retrying {name} (attempt {attempt+2})")
+                await asyncio.sleep(1)
+        if reply and not reply.startswith("("):
+            self._record_success(name)
+            self._cache_put(cache, payload, reply)
+        return reply
+
+    async def _acall_moderator(self, client, original_query: str, replies: Dict[str, str], budget: Optional[LatencyBudget] = None, cache: Optional[ResponseCache] = None, memory=None) -> Tuple[Optional[str], str]:
+        """Async variant of `_call_moderator`."""
+        try:
+            summary_prompt, mpayload = await asyncio.to_thread(self._moderator_payload, original_query, replies, memory)
+        except Exception as e:
+            return None, f"(Moderator error: {e})"
+        cached = self._cache_get(cache, mpayload)
+        if cached:
+            return summary_prompt, cached
+        try:
+            mhost = await asyncio.to_thread(self._pick_host, self.moderator)
+            with self._track_host(mhost):
+                mresp = await client.post(f"{mhost}/api/generate", json=mpayload, timeout=budget.timeout(30) if budget else 30)
+            if mresp.status_code == 200:
+                self.agent_status["Moderator"] = "ok"
+                mtext = self._reply_text(mresp.json()) or "(No moderator response)"
+                self._cache_put(cache, mpayload, mtext)
+                return summary_prompt, mtext
+            self.agent_status["Moderator"] = "down"
+            return None, "(Moderator unavailable)"
+        except Exception as e:
+            self.agent_status["Moderator"] = "down"
+            return None, f"(Moderator error: {e})"
+
+    def _persist_qa(self, name: str, question: str, answer: Optional[str], conv_id: str) -> None:
+        try:
+            if self.memory_db and answer is not None:
+                self.memory_db.save_qa(name, question, answer, conv_id=conv_id)
+        except Exception:
+            pass
+
+    def _persist_group_question(self, target_agent: Optional[str], original_query: str, conv_id: str) -> None:
+        if not target_agent and self.use_group_memory and self.memory_db:
+            try:
+                self.memory_db.save_qa("__group__", original_query, "", conv_id=conv_id)
             except Exception:
                 pass
 
-        return replies
+    def _chained_payload(self, cname: str, cagent: Agent, cquestion: str, target_agent: str, replies: Dict[str, str], memory=None) -> dict:
+        primary = replies.get(target_agent, "")[:800]
+        chained_prompt = f"[Requested by {target_agent}]\nPrimary reply: {primary}\n---\n" + cquestion
+        return {
+            "model": cagent.model,
+            "prompt": PromptBuilder.build_prompt(chained_prompt, cname, cagent, memory or self.memory_db, self.use_memory, self.use_group_memory, target_agent=cname),
+            "system": getattr(cagent, "persona", "") or getattr(cagent, "personality", ""),
+            "stream": False,
+        }
+
+    @staticmethod
+    def _append_chained_replies(replies: Dict[str, str], target_agent: str, chained_calls: List[Tuple[str, str]]) -> None:
+        """Append quoted chained replies to the primary agent's reply so it can quote others."""
+        try:
+            if target_agent in replies and chained_calls:
+                parts = []
+                for cname, _ in chained_calls:
+                    ctext = replies.get(cname, "(no reply)")
+                    parts.append(f"[{cname} replied]: {ctext}")
+                if parts:
+                    replies[target_agent] = replies.get(target_agent, "") + "\n\n" + "\n\n".join(parts)
+        except Exception:
+            pass
+
+    def _rephrase_payload(self, original_query: str, target_agent: str, primary_agent: Agent, chained_calls: List[Tuple[str, str]], replies: Dict[str, str], memory=None) -> dict:
+        primary_before = replies.get(target_agent, "")
+        rephrase_parts = [f"Original question: {original_query}", f"Your original reply: {primary_before}", "Other agents replied:"]
+        for cname, _ in chained_calls:
+            retext = replies.get(cname, "(no reply)")
+            rephrase_parts.append(f"- {cname}: {retext}")
+        # Strongly instruct the primary agent to produce a predictable quoting format
+        # The response must be in the primary agent's voice and follow this exact structure:
+        # <AgentName>: "<final reply content>"
+        # Quoted replies:
+        # - <OtherAgentName>: "<their reply>"
+        # The primary reply should be 1-3 sentences and may include a short justification.
+        rephrase_prompt = (
+            "\n".join(rephrase_parts)
+            + "\n\nPlease produce a revised reply in the voice of "
+            + target_agent
+            + ". Follow this exact format (do not add extra sections):\n"
+            + f"{target_agent}: \"<your reply here>\"\n\nQuoted replies:\n"
+        )
+        for cname, _ in chained_calls:
+            crep = replies.get(cname, "(no reply)")
+            rephrase_prompt += f"- {cname}: \"{crep}\"\n"
+        rephrase_prompt += (
+            "\nKeep the final reply concise (1-3 sentences). If you rely on another agent's answer, briefly cite them in parentheses."
+        )
+        return {
+            "model": getattr(primary_agent, "model", None),
+            "prompt": PromptBuilder.build_prompt(rephrase_prompt, target_agent, primary_agent, memory or self.memory_db, self.use_memory, self.use_group_memory, target_agent=target_agent),
+            "system": f"You are {target_agent}. " + (getattr(primary_agent, "persona", "") or getattr(primary_agent, "personality", "")),
+            "stream": False,
+        }
+
+    @staticmethod
+    def _skipped_primary(replies: ChatReplies) -> List[str]:
+        return [n for n, stages in replies.skipped_stages.items() if "primary" in stages]
+
+    @staticmethod
+    def _quorum_replies(agent_items: List[Tuple[str, Agent]], finished: Dict[str, str], late: List[str],
+                        skipped: List[str] = ()) -> Dict[str, str]:
+        """Replies for a quorum moderator, in agent order, without agents still running.
+
+        `finished` holds every reply already known (including semantic cache
+        hits); agents in `skipped` ran out of budget before their call.
+        """
+        summarized = {}
+        for n, _ in agent_items:
+            if n in late:
+                continue
+            if n in finished:
+                summarized[n] = finished[n]
+            elif n in skipped:
+                summarized[n] = "(Skipped: latency budget exhausted)"
+            else:
+                summarized[n] = "(Agent temporarily unavailable)"
+        return summarized
+
+    def _use_moderator_quorum(self) -> bool:
+        return bool(self.use_moderator and self.moderator and (self.moderator_quorum or self.moderator_deadline_s))
+
+    def _quorum_deadline(self, budget: Optional[LatencyBudget] = None) -> Optional[float]:
+        """Monotonic time by which the moderator stops waiting: `moderator_deadline_s`, clipped to the budget."""
+        deadline = time.monotonic() + self.moderator_deadline_s if self.moderator_deadline_s else None
+        remaining = budget.remaining() if budget else None
+        if remaining is not None:
+            deadline = min(deadline, time.monotonic() + remaining) if deadline else time.monotonic() + remaining
+        return deadline
+
+    def _wait_for_quorum(self, futures: Dict[str, Future], budget: Optional[LatencyBudget] = None) -> Dict[str, str]:
+        """Block until `moderator_quorum` replies are in or `moderator_deadline_s` passes.
+
+        Returns the replies that finished in time; the rest keep running.
+        """
+        quorum = min(self.moderator_quorum or len(futures), len(futures))
+        deadline = self._quorum_deadline(budget)
+        not_done = set(futures.values())
+        while not_done and len(futures) - len(not_done) < quorum:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            done, not_done = wait(not_done, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+        on_time: Dict[str, str] = {}
+        for name, fut in futures.items():
+            if fut.done():
+                try:
+                    on_time[name] = fut.result()
+                except Exception as e:
+                    on_time[name] = f"(Request error for {name}: {e})"
+        return on_time
+
+    async def _await_quorum(self, tasks: Dict[str, "asyncio.Task"], budget: Optional[LatencyBudget] = None) -> Dict[str, str]:
+        """Async `_wait_for_quorum`: the replies of tasks done by the quorum or deadline; the rest keep running."""
+        quorum = min(self.moderator_quorum or len(tasks), len(tasks))
+        deadline = self._quorum_deadline(budget)
+        not_done = set(tasks.values())
+        while not_done and len(tasks) - len(not_done) < quorum:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            done, not_done = await asyncio.wait(not_done, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+        on_time: Dict[str, str] = {}
+        for name, task in tasks.items():
+            if task.done():
+                try:
+                    on_time[name] = task.result()
+                except Exception as e:
+                    on_time[name] = f"(Request error for {name}: {e})"
+        return on_time
+
+    def _call_moderator(self, original_query: str, replies: Dict[str, str], budget: Optional[LatencyBudget] = None, cache: Optional[ResponseCache] = None, memory=None) -> Tuple[Optional[str], str]:
+        """Ask the Moderator to rank `replies`; returns (summary_prompt or None on failure, reply text)."""
+        try:
+            summary_prompt, mpayload = self._moderator_payload(original_query, replies, memory)
+        except Exception as e:
+            return None, f"(Moderator error: {e})"
+        cached = self._cache_get(cache, mpayload)
+        if cached:
+            return summary_prompt, cached
+        try:
+            mresp = self._post_generate(self._pick_host(self.moderator), mpayload, timeout=budget.timeout(30) if budget else 30)
+            if mresp is not None and mresp.status_code == 200:
+                self.agent_status["Moderator"] = "ok"
+                mtext = self._reply_text(mresp.json()) or "(No moderator response)"
+                self._cache_put(cache, mpayload, mtext)
+                return summary_prompt, mtext
+            self.agent_status["Moderator"] = "down"
+            return None, "(Moderator unavailable)"
+        except Exception as e:
+            self.agent_status["Moderator"] = "down"
+            return None, f"(Moderator error: {e})"
+
+    def _moderator_payload(self, original_query: str, replies: Dict[str, str], memory=None) -> Tuple[str, dict]:
+        """Return (summary_prompt, payload) asking the Moderator to rank the replies."""
+        # Build a concise summary prompt containing the question and agent replies
+        summary_parts = [f"Question: {original_query}", "Replies:"]
+        for n, txt in replies.items():
+            summary_parts.append(f"- {n}: {txt}")
+        summary_prompt = "\n".join(summary_parts)
+
+        # Instruct the Moderator to rank and recommend the best answer
+        moderator_instruction = (
+            "You are Moderator. Read the question and the replies and: "
+            "(1) identify which agent gave the best answer, (2) provide a concise authoritative recommendation that cites the chosen reply, "
+            "and (3) include a short justification (1-2 sentences)."
+        )
+
+        mpayload = {
+            "model": getattr(self.moderator, "model", None),
+            "prompt": PromptBuilder.build_prompt(summary_prompt + "\n\nPlease rank these replies and give a single recommended answer.", self.moderator.name, self.moderator, memory or self.memory_db, self.use_memory, self.use_group_memory, target_agent=None),
+            "system": moderator_instruction + " " + (getattr(self.moderator, "persona", "") or getattr(self.moderator, "personality", "")),
+            "stream": False,
+        }
+        return summary_prompt, mpayload
 
     def add_agent(self, name: str, host: str, model: str, persona: str):
         self.agents[name] = Agent(name, host, model, persona)
@@ -361,6 +1319,14 @@ class MultiAgentOrchestrator:
     def set_delegation_usage(self, use_delegation: bool):
         self.use_delegation = bool(use_delegation)
 
+    def set_concurrency_usage(self, use_concurrency: bool, max_workers: Optional[int] = None):
+        self.use_concurrency = bool(use_concurrency)
+        if max_workers is not None:
+            self.max_workers = max(1, int(max_workers))
+
+    def set_streaming_usage(self, use_streaming: bool):
+        self.use_streaming = bool(use_streaming)
+
     def set_memory_usage(self, use_memory: bool):
         self.use_memory = bool(use_memory)
 
@@ -371,6 +1337,12 @@ class MultiAgentOrchestrator:
         self.servers = cfg.get("servers", {})
         self.agent_styles = cfg.get("agent_styles", {})
 
+        # optional HTTP pool sizing: {"http": {"pool_connections": 4, "pool_maxsize": 8}}
+        http_cfg = cfg.get("http") or {}
+        self.http_config = dict(http_cfg)
+        if http_cfg:
+            transport.configure(http_cfg.get("pool_connections"), http_cfg.get("pool_maxsize"))
+
         self.agents = {}
         for agent_cfg in cfg.get("agents", []):
             server_url = self.servers.get(agent_cfg.get("server"), agent_cfg.get("server"))
@@ -379,6 +1351,25 @@ class MultiAgentOrchestrator:
 
         # moderator
         self.use_moderator = cfg.get("use_moderator", False)
+        self.moderator_quorum = cfg.get("moderator_quorum")
+        self.moderator_deadline_s = cfg.get("moderator_deadline_s")
+        self.use_hedging = bool(cfg.get("use_hedging", False))
+        self.use_scheduler = bool(cfg.get("use_scheduler", False))
+        self.scheduler = ServerScheduler(self.servers)
+        # optional near-duplicate reuse: {"semantic_cache": {"enabled": true, "threshold": 0.92}}
+        semantic_cfg = cfg.get("semantic_cache") or {}
+        if semantic_cfg:
+            self.use_semantic_cache = bool(semantic_cfg.get("enabled", True))
+            self.semantic_cache = SemanticCache(threshold=float(semantic_cfg.get("threshold", 0.92)))
+        # optional cache sizing: {"response_cache": {"enabled": true, "max_entries": 256, "ttl_s": 600, "disk_path": "cache.sqlite3"}}
+        cache_cfg = cfg.get("response_cache") or {}
+        if cache_cfg:
+            self.use_response_cache = bool(cache_cfg.get("enabled", True))
+            self.response_cache = ResponseCache(
+                max_entries=int(cache_cfg.get("max_entries", 256)),
+                ttl_s=float(cache_cfg.get("ttl_s", 600.0)),
+                disk_path=cache_cfg.get("disk_path") or os.getenv("RESPONSE_CACHE_PATH") or None,
+            )
         moderator_cfg = cfg.get("moderator")
         if moderator_cfg:
             server_url = self.servers.get(moderator_cfg.get("server"), moderator_cfg.get("server"))
@@ -393,9 +1384,26 @@ class MultiAgentOrchestrator:
             "agent_styles": self.agent_styles,
             "agents": [],
             "use_moderator": self.use_moderator,
+            "moderator_quorum": self.moderator_quorum,
+            "moderator_deadline_s": self.moderator_deadline_s,
+            "use_hedging": self.use_hedging,
+            "use_scheduler": self.use_scheduler,
+            "semantic_cache": {
+                "enabled": self.use_semantic_cache,
+                "threshold": self.semantic_cache.threshold,
+            },
+            "response_cache": {
+                "enabled": self.use_response_cache,
+                "max_entries": self.response_cache.max_entries,
+                "ttl_s": self.response_cache.ttl_s,
+                "disk_path": self.response_cache.disk_path,
+            },
             "moderator": {"server": None, "model": None, "persona": None},
         }
 
+        if self.http_config:
+            cfg["http"] = dict(self.http_config)
+
         for name, agent in self.agents.items():
             if name == "Moderator":
                 continue
@@ -441,7 +1449,7 @@ class MultiAgentOrchestrator:
                 ok = False
                 for u in urls:
                     try:
-                        r = requests.get(u, timeout=timeout)
+                        r = transport.get(u, timeout=timeout)
                         if r is not None and r.status_code == 200:
                             ok = True
                             break
@@ -32,6 +32,52 @@ class PromptBuilder:
             out.append(f"Q: {q} A: {a}")
         return out
 
+    @staticmethod
+    def select_memories(memory_db, agent_name: Optional[str], original_query: str) -> List[dict]:
+        """Relevance-ranked memories when the store offers them, else the most recent ones."""
+        relevant = getattr(memory_db, "relevant_qa", None)
+        if relevant is not None:
+            ranked = relevant(agent_name, original_query, limit=3)
+            if ranked is not None:
+                return ranked
+        return memory_db.load_recent_qa(agent_name, limit=10)
+
+    @staticmethod
+    def select_summaries(memory_db, agent_name: Optional[str]) -> List[dict]:
+        """Newest long-term summaries (see `compaction.py`), if the store keeps any."""
+        load = getattr(memory_db, "load_summaries", None)
+        return list(load(agent_name, limit=2) or []) if load is not None else []
+
+    @staticmethod
+    def drop_summarized(memories: List[dict], summaries: List[dict]) -> List[dict]:
+        """Drop memories at or before the newest summary's `last_ts`: the summary already covers them."""
+        covered = max((s['last_ts'] for s in summaries if s.get('last_ts') is not None), default=None)
+        if covered is None:
+            return memories
+        kept = []
+        for item in memories:
+            try:
+                if item.get('ts') is not None and item['ts'] <= covered:
+                    continue
+            except TypeError:
+                pass
+            kept.append(item)
+        return kept
+
+    @staticmethod
+    def context_block(label: str, memories: List[dict], summaries: List[dict]) -> str:
+        parts = []
+        if summaries:
+            # oldest first, so the summaries read in order
+            text = " | ".join(s['summary'].strip() for s in reversed(summaries))
+            parts.append(f"[{label} long-term summary: " + text + "]\n\n")
+        filtered = [item for item in PromptBuilder.drop_summarized(memories, summaries)
+                    if item.get('a') and not PromptBuilder.is_error_text(item.get('a'))]
+        if filtered:
+            formatted = PromptBuilder.format_memories(filtered, limit=3)
+            parts.append(f"[{label} recent context: " + " | ".join(formatted) + "]\n\n")
+        return "".join(parts)
+
     @staticmethod
     def build_prompt(original_query: str,
                      agent_name: str,
@@ -43,7 +89,12 @@ class PromptBuilder:
         """Return the prompt string for the given agent.
 
         - `agent_obj` is the Agent instance (for persona, model, etc.)
-        - `memory_db` is optional and should expose `load_recent_qa(name, limit)`
+        - `memory_db` is optional and should expose `load_recent_qa(name, limit)`;
+          the orchestrator passes a per-chat `MemorySnapshot` so no SQL runs here.
+          If it also has `relevant_qa(name, query, limit)` returning a list,
+          those memories are injected instead of the most recent ones.
+          With `load_summaries(name, limit)` the newest long-term summaries
+          go first and raw memories they already cover are left out.
         """
         prompt = original_query
 
@@ -52,20 +103,16 @@ class PromptBuilder:
 
         try:
             # Per-agent memories
-            agent_qa = memory_db.load_recent_qa(agent_name, limit=10)
-            filtered_agent_qa = [item for item in agent_qa if item.get('a') and not PromptBuilder.is_error_text(item.get('a'))]
-            if filtered_agent_qa:
-                formatted = PromptBuilder.format_memories(filtered_agent_qa, limit=3)
-                prompt = "[Agent recent context: " + " | ".join(formatted) + "]\n\n" + prompt
+            agent_qa = PromptBuilder.select_memories(memory_db, agent_name, original_query)
+            agent_summaries = PromptBuilder.select_summaries(memory_db, agent_name)
+            prompt = PromptBuilder.context_block("Agent", agent_qa, agent_summaries) + prompt
 
             # Group memories: include for broadcasts or when explicitly enabled
             include_group = (target_agent is None) or use_group_memory
             if include_group:
-                group_qa = memory_db.load_recent_qa(None, limit=10)
-                filtered_group_qa = [item for item in group_qa if item.get('a') and not PromptBuilder.is_error_text(item.get('a'))]
-                if filtered_group_qa:
-                    gformatted = PromptBuilder.format_memories(filtered_group_qa, limit=3)
-                    prompt = "[Group recent context: " + " | ".join(gformatted) + "]\n\n" + prompt
+                group_qa = PromptBuilder.select_memories(memory_db, None, original_query)
+                group_summaries = PromptBuilder.select_summaries(memory_db, None)
+                prompt = PromptBuilder.context_block("Group", group_qa, group_summaries) + prompt
         except Exception:
             # Any memory errors should not stop prompt building
             pass
@@ -0,0 +1,118 @@
+"""Exact-match cache for `/api/generate` replies.
+
+Entries are keyed on (model, system prompt, final prompt, generation options)
+and held in an in-process LRU tier, optionally backed by a SQLite file so they
+survive Streamlit restarts. Both tiers honour the same TTL; the disk tier is
+trimmed to `disk_max_entries` oldest-first.
+
+Error replies such as "(Request error ...)" or "(Agent unavailable)" are never
+stored.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def cache_key(payload: dict) -> str:
+    material = {
+        "model": payload.get("model"),
+        "system": payload.get("system"),
+        "prompt": payload.get("prompt"),
+        "options": payload.get("options"),
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def is_cacheable(text: Optional[str]) -> bool:
+    # orchestrator status/error replies are parenthesised, e.g. "(Request error for X: ...)"
+    return bool(text) and not text.startswith("(")
+
+
+class ResponseCache:
+    def __init__(self,
+                 max_entries: int = 256,
+                 ttl_s: float = 600.0,
+                 disk_path: Optional[str] = None,
+                 disk_max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, text TEXT NOT NULL, created REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS response_cache_created ON response_cache (created)")
+            self._db.commit()
+
+    def get(self, payload: dict) -> Optional[str]:
+        key = cache_key(payload)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, text = entry
+                if now - created < self.ttl_s:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return text
+                del self._entries[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT text, created FROM response_cache WHERE key=?", (key,)).fetchone()
+                if row and now - row[1] < self.ttl_s:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, payload: dict, text: Optional[str]) -> None:
+        if not is_cacheable(text):
+            return
+        key = cache_key(payload)
+        now = time.time()
+        with self._lock:
+            self._remember(key, text, now)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO response_cache (key, text, created) VALUES (?, ?, ?)", (key, text, now))
+                self._db.execute("DELETE FROM response_cache WHERE created < ?", (now - self.ttl_s,))
+                self._db.execute(
+                    "DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, text: str, created: float) -> None:
+        self._entries[key] = (created, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM response_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "entries": len(self._entries),
+            }
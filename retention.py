@@ -0,0 +1,248 @@
+"""Time-based retention for `agent_memory`: per-agent TTLs, rollups and monthly partitions.
+
+A `RetentionPolicy` gives each agent a time-to-live in days (`None` keeps
+rows forever). `RetentionJob.run()` removes expired rows in three steps,
+never deleting anything it has not first recorded:
+
+1. archive: the rows are streamed (`MemoryDB.iter_export_rows`) into a
+   date-partitioned Parquet archive (`memory_parquet.py`);
+2. rollup: per-agent, per-day row counts go into `agent_memory_rollup`;
+3. prune: on a partitioned table, whole months past every agent's TTL are
+   removed with `DROP PARTITION` (no row-by-row delete); remaining expired
+   rows are deleted per agent in small `DELETE ... LIMIT` chunks so the
+   table is never locked for long.
+
+Monthly RANGE partitioning on `timestamp` is opt-in (`partition_table`):
+MySQL requires the partition column in the primary key, so the key becomes
+`(id, timestamp)`, and InnoDB does not support FULLTEXT indexes on
+partitioned tables, so `ft_qa` (used by `MemoryDB.search`) has to be
+dropped first. `ensure_partitions` keeps empty partitions ahead of `now`.
+
+`scripts/apply_retention.py` runs the job from cron / Task Scheduler.
+"""
+
+import calendar
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_PARTITION = "pmax"
+
+
+class RetentionPolicy:
+    def __init__(self, default_days: Optional[int] = None, agent_days: Optional[Dict[str, Optional[int]]] = None):
+        self.default_days = default_days
+        self.agent_days = dict(agent_days or {})
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        """`MEMORY_RETENTION_DAYS` (default TTL, unset or 0 = forever) and
+        `MEMORY_RETENTION_AGENT_DAYS` (`Perry=30,__group__=365`; 0 = forever)."""
+        def days(value: str) -> Optional[int]:
+            n = int(value)
+            return n if n > 0 else None
+
+        default = os.getenv("MEMORY_RETENTION_DAYS", "").strip()
+        agent_days: Dict[str, Optional[int]] = {}
+        for item in os.getenv("MEMORY_RETENTION_AGENT_DAYS", "").split(","):
+            if "=" in item:
+                name, value = item.rsplit("=", 1)
+                agent_days[name.strip()] = days(value.strip())
+        return cls(days(default) if default else None, agent_days)
+
+    def ttl_days(self, agent_name: str) -> Optional[int]:
+        return self.agent_days.get(agent_name, self.default_days)
+
+    def cutoff(self, agent_name: str, now: datetime) -> Optional[datetime]:
+        ttl = self.ttl_days(agent_name)
+        return None if ttl is None else now - timedelta(days=ttl)
+
+    def horizon(self, agent_names: Iterable[str], now: datetime) -> Optional[datetime]:
+        """Oldest cutoff over `agent_names` and the default: rows older than this are expired for everyone."""
+        ttls = [self.ttl_days(a) for a in agent_names] + [self.default_days] + list(self.agent_days.values())
+        if any(t is None for t in ttls):
+            return None
+        return now - timedelta(days=max(ttls))
+
+    def __bool__(self) -> bool:
+        return self.default_days is not None or any(d is not None for d in self.agent_days.values())
+
+
+# --- monthly partitions -------------------------------------------------------
+
+def _month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def _next_month(dt: datetime) -> datetime:
+    return _month_start(dt + timedelta(days=calendar.monthrange(dt.year, dt.month)[1]))
+
+
+def _partition_def(upper: datetime) -> str:
+    # partition pYYYYMM holds the month before `upper`
+    month = _month_start(upper - timedelta(days=1))
+    return f"PARTITION p{month:%Y%m} VALUES LESS THAN (UNIX_TIMESTAMP('{upper:%Y-%m-%d %H:%M:%S}'))"
+
+
+def list_partitions(cur) -> List[Tuple[str, Optional[int]]]:
+    """[(name, upper bound as a unix timestamp or None for MAXVALUE)] in order; empty if unpartitioned."""
+    cur.execute(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'agent_memory' AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    )
+    return [(name, None if str(desc).upper() == "MAXVALUE" else int(desc)) for name, desc in cur.fetchall()]
+
+
+def partition_table(cur, first_month: datetime, now: datetime, months_ahead: int = 2) -> None:
+    """Convert agent_memory to monthly RANGE partitions from `first_month` to `months_ahead` past `now`."""
+    import migrations
+
+    if list_partitions(cur):
+        return
+    if migrations._index_exists(cur, "agent_memory", "ft_qa"):
+        raise RuntimeError("agent_memory has the FULLTEXT index ft_qa, which partitioned InnoDB tables do not "
+                           "support; drop it first (MemoryDB.search stops working without it)")
+    uppers = []
+    upper = _next_month(_month_start(first_month))
+    last = _month_start(now)
+    for _ in range(months_ahead):
+        last = _next_month(last)
+    while upper <= _next_month(last):
+        uppers.append(upper)
+        upper = _next_month(upper)
+    cur.execute("UPDATE agent_memory SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+    cur.execute("ALTER TABLE agent_memory MODIFY timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+                "DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp)")
+    parts = ", ".join([_partition_def(u) for u in uppers] + [f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE"])
+    logger.info(f"[retention] Partitioning agent_memory into {len(uppers) + 1} partitions")
+    cur.execute(f"ALTER TABLE agent_memory PARTITION BY RANGE (UNIX_TIMESTAMP(timestamp)) ({parts})")
+
+
+def ensure_partitions(cur, now: datetime, months_ahead: int = 2) -> List[str]:
+    """Split `pmax` so empty monthly partitions exist `months_ahead` past `now`; returns the new names."""
+    partitions = list_partitions(cur)
+    bounded = [b for _, b in partitions if b is not None]
+    if not bounded:
+        return []
+    upper = datetime.fromtimestamp(max(bounded))
+    target = _month_start(now)
+    for _ in range(months_ahead + 1):
+        target = _next_month(target)
+    new = []
+    while upper < target:
+        upper = _next_month(upper)
+        new.append(upper)
+    if not new:
+        return []
+    parts = ", ".join([_partition_def(u) for u in new] + [f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE"])
+    cur.execute(f"ALTER TABLE agent_memory REORGANIZE PARTITION {MAX_PARTITION} INTO ({parts})")
+    return [f"p{_month_start(u - timedelta(days=1)):%Y%m}" for u in new]
+
+
+# --- the job --------------------------------------------------------------------
+
+_ROLLUP_SQL = (
+    "INSERT INTO agent_memory_rollup (agent_name, day, row_count, first_ts, last_ts) "
+    "SELECT agent_name, DATE(timestamp), COUNT(*), MIN(timestamp), MAX(timestamp) FROM agent_memory "
+    "WHERE {where} GROUP BY agent_name, DATE(timestamp) "
+    "ON DUPLICATE KEY UPDATE row_count = row_count + VALUES(row_count), "
+    "first_ts = LEAST(first_ts, VALUES(first_ts)), last_ts = GREATEST(last_ts, VALUES(last_ts))"
+)
+
+
+class RetentionJob:
+    def __init__(self, db, policy: RetentionPolicy, archive_dir: Optional[str] = "memory_archive",
+                 delete_chunk: int = 5000, months_ahead: int = 2):
+        """`archive_dir=None` skips the Parquet archive (the rollup is still written)."""
+        self.db = db
+        self.policy = policy
+        self.archive_dir = archive_dir
+        self.delete_chunk = delete_chunk
+        self.months_ahead = months_ahead
+
+    def _archive(self, agent: Optional[str], before: datetime) -> int:
+        if self.archive_dir is None:
+            return 0
+        from memory_parquet import write_parquet
+
+        rows = self.db.iter_export_rows(agent=agent, before=before)
+        return write_parquet(rows, self.archive_dir)["rows"]
+
+    def _agents(self) -> List[str]:
+        with self.db.cursor() as cur:
+            cur.execute("SELECT DISTINCT agent_name FROM agent_memory")
+            return [r[0] for r in cur.fetchall()]
+
+    def _drop_partitions(self, horizon: datetime, report: dict) -> None:
+        with self.db.cursor() as cur:
+            partitions = list_partitions(cur)
+        limit = horizon.timestamp()
+        for name, upper in partitions:
+            if upper is None or upper > limit:
+                break
+            boundary = datetime.fromtimestamp(upper)
+            report["archived"] += self._archive(None, boundary)
+            with self.db.cursor() as cur:
+                cur.execute(_ROLLUP_SQL.format(where="timestamp < %s"), (boundary,))
+                cur.execute("SELECT COUNT(*) FROM agent_memory PARTITION (" + name + ")")
+                report["pruned"] += cur.fetchone()[0]
+                cur.execute(f"ALTER TABLE agent_memory DROP PARTITION {name}")
+            report["dropped_partitions"].append(name)
+
+    def _prune_agent(self, agent: str, cutoff: datetime, report: dict) -> None:
+        with self.db.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM agent_memory WHERE agent_name=%s AND timestamp < %s", (agent, cutoff))
+            if not cur.fetchone()[0]:
+                return
+        report["archived"] += self._archive(agent, cutoff)
+        with self.db.cursor() as cur:
+            cur.execute(_ROLLUP_SQL.format(where="agent_name=%s AND timestamp < %s"), (agent, cutoff))
+            while True:
+                cur.execute("DELETE FROM agent_memory WHERE agent_name=%s AND timestamp < %s LIMIT %s",
+                            (agent, cutoff, self.delete_chunk))
+                report["pruned"] += cur.rowcount
+                if cur.rowcount < self.delete_chunk:
+                    break
+
+    def expired_counts(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """{agent: rows past its TTL} without changing anything (dry run)."""
+        now = now or datetime.now()
+        counts = {}
+        for agent in self._agents():
+            cutoff = self.policy.cutoff(agent, now)
+            if cutoff is None:
+                continue
+            with self.db.cursor() as cur:
+                cur.execute("SELECT COUNT(*) FROM agent_memory WHERE agent_name=%s AND timestamp < %s", (agent, cutoff))
+                counts[agent] = cur.fetchone()[0]
+        return counts
+
+    def run(self, now: Optional[datetime] = None) -> dict:
+        """Archive, roll up and delete expired rows; returns counts of what was done."""
+        now = now or datetime.now()
+        report = {"archived": 0, "pruned": 0, "dropped_partitions": [], "new_partitions": []}
+        if not self.policy:
+            return report
+        self.db.flush()
+        agents = self._agents()
+        horizon = self.policy.horizon(agents, now)
+        with self.db.cursor() as cur:
+            partitioned = bool(list_partitions(cur))
+        if partitioned and horizon is not None:
+            self._drop_partitions(horizon, report)
+        for agent in agents:
+            cutoff = self.policy.cutoff(agent, now)
+            if cutoff is not None:
+                self._prune_agent(agent, cutoff, report)
+        if partitioned:
+            with self.db.cursor() as cur:
+                report["new_partitions"] = ensure_partitions(cur, now, self.months_ahead)
+        if report["pruned"] and self.db.hot.size > 0:
+            self.db.warm_hot_tier()
+        logger.info(f"[retention] archived {report['archived']}, pruned {report['pruned']} rows; "
+                    f"dropped partitions: {', '.join(report['dropped_partitions']) or 'none'}")
+        return report
@@ -0,0 +1,120 @@
+"""Call-time server selection for agents.
+
+Instead of always sending an agent's requests to its configured `server`, the
+scheduler picks, among the servers in the `servers` pool that have the model
+(`/api/tags`), the best one right now:
+
+1. servers with the model already resident in memory (`/api/ps`) first,
+2. then the fewest requests currently in flight from this process,
+3. ties go to the agent's configured server.
+
+If no server reports the model, the configured server is used unchanged.
+
+`pick` runs on the request path, so it never probes a server itself: it
+reads the last `/api/tags` and `/api/ps` results and, when they are older
+than `tags_ttl` / `ps_ttl`, starts a background refresh. Until a server's
+first probe lands it is not a candidate, so a cold scheduler sends requests
+to the configured server. `refresh()` probes every server synchronously
+(warm-up, tests).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from server_utils import get_models_for_server, get_running_models
+
+
+class ServerScheduler:
+    def __init__(self, servers: Optional[Dict[str, str]] = None, ps_ttl: float = 5.0, tags_ttl: float = 60.0):
+        self.servers: Dict[str, str] = dict(servers or {})
+        self.ps_ttl = ps_ttl
+        self.tags_ttl = tags_ttl
+        self._in_flight: Dict[str, int] = {}
+        # host -> (probed at, models) from /api/ps and /api/tags
+        self._resident: Dict[str, Tuple[float, List[str]]] = {}
+        self._available: Dict[str, Tuple[float, List[str]]] = {}
+        # (cache name, host) probes currently running in the background
+        self._refreshing: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def in_flight(self, host: str) -> int:
+        with self._lock:
+            return self._in_flight.get(host, 0)
+
+    @contextmanager
+    def track(self, host: str) -> Iterator[None]:
+        """Count a request against `host` for as long as the block runs."""
+        with self._lock:
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[host] = max(0, self._in_flight.get(host, 0) - 1)
+
+    def _cached(self, name: str, host: str) -> List[str]:
+        """Last probe result for `host` (empty before the first); stale ones are refreshed in the background."""
+        cache, ttl, _ = self._probes()[name]
+        now = time.monotonic()
+        with self._lock:
+            hit = cache.get(host)
+            start = (hit is None or now - hit[0] >= ttl) and (name, host) not in self._refreshing
+            if start:
+                self._refreshing.add((name, host))
+        if start:
+            threading.Thread(target=self._probe, args=(name, host), name="scheduler-probe", daemon=True).start()
+        return hit[1] if hit else []
+
+    def _probes(self) -> Dict[str, Tuple[Dict[str, Tuple[float, List[str]]], float, Callable[[str], List[str]]]]:
+        return {
+            "tags": (self._available, self.tags_ttl, get_models_for_server),
+            "ps": (self._resident, self.ps_ttl, get_running_models),
+        }
+
+    def _probe(self, name: str, host: str) -> None:
+        cache, _, probe = self._probes()[name]
+        try:
+            models = probe(host)
+        except Exception:
+            models = []
+        with self._lock:
+            cache[host] = (time.monotonic(), models)
+            self._refreshing.discard((name, host))
+
+    def refresh(self) -> None:
+        """Probe every server now, blocking until done."""
+        for host in self.servers.values():
+            if host:
+                for name in ("tags", "ps"):
+                    self._probe(name, host)
+
+    def resident_models(self, host: str) -> List[str]:
+        return self._cached("ps", host)
+
+    def candidates(self, model: str) -> List[str]:
+        return [host for host in self.servers.values() if host and model in self._cached("tags", host)]
+
+    def pick(self, model: Optional[str], fallback_host: str) -> str:
+        """Return the host that should serve `model` now (see module docstring)."""
+        if not model:
+            return fallback_host
+        hosts = self.candidates(model)
+        if not hosts:
+            return fallback_host
+
+        def score(host: str):
+            resident = model in self.resident_models(host)
+            return (0 if resident else 1, self.in_flight(host), 0 if host == fallback_host else 1)
+
+        return min(hosts, key=score)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Return {host: {'in_flight', 'resident'}} for the sidebar."""
+        out = {}
+        for name, host in self.servers.items():
+            with self._lock:
+                resident = self._resident.get(host, (0.0, []))[1]
+            out[name] = {"in_flight": self.in_flight(host), "resident": list(resident)}
+        return out
@@ -0,0 +1,83 @@
+r"""Apply memory retention: archive, roll up and delete rows past their TTL.
+
+TTLs come from `MEMORY_RETENTION_DAYS` / `MEMORY_RETENTION_AGENT_DAYS`
+(see `retention.py`) unless `--days` / `--agent-days` are given. Expired
+rows are written to a Parquet archive under `--archive-dir` and counted in
+`agent_memory_rollup` before they are deleted. Run it daily from cron or
+Task Scheduler.
+
+`--partition` converts agent_memory to monthly partitions first (one-off;
+requires dropping the FULLTEXT index `ft_qa`, see `retention.py`).
+
+Usage (PowerShell):
+
+    .\.venv\Scripts\python.exe scripts\apply_retention.py --dry-run
+    .\.venv\Scripts\python.exe scripts\apply_retention.py --days 180 --agent-days "__group__=0,Moderator=30"
+"""
+import sys
+import argparse
+import logging
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from memory import MemoryDB
+from retention import RetentionJob, RetentionPolicy, partition_table
+
+
+def parse_agent_days(value: str):
+    out = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, days = item.rsplit("=", 1)
+            out[name.strip()] = int(days) if int(days) > 0 else None
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive and delete agent_memory rows past their TTL")
+    parser.add_argument("--days", type=int, help="default TTL in days (0 = keep forever)")
+    parser.add_argument("--agent-days", help="per-agent TTLs, e.g. 'Perry=30,__group__=0'")
+    parser.add_argument("--archive-dir", default=str(Path(__file__).resolve().parent / "exports" / "memory_archive"))
+    parser.add_argument("--no-archive", action="store_true", help="skip the Parquet archive (rollup counts are still kept)")
+    parser.add_argument("--partition", action="store_true", help="convert agent_memory to monthly partitions first")
+    parser.add_argument("--dry-run", action="store_true", help="only report how many rows are expired per agent")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger = logging.getLogger(__name__)
+    policy = RetentionPolicy.from_env()
+    if args.days is not None:
+        policy.default_days = args.days if args.days > 0 else None
+    if args.agent_days:
+        policy.agent_days.update(parse_agent_days(args.agent_days))
+    if not policy:
+        logger.warning("No TTL configured; set MEMORY_RETENTION_DAYS or pass --days / --agent-days")
+        return 2
+
+    db = MemoryDB(hot_size=0)
+    if not db.is_connected():
+        logger.warning("MemoryDB not connected; check DB env vars or .env file")
+        return 2
+    try:
+        job = RetentionJob(db, policy, archive_dir=None if args.no_archive else args.archive_dir)
+        if args.dry_run:
+            for agent, count in sorted(job.expired_counts().items()):
+                logger.info(f"{agent}: {count} expired rows (TTL {policy.ttl_days(agent)} days)")
+            return 0
+        if args.partition:
+            with db.cursor() as cur:
+                cur.execute("SELECT MIN(timestamp) FROM agent_memory")
+                first = cur.fetchone()[0] or datetime.now()
+                partition_table(cur, first, datetime.now())
+        report = job.run()
+        logger.info(f"Archived {report['archived']} rows, pruned {report['pruned']}; "
+                    f"dropped partitions: {', '.join(report['dropped_partitions']) or 'none'}; "
+                    f"new partitions: {', '.join(report['new_partitions']) or 'none'}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+"""Embed existing agent_memory QA rows into an on-disk FAISS index.
+
+Rows are read in id order with keyset pagination (`WHERE id > last_id`), so
+memory use stays flat however large the table is. Batches are embedded
+across a process pool, each worker loading the model once. The index and
+its `last_id` are checkpointed every `--checkpoint-every` batches; rerunning
+the command resumes after the last checkpoint.
+
+Point `MemoryDB.enable_semantic_memory(index_path=...)` (or
+`SEMANTIC_MEMORY_INDEX`) at the output directory to reuse the vectors.
+
+Usage (PowerShell):
+
+    .\.venv\Scripts\python.exe scripts\backfill_embeddings.py --out embeddings_index --workers 4
+"""
+import sys
+import os
+import argparse
+import logging
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from embedding_store import EmbeddingStore
+from embeddings import DEFAULT_MODEL, Embedder
+from memory import MemoryDB
+from semantic_memory import qa_text
+
+_worker_embedder = None
+
+
+def _init_worker(embedder_factory, model_name):
+    global _worker_embedder
+    _worker_embedder = embedder_factory(model_name)
+
+
+def _embed_batch(batch):
+    """Worker: return (ids, vectors) for rows worth indexing (error replies are skipped)."""
+    keep = [(rid, q, a) for rid, q, a in batch if a and not a.startswith('(')]
+    if not keep:
+        return [], None
+    vectors = _worker_embedder.encode([qa_text(q, a) for _, q, a in keep])
+    return [rid for rid, _, _ in keep], vectors
+
+
+def iter_batches(db, after_id, batch_size):
+    """Yield lists of (id, question, answer) in id order, starting after `after_id`."""
+    sql = ('SELECT id, question, answer FROM agent_memory WHERE id > %s '
+           'AND (question IS NOT NULL OR answer IS NOT NULL) ORDER BY id LIMIT %s')
+    while True:
+        rows = db._try_execute(sql, (after_id, batch_size), fetch=True)
+        if not rows:
+            return
+        yield [(rid, q or '', a or '') for rid, q, a in rows]
+        after_id = rows[-1][0]
+
+
+def run(db, store, model_name, batch_size=256, workers=2, checkpoint_every=20, logger=None, embedder_factory=Embedder):
+    logger = logger or logging.getLogger(__name__)
+    if store.state.get('model') not in (None, model_name):
+        raise SystemExit(f"Index at {store.path} was built with {store.state['model']}; use a new --out for {model_name}")
+    store.state['model'] = model_name
+    start_id = int(store.state.get('last_id') or 0)
+    logger.info(f"Backfilling from id > {start_id} with {workers} workers, batch size {batch_size}")
+
+    started = time.monotonic()
+    scanned = 0
+    batches_done = 0
+    last_id = start_id
+    in_flight = deque()
+
+    def complete_oldest():
+        nonlocal scanned, batches_done, last_id
+        batch_last_id, batch_len, fut = in_flight.popleft()
+        ids, vectors = fut.result()
+        if ids:
+            store.add(ids, vectors)
+        scanned += batch_len
+        batches_done += 1
+        last_id = batch_last_id
+        if batches_done % checkpoint_every == 0:
+            store.checkpoint(last_id)
+            rate = scanned / max(1e-9, time.monotonic() - started)
+            logger.info(f"checkpoint: last_id={last_id}, {scanned} rows scanned, {store.state['rows']} indexed, {rate:.0f} rows/s")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(embedder_factory, model_name)) as pool:
+        for batch in iter_batches(db, start_id, batch_size):
+            in_flight.append((batch[-1][0], len(batch), pool.submit(_embed_batch, batch)))
+            # results are applied in id order so last_id never skips an unfinished batch
+            while len(in_flight) >= workers * 2:
+                complete_oldest()
+        while in_flight:
+            complete_oldest()
+
+    store.checkpoint(last_id)
+    elapsed = time.monotonic() - started
+    rate = scanned / elapsed if elapsed > 0 else 0.0
+    logger.info(f"done: {scanned} rows in {elapsed:.1f}s ({rate:.0f} rows/s); index holds {store.state['rows']} vectors, last_id={last_id}")
+    return scanned
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill QA embeddings into an on-disk FAISS index')
+    parser.add_argument('--out', default='embeddings_index', help='index directory (resumed if it exists)')
+    parser.add_argument('--model', default=os.getenv('EMBEDDING_MODEL', DEFAULT_MODEL))
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--checkpoint-every', type=int, default=20, help='batches between checkpoints')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    logger = logging.getLogger(__name__)
+    db = MemoryDB(hot_size=0)
+    if not db.is_connected():
+        logger.warning('MemoryDB not connected; check DB env vars')
+        return 1
+    try:
+        store = EmbeddingStore(args.out).load()
+        run(db, store, args.model, args.batch_size, args.workers, args.checkpoint_every, logger)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""EXPLAIN the hot agent_memory queries and flag full scans / filesorts.
+
+Runs pending schema migrations first (constructing MemoryDB does that), then
+prints each plan. Exits with status 1 if any hot query still scans the whole
+table or sorts in a filesort, e.g. because an index is missing.
+
+Usage:
+  .\.venv\Scripts\python.exe scripts\check_query_plans.py
+"""
+import sys
+import os
+import logging
+
+# Ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import migrations
+from memory import MemoryDB
+
+
+def main() -> int:
+    logger = logging.getLogger(__name__)
+    db = MemoryDB()
+    if not db.is_connected():
+        logger.warning("MemoryDB not connected")
+        return 1
+    try:
+        with db.cursor() as cur:
+            version = migrations.current_version(cur)
+        logger.info(f"Schema version: {version} (latest {migrations.LATEST_VERSION})")
+
+        report = db.explain_hot_queries()
+        problems = 0
+        for name, result in report.items():
+            logger.info(f"{name}:")
+            for row in result["plan"]:
+                logger.info(f"  table={row.get('table')} type={row.get('type')} key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}")
+            for warning in result["warnings"]:
+                problems += 1
+                logger.warning(f"  ! {warning}")
+        return 1 if problems else 0
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(main())
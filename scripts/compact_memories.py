@@ -0,0 +1,51 @@
+r"""Summarize old agent_memory rows once (the same pass the background worker runs).
+
+Rows older than `--min-age-days` are grouped per agent and day and
+summarized by the model on `COMPACTION_HOST` / `COMPACTION_MODEL` (see
+`compaction.py`). Summarized rows are kept but marked `compacted`, and the
+prompt uses the summary in their place.
+
+Usage (PowerShell):
+
+    $env:COMPACTION_HOST = "http://localhost:11434"; $env:COMPACTION_MODEL = "qwen2.5:1.5b"
+    .\.venv\Scripts\python.exe scripts\compact_memories.py --min-age-days 7 --max-groups 50
+"""
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from compaction import CompactionJob, OllamaSummarizer
+from memory import MemoryDB
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize old agent_memory rows into memory_summaries")
+    parser.add_argument("--min-age-days", type=float, default=7, help="only summarize rows older than this")
+    parser.add_argument("--max-rows", type=int, default=40, help="rows per summary")
+    parser.add_argument("--max-groups", type=int, default=20, help="summaries to write in this run")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger = logging.getLogger(__name__)
+    summarizer = OllamaSummarizer.from_env()
+    if summarizer is None:
+        logger.warning("Set COMPACTION_HOST and COMPACTION_MODEL")
+        return 2
+    db = MemoryDB(hot_size=0)
+    if not db.is_connected():
+        logger.warning("MemoryDB not connected; check DB env vars or .env file")
+        return 2
+    try:
+        job = CompactionJob(db, summarizer, min_age_days=args.min_age_days, max_rows=args.max_rows,
+                            max_groups=args.max_groups)
+        done = job.run_once()
+        logger.info(f"Wrote {done['summaries']} summaries covering {done['rows']} memories")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,35 +1,43 @@
 import sys
 from pathlib import Path
-import csv
+import argparse
 import datetime
 import logging
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from memory import MemoryDB
+from memory_export import FORMATS
 
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export every agent_memory row, then clear the table')
+    parser.add_argument('--format', choices=FORMATS + ('parquet',), default='csv',
+                        help='parquet writes a date-partitioned archive directory (needs pyarrow)')
+    args = parser.parse_args(argv)
     out_dir = Path(__file__).resolve().parent / 'exports'
     out_dir.mkdir(exist_ok=True)
     db = MemoryDB()
     if not db.is_connected():
         logging.getLogger(__name__).warning('[export_and_clear] MemoryDB not connected; aborting')
         return 2
-    logging.getLogger(__name__).info('[export_and_clear] Fetching all rows from agent_memory')
-    rows = db._try_execute('SELECT agent_name, question, answer, conv_id, timestamp FROM agent_memory ORDER BY timestamp DESC', (), fetch=True)
-    count = len(rows) if rows else 0
     ts = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
-    out_file = out_dir / f'all_memories_export_{ts}.csv'
-
+    # a parquet export is a directory of date partitions
+    suffix = '' if args.format == 'parquet' else f'.{args.format}'
+    out_file = out_dir / f'all_memories_export_{ts}{suffix}'
+    logging.getLogger(__name__).info(f'[export_and_clear] Streaming all rows from agent_memory to {out_file}')
+    try:
+        count = db.export(out_file, args.format)
+    except Exception as e:
+        # never clear without a complete export
+        logging.getLogger(__name__).error(f'[export_and_clear] Export failed, nothing was cleared: {e}')
+        db.close()
+        return 1
     if count == 0:
+        if out_file.is_file():
+            out_file.unlink()
         logging.getLogger(__name__).info('[export_and_clear] No rows found to export')
     else:
-        logging.getLogger(__name__).info(f'[export_and_clear] Writing {count} rows to {out_file}')
-        with out_file.open('w', newline='', encoding='utf-8') as f:
-            w = csv.writer(f)
-            w.writerow(['agent_name', 'question', 'answer', 'conv_id', 'timestamp'])
-            for agent_name, q, a, conv_id, t in rows:
-                w.writerow([agent_name or '', q or '', a or '', conv_id or '', t or ''])
+        logging.getLogger(__name__).info(f'[export_and_clear] Wrote {count} rows to {out_file}')
 
     # Now clear all
     logging.getLogger(__name__).info('[export_and_clear] Clearing all memories from DB')
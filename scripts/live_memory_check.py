@@ -1,6 +1,6 @@
 """Simulate addressed and broadcast messages against the orchestrator.
 
-This script monkeypatches `requests.post` to return deterministic replies
+This script monkeypatches `transport.post` to return deterministic replies
 so we can exercise memory saving and filtering without external servers.
 """
 import sys
@@ -10,7 +10,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from config import MultiAgentOrchestrator
 from memory import MemoryDB
-import requests
+import transport
 import time
 import logging
 
@@ -71,9 +71,9 @@ def main():
         "Hello all": "Broadcast reply from NettyTest",
     }
 
-    # Monkeypatch requests.post used by orchestrator.chat
-    requests_post_orig = requests.post
-    requests.post = make_fake_post(mapping)
+    # Monkeypatch transport.post used by orchestrator.chat
+    requests_post_orig = transport.post
+    transport.post = make_fake_post(mapping)
 
     try:
         logging.getLogger(__name__).info("Sending addressed message to NettyTest...")
@@ -93,7 +93,7 @@ def main():
 
     finally:
         # restore
-        requests.post = requests_post_orig
+        transport.post = requests_post_orig
 
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+r"""Load an agent_memory export back into the database.
+
+Accepts the exports this project writes: CSV, JSON Lines and JSON files
+(`MemoryDB.export`, the sidebar and the export scripts, including older
+exports without an `id` column) and Parquet archives. The format comes
+from the extension unless `--format` is given.
+
+Two load paths:
+
+- `--method insert` (default): rows are read one at a time and inserted
+  with `MemoryDB.import_rows`, a multi-row INSERT per `--batch-size` rows;
+- `--method load-data`: CSV only, the server parses the file itself via
+  `LOAD DATA LOCAL INFILE` (needs `local_infile=ON` on the server).
+
+`--defer-indexes` drops the secondary indexes for the load and rebuilds them
+once at the end, which is much faster for large restores into an empty or
+small table. Progress (rows, rows/s) is logged every `--progress-every`
+seconds.
+
+Usage (PowerShell):
+
+    # after clear_all: restore everything with the original ids
+    .\.venv\Scripts\python.exe scripts\restore_memories.py scripts\exports\all_memories_export_20250101T000000Z.csv --keep-ids --defer-indexes
+    .\.venv\Scripts\python.exe scripts\restore_memories.py scripts\exports\all_memories_export_20250101T000000Z --method insert
+"""
+import sys
+import argparse
+import logging
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from memory import MemoryDB
+from memory_export import FORMATS, detect_format, iter_file_rows
+
+
+class Progress:
+    """Logs the running total and rate at most every `every_s` seconds."""
+
+    def __init__(self, logger, every_s: float = 5.0):
+        self.logger = logger
+        self.every_s = every_s
+        self.started = time.monotonic()
+        self._last = self.started
+
+    def rate(self, total: int) -> float:
+        elapsed = time.monotonic() - self.started
+        return total / elapsed if elapsed > 0 else 0.0
+
+    def __call__(self, total: int) -> None:
+        now = time.monotonic()
+        if now - self._last >= self.every_s:
+            self._last = now
+            self.logger.info(f"{total} rows restored ({self.rate(total):.0f} rows/s)")
+
+
+def restore(db: MemoryDB, path: str, fmt: str, method: str = "insert", batch_size: int = 2000,
+            keep_ids: bool = False, progress=None) -> int:
+    if method == "load-data":
+        if fmt != "csv":
+            raise ValueError("--method load-data only reads CSV exports")
+        return db.load_csv_infile(path, keep_ids=keep_ids)
+    return db.import_rows(iter_file_rows(path, fmt), batch_size=batch_size, keep_ids=keep_ids, progress=progress)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Restore agent_memory rows from a CSV / JSON / JSON Lines / Parquet export")
+    parser.add_argument("path", help="export file, or Parquet archive directory")
+    parser.add_argument("--format", choices=FORMATS + ("parquet",), help="input format (default: from the extension)")
+    parser.add_argument("--method", choices=["insert", "load-data"], default="insert")
+    parser.add_argument("--batch-size", type=int, default=2000, help="rows per multi-row INSERT")
+    parser.add_argument("--keep-ids", action="store_true", help="restore original ids (target table should be empty)")
+    parser.add_argument("--defer-indexes", action="store_true", help="drop secondary indexes during the load, rebuild after")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger = logging.getLogger(__name__)
+    fmt = args.format or detect_format(args.path)
+    db = MemoryDB(hot_size=0)
+    if not db.is_connected():
+        logger.warning("MemoryDB not connected; check DB env vars or .env file")
+        return 2
+    try:
+        progress = Progress(logger, args.progress_every)
+        logger.info(f"Restoring {fmt} export {args.path} ({args.method})")
+        if args.defer_indexes:
+            with db.deferred_indexes() as dropped:
+                logger.info(f"Deferred indexes: {', '.join(dropped) or 'none'}")
+                count = restore(db, args.path, fmt, args.method, args.batch_size, args.keep_ids, progress)
+                logger.info(f"{count} rows loaded in {time.monotonic() - progress.started:.1f}s; rebuilding indexes")
+        else:
+            count = restore(db, args.path, fmt, args.method, args.batch_size, args.keep_ids, progress)
+        elapsed = time.monotonic() - progress.started
+        logger.info(f"Restored {count} rows in {elapsed:.1f}s ({progress.rate(count):.0f} rows/s)")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,7 +3,7 @@ import logging
 sys.path.insert(0, os.path.abspath('.'))
 from config import MultiAgentOrchestrator
 from memory import MemoryDB
-import requests
+import transport
 
 class FakeResponse:
     def __init__(self, text):
@@ -12,7 +12,7 @@ class FakeResponse:
     def json(self):
         return {'response': self._text}
 
-orig_post = requests.post
+orig_post = transport.post
 
 def fake_post(url, json=None, timeout=None):
     prompt = (json or {}).get('prompt', '')
@@ -20,7 +20,7 @@ def fake_post(url, json=None, timeout=None):
         return FakeResponse('Hello from TestAgent')
     return FakeResponse('(No response)')
 
-requests.post = fake_post
+transport.post = fake_post
 
 orch = MultiAgentOrchestrator()
 # ensure DB
@@ -48,4 +48,4 @@ except Exception as e:
     logging.getLogger(__name__).exception('Could not read DB rows: %s', e)
 
 # restore
-requests.post = orig_post
+transport.post = orig_post
@@ -43,9 +43,9 @@ def main():
 
         # If conv_id not exposed by load_recent_qa, query directly to demonstrate conv_id presence
         logger.info('\nDirect SQL fetch for conv_id check:')
-        cur = db.cursor
-        cur.execute('SELECT id, agent_name, question, answer, conv_id, timestamp FROM agent_memory WHERE agent_name=%s ORDER BY timestamp DESC LIMIT 5', (AGENT,))
-        direct = cur.fetchall()
+        with db.cursor() as cur:
+            cur.execute('SELECT id, agent_name, question, answer, conv_id, timestamp FROM agent_memory WHERE agent_name=%s ORDER BY timestamp DESC LIMIT 5', (AGENT,))
+            direct = cur.fetchall()
         for dr in direct:
             logger.info('%s', dr)
     except Exception as e:
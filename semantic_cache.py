@@ -0,0 +1,112 @@
+"""Semantic reply cache: serve a stored answer for near-duplicate questions.
+
+Each agent gets its own FAISS inner-product index over embeddings of the
+original user query. A lookup whose best cosine similarity reaches
+`threshold` returns that question's stored answer instead of calling the
+model. Query embeddings are memoized, so a chat embeds the user's question
+once for all agents (and again for none of the `add` calls that follow).
+Hit rate and the generation time saved are tracked for the sidebar.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings import get_embedder
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.92, max_entries_per_agent: int = 1000, embedder=None):
+        self.threshold = threshold
+        self.max_entries_per_agent = max_entries_per_agent
+        self._embedder = embedder
+        # agent -> (faiss index, [(question, answer, latency_s, vector)])
+        self._indexes: Dict[str, Tuple[object, List[tuple]]] = {}
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency_s = 0.0
+        self.lookup_s = 0.0
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    def _embed(self, text: str) -> np.ndarray:
+        with self._lock:
+            vec = self._vectors.get(text)
+            if vec is not None:
+                self._vectors.move_to_end(text)
+                return vec
+        vec = np.asarray(self.embedder.encode([text]), dtype="float32").reshape(1, -1)
+        with self._lock:
+            self._vectors[text] = vec
+            while len(self._vectors) > 16:
+                self._vectors.popitem(last=False)
+        return vec
+
+    def lookup(self, agent: str, query: str) -> Optional[str]:
+        """Return the cached answer for the closest past question, if similar enough."""
+        started = time.monotonic()
+        try:
+            with self._lock:
+                entry = self._indexes.get(agent)
+                if not query or entry is None or entry[0].ntotal == 0:
+                    self.misses += 1
+                    return None
+            vec = self._embed(query)
+            with self._lock:
+                index, items = self._indexes[agent]
+                scores, ids = index.search(vec, 1)
+                score, idx = float(scores[0][0]), int(ids[0][0])
+                if idx < 0 or score < self.threshold:
+                    self.misses += 1
+                    return None
+                _, answer, latency_s, _ = items[idx]
+                self.hits += 1
+                self.saved_latency_s += latency_s
+                return answer
+        finally:
+            with self._lock:
+                self.lookup_s += time.monotonic() - started
+
+    def add(self, agent: str, query: str, answer: str, latency_s: float = 0.0) -> None:
+        if not query or not answer or answer.startswith("("):
+            return
+        import faiss
+
+        vec = self._embed(query)
+        with self._lock:
+            if agent not in self._indexes:
+                self._indexes[agent] = (faiss.IndexFlatIP(vec.shape[1]), [])
+            index, items = self._indexes[agent]
+            if len(items) >= self.max_entries_per_agent:
+                # drop the oldest half and rebuild; flat indexes have no cheap delete
+                items = items[len(items) // 2:]
+                index = faiss.IndexFlatIP(vec.shape[1])
+                if items:
+                    index.add(np.vstack([v for _, _, _, v in items]))
+            index.add(vec)
+            items.append((query, answer, latency_s, vec[0]))
+            self._indexes[agent] = (index, items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "saved_latency_s": self.saved_latency_s,
+                "avg_lookup_ms": (self.lookup_s / total * 1000.0) if total else 0.0,
+            }
@@ -0,0 +1,198 @@
+"""Relevance-ranked memory retrieval over per-agent FAISS indexes.
+
+QA pairs are embedded when they are written (on a background thread, so
+`save_qa` does not wait for the model) and added to the agent's
+inner-product index. `search` ranks candidates by a mix of cosine similarity
+to the current query and recency:
+
+    score = (1 - recency_weight) * similarity + recency_weight * 0.5 ** (age / half_life)
+
+where `age` counts how many newer memories the agent has. Memories below
+`min_similarity` are never returned, so unrelated history is left out of the
+prompt. The query embedding is cached, so one chat embeds the user's question
+once for all agents; `search` returns None (callers fall back to recency)
+while the embedding model is still loading.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings import get_embedder
+
+
+def qa_text(question: str, answer: str) -> str:
+    return f"Q: {question or ''} A: {answer or ''}"
+
+
+class SemanticMemoryIndex:
+    def __init__(self,
+                 embedder=None,
+                 recency_weight: float = 0.3,
+                 half_life: float = 20.0,
+                 min_similarity: float = 0.3,
+                 candidates: int = 32,
+                 max_per_agent: int = 5000,
+                 budget_ms: float = 5.0):
+        self._embedder = embedder
+        self.recency_weight = recency_weight
+        self.half_life = half_life
+        self.min_similarity = min_similarity
+        self.candidates = candidates
+        self.max_per_agent = max_per_agent
+        self.budget_ms = budget_ms
+        # agent -> (faiss index, [(seq, question, answer, ts, vector)]); seq grows per agent
+        self._indexes: Dict[str, Tuple[object, List[tuple]]] = {}
+        self._seq: Dict[str, int] = {}
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-embed")
+        self.searches = 0
+        self.search_s = 0.0
+        self.over_budget = 0
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    def _ready(self) -> bool:
+        if getattr(self.embedder, "loaded", True):
+            return True
+        # load the model off the hot path; recency is used meanwhile
+        self._pool.submit(self.embedder.encode, ["warm up"])
+        return False
+
+    def add(self, agent: str, question: str, answer: str, ts=None) -> None:
+        """Queue a QA pair for embedding; it becomes searchable shortly after."""
+        self._pool.submit(self._add_now, [(agent, question, answer, ts)])
+
+    def add_many(self, rows: List[tuple], vectors: Optional[List[Optional[np.ndarray]]] = None) -> None:
+        """Queue `(agent, question, answer, ts)` rows, oldest first, embedded in one batch.
+
+        `vectors` may supply precomputed embeddings (e.g. from an
+        `EmbeddingStore`); rows whose entry is None are embedded here. If the
+        supplied vectors do not match the embedder's `dim`, all rows are
+        re-embedded.
+        """
+        if rows:
+            self._pool.submit(self._add_now, list(rows), vectors)
+
+    def flush(self) -> None:
+        """Wait for queued embeddings (tests, warm-up)."""
+        self._pool.submit(lambda: None).result()
+
+    def _add_now(self, rows: List[tuple], vectors: Optional[List[Optional[np.ndarray]]] = None) -> None:
+        known = list(vectors) if vectors is not None else [None] * len(rows)
+        pairs = [(r, v) for r, v in zip(rows, known) if r[2] and not r[2].startswith("(")]
+        if not pairs:
+            return
+        rows = [r for r, _ in pairs]
+        vecs = [v for _, v in pairs]
+        try:
+            dim = getattr(self.embedder, "dim", None) if any(v is not None for v in vecs) else None
+            if dim is not None and any(v is not None and np.asarray(v).size != dim for v in vecs):
+                self.logger.warning(f"[MemoryDB] stored embeddings do not match the model's {dim} dimensions; re-embedding")
+                vecs = [None] * len(vecs)
+            missing = [i for i, v in enumerate(vecs) if v is None]
+            embedded = self.embedder.encode([qa_text(rows[i][1], rows[i][2]) for i in missing]) if missing else []
+        except Exception as e:
+            self.logger.warning(f"[MemoryDB] embedding failed: {e}")
+            return
+        for i, vec in zip(missing, embedded):
+            vecs[i] = vec
+        vecs = np.asarray(np.vstack(vecs), dtype="float32")
+        import faiss
+
+        with self._lock:
+            for (agent, q, a, ts), vec in zip(rows, vecs):
+                if agent not in self._indexes:
+                    self._indexes[agent] = (faiss.IndexFlatIP(vecs.shape[1]), [])
+                index, items = self._indexes[agent]
+                if len(items) >= self.max_per_agent:
+                    # drop the oldest half and rebuild; flat indexes have no cheap delete
+                    items = items[len(items) // 2:]
+                    index = faiss.IndexFlatIP(vecs.shape[1])
+                    if items:
+                        index.add(np.vstack([it[4] for it in items]))
+                seq = self._seq.get(agent, 0)
+                self._seq[agent] = seq + 1
+                index.add(vec.reshape(1, -1))
+                items.append((seq, q or "", a or "", ts, vec))
+                self._indexes[agent] = (index, items)
+
+    def _query_vector(self, query: str) -> np.ndarray:
+        with self._lock:
+            vec = self._query_cache.get(query)
+            if vec is not None:
+                self._query_cache.move_to_end(query)
+                return vec
+        vec = np.asarray(self.embedder.encode([query]), dtype="float32").reshape(1, -1)
+        with self._lock:
+            self._query_cache[query] = vec
+            while len(self._query_cache) > 16:
+                self._query_cache.popitem(last=False)
+        return vec
+
+    def search(self, agent: str, query: str, limit: int = 3) -> Optional[List[dict]]:
+        """Return up to `limit` relevant memories as {'q', 'a', 'ts', 'score'} dicts, best first.
+
+        Returns None when the index cannot answer yet (model loading, agent
+        not indexed) so the caller can fall back to recent memories.
+        """
+        if not query:
+            return None
+        with self._lock:
+            entry = self._indexes.get(agent)
+        if entry is None or entry[0].ntotal == 0 or not self._ready():
+            return None
+        started = time.monotonic()
+        vec = self._query_vector(query)
+        with self._lock:
+            index, items = self._indexes[agent]
+            newest = self._seq.get(agent, 0) - 1
+            k = min(self.candidates, index.ntotal)
+            sims, ids = index.search(vec, k)
+            scored = []
+            for sim, idx in zip(sims[0], ids[0]):
+                if idx < 0 or sim < self.min_similarity:
+                    continue
+                seq, q, a, ts, _ = items[idx]
+                recency = 0.5 ** ((newest - seq) / self.half_life)
+                score = (1.0 - self.recency_weight) * float(sim) + self.recency_weight * recency
+                scored.append((score, seq, q, a, ts))
+        scored.sort(reverse=True)
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.searches += 1
+            self.search_s += elapsed
+            if elapsed * 1000.0 > self.budget_ms:
+                self.over_budget += 1
+        return [{"q": q, "a": a, "ts": ts, "score": score} for score, _, q, a, ts in scored[:limit]]
+
+    def drop(self, agent: str) -> None:
+        with self._lock:
+            self._indexes.pop(agent, None)
+            self._seq.pop(agent, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self._seq.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "agents": len(self._indexes),
+                "memories": sum(index.ntotal for index, _ in self._indexes.values()),
+                "searches": self.searches,
+                "avg_search_ms": (self.search_s / self.searches * 1000.0) if self.searches else 0.0,
+                "over_budget": self.over_budget,
+            }
@@ -1,9 +1,27 @@
-import requests
+import threading
+import time
+
+import transport
+
+_models_cache = {}
+_models_lock = threading.Lock()
 
 
 def get_models_for_server(host):
     try:
-        resp = requests.get(f"{host}/api/tags", timeout=3)
+        resp = transport.get(f"{host}/api/tags", timeout=3)
+        if resp.status_code == 200:
+            data = resp.json()
+            return [m["name"] for m in data.get("models", [])]
+    except Exception:
+        return []
+    return []
+
+
+def get_running_models(host):
+    """Return the models currently loaded in memory on `host` (Ollama `/api/ps`)."""
+    try:
+        resp = transport.get(f"{host}/api/ps", timeout=2)
         if resp.status_code == 200:
             data = resp.json()
             return [m["name"] for m in data.get("models", [])]
@@ -14,7 +32,20 @@ def get_models_for_server(host):
 
 def check_server_status(host):
     try:
-        resp = requests.get(f"{host}/api/tags", timeout=2)
+        resp = transport.get(f"{host}/api/tags", timeout=2)
         return resp.status_code == 200
     except Exception:
         return False
+
+
+def get_models_cached(host, ttl=60.0):
+    """`get_models_for_server` with a short per-host cache for call-time lookups."""
+    now = time.monotonic()
+    with _models_lock:
+        hit = _models_cache.get(host)
+        if hit and now - hit[0] < ttl:
+            return hit[1]
+    models = get_models_for_server(host)
+    with _models_lock:
+        _models_cache[host] = (now, models)
+    return models
@@ -7,8 +7,13 @@ import datetime
 import streamlit as st
 from pathlib import Path
 from config import get_models_for_server
+import transport
+from memory_export import MIME_TYPES
 
 CONFIG_PATH = Path("agents_config.json")
+EXPORTS_DIR = Path(__file__).resolve().parent / "scripts" / "exports"
+# larger full exports are left on disk instead of being offered as a browser download
+FULL_EXPORT_DOWNLOAD_MAX_MB = 200
 
 def render_sidebar(orch, agent_styles, servers):
     st.header("⚙️ Control Panel")
@@ -79,9 +84,29 @@ def render_sidebar(orch, agent_styles, servers):
 
     if use_moderator:
         st.markdown("✅ **Moderator active**")
+        quorum = st.number_input(
+            "Summarize after N replies (0 = wait for all)",
+            min_value=0, max_value=max(1, len(agent_names)), value=int(getattr(orch, "moderator_quorum", None) or 0), step=1,
+            key="moderator_quorum",
+        )
+        deadline = st.number_input(
+            "...or after T seconds (0 = no deadline)",
+            min_value=0.0, max_value=300.0, value=float(getattr(orch, "moderator_deadline_s", None) or 0.0), step=1.0,
+            key="moderator_deadline_s",
+        )
+        orch.moderator_quorum = int(quorum) or None
+        orch.moderator_deadline_s = float(deadline) or None
     else:
         st.markdown("🚫 **Moderator muted**")
 
+    # --- Latency budget ---
+    deadline_s = st.number_input(
+        "Latency budget per message (s, 0 = none)",
+        min_value=0.0, max_value=600.0, value=float(getattr(orch, "deadline_s", None) or 0.0), step=5.0,
+        key="deadline_s",
+    )
+    orch.deadline_s = float(deadline_s) or None
+
     # --- Memory toggle ---
     use_memory = st.checkbox("Use Memory", value=orch.use_memory)
     orch.set_memory_usage(use_memory)
@@ -97,6 +122,51 @@ def render_sidebar(orch, agent_styles, servers):
     except Exception:
         orch.use_delegation = use_delegation
 
+    # --- Concurrent broadcast toggle ---
+    use_concurrency = st.checkbox("Parallel broadcast (call agents concurrently)", value=getattr(orch, "use_concurrency", True))
+    try:
+        orch.set_concurrency_usage(use_concurrency)
+    except Exception:
+        orch.use_concurrency = use_concurrency
+
+    # --- Hedging toggle ---
+    orch.use_hedging = st.checkbox("Hedge slow requests to replica servers", value=getattr(orch, "use_hedging", False))
+
+    # --- Load-aware scheduling toggle ---
+    orch.use_scheduler = st.checkbox("Load-aware server selection", value=getattr(orch, "use_scheduler", False))
+    if orch.use_scheduler:
+        for sname, info in orch.scheduler.snapshot().items():
+            resident = ", ".join(info["resident"]) or "none loaded"
+            st.caption(f"{sname}: {info['in_flight']} in flight — {resident}")
+
+    # --- Response cache toggle + counters ---
+    orch.use_response_cache = st.checkbox("Cache identical requests", value=getattr(orch, "use_response_cache", True))
+    cache = getattr(orch, "response_cache", None)
+    if orch.use_response_cache and cache is not None:
+        cs = cache.stats()
+        st.caption(f"Cache: {cs['hits']} hits ({cs['disk_hits']} from disk), {cs['misses']} misses — {cs['hit_rate']:.0%} hit rate")
+        if st.button("Clear response cache", key="clear_response_cache"):
+            cache.clear()
+
+    # --- Semantic cache toggle + counters ---
+    orch.use_semantic_cache = st.checkbox("Semantic cache (similar questions)", value=getattr(orch, "use_semantic_cache", False))
+    semantic = getattr(orch, "semantic_cache", None)
+    if orch.use_semantic_cache and semantic is not None:
+        ss = semantic.stats()
+        st.caption(
+            f"Semantic: {ss['hits']} hits, {ss['misses']} misses — {ss['hit_rate']:.0%} hit rate, "
+            f"~{ss['saved_latency_s']:.1f}s generation saved ({ss['avg_lookup_ms']:.1f} ms/lookup)"
+        )
+        if st.button("Clear semantic cache", key="clear_semantic_cache"):
+            semantic.clear()
+
+    # --- Streaming toggle ---
+    use_streaming = st.checkbox("Stream replies as they are generated", value=getattr(orch, "use_streaming", True))
+    try:
+        orch.set_streaming_usage(use_streaming)
+    except Exception:
+        orch.use_streaming = use_streaming
+
     # --- Primary-rephrase toggle ---
     use_rephrase = st.checkbox("Primary rephrase (quote other agents)", value=getattr(orch, "use_primary_rephrase", True))
     try:
@@ -113,9 +183,74 @@ def render_sidebar(orch, agent_styles, servers):
             connected = False
         status_emoji = "🟢" if connected else "🔴"
         st.markdown(f"**Memory DB:** {status_emoji} {'Connected' if connected else 'Disconnected'}")
+        if hasattr(db, "pool_stats"):
+            ps = db.pool_stats()
+            st.caption(
+                f"DB pool: {ps['in_use']}/{ps['max_size']} in use ({ps['utilization']:.0%}), {ps['idle']} idle — "
+                f"wait avg {ps['avg_wait_ms']:.1f} ms, max {ps['max_wait_ms']:.1f} ms, {ps['timeouts']} timeouts"
+            )
+        if hasattr(db, "enable_semantic_memory"):
+            semantic_memory = st.checkbox("Relevance-ranked memories (embeddings)", value=db.semantic is not None)
+            if semantic_memory and db.semantic is None:
+                db.enable_semantic_memory()
+            elif not semantic_memory and db.semantic is not None:
+                db.disable_semantic_memory()
+            if db.semantic is not None:
+                ms = db.semantic.stats()
+                st.caption(f"Indexed {ms['memories']} memories for {ms['agents']} agents — {ms['avg_search_ms']:.1f} ms/search, {ms['over_budget']} over budget")
+        if hasattr(db, "enable_keyword_memory"):
+            keyword_memory = st.checkbox("Keyword-ranked memories (BM25)", value=db.keyword is not None)
+            if keyword_memory and db.keyword is None:
+                db.enable_keyword_memory()
+            elif not keyword_memory and db.keyword is not None:
+                db.disable_keyword_memory()
+            if db.keyword is not None:
+                ks = db.keyword.stats()
+                state = "" if db.keyword.ready else " (rebuilding…)"
+                st.caption(f"BM25: {ks['memories']} memories, {ks['terms']} terms for {ks['agents']} agents{state}")
+        if hasattr(db, "enable_compaction"):
+            compaction = st.checkbox("Summarize old conversations (background)", value=db.compactor is not None)
+            if compaction and db.compactor is None:
+                if db.enable_compaction() is None:
+                    st.caption("Set COMPACTION_HOST and COMPACTION_MODEL to enable summaries")
+            elif not compaction and db.compactor is not None:
+                db.disable_compaction()
+            if db.compactor is not None:
+                last = db.compactor.last_result
+                if last is None:
+                    st.caption("Summaries: first pass running…")
+                else:
+                    st.caption(f"Summaries: last pass wrote {last['summaries']} covering {last['rows']} memories")
+        if hasattr(db, "enable_write_behind"):
+            write_behind = st.checkbox("Write-behind memory writes (batched)", value=db.writer is not None)
+            if write_behind and db.writer is None:
+                db.enable_write_behind()
+            elif not write_behind and db.writer is not None:
+                db.disable_write_behind()
+            if db.writer is not None:
+                ws = db.writer.stats()
+                st.caption(f"Queue: {ws['pending']} pending, {ws['written']} written in {ws['batches']} batches, {ws['sync_writes']} sync, {ws['dropped']} dropped")
+    elif st.session_state.get("memory_loader") is not None:
+        loader = st.session_state["memory_loader"]
+        retry_in = loader.retry_in()
+        detail = f" — attempt {loader.attempts}, retrying in {retry_in:.0f}s" if retry_in is not None else ""
+        st.markdown(f"**Memory DB:** 🟡 Connecting…{detail}")
+        if loader.last_error:
+            st.caption(f"Last error: {loader.last_error}. Chats run without memory until connected.")
     else:
         st.markdown("**Memory DB:** ⚪ Not configured")
 
+    # --- HTTP connection reuse per backend host ---
+    with st.expander("🌐 Connection pool", expanded=False):
+        try:
+            pool_stats = transport.stats()
+        except Exception:
+            pool_stats = {}
+        if not pool_stats:
+            st.write("No backend requests yet.")
+        for host, s in pool_stats.items():
+            st.markdown(f"**{host}** — {s['requests']} requests, {s['connections']} connections, {s['reused']} reused")
+
     # --- Save / Load Config ---
     cols = st.columns(2)
     if cols[0].button("💾 Save Config"):
@@ -197,6 +332,34 @@ def render_sidebar(orch, agent_styles, servers):
         else:
             options = ["__group__"] + list(orch.agents.keys())
             sel = st.selectbox("Show memories for", options, index=0, key="mem_inspector_select")
+
+            # Full-text search (FULLTEXT index, keyset pages of 20)
+            search_text = st.text_input("Search memories", key="mem_search_text")
+            search_all = st.checkbox("Search all agents", value=True, key="mem_search_all")
+            if search_text and hasattr(db, "search"):
+                page_key = ("mem_search_pages", search_text, search_all, sel)
+                if st.session_state.get("mem_search_key") != page_key:
+                    # new query: restart from the first page
+                    st.session_state["mem_search_key"] = page_key
+                    st.session_state["mem_search_cursors"] = [None]
+                cursors = st.session_state["mem_search_cursors"]
+                try:
+                    hits, next_cursor = db.search(search_text, agent=None if search_all else sel, limit=20, cursor=cursors[-1])
+                    if not hits:
+                        st.write("No matches.")
+                    for hit in hits:
+                        st.markdown(f"**{hit['agent_name']}** · *{hit['timestamp']}*  \n**Q:** {hit['question'] or ''}  \n**A:** {hit['answer'] or ''}")
+                        st.write("---")
+                    prev_col, next_col = st.columns(2)
+                    # callbacks update the cursor stack before the rerun the click triggers
+                    if len(cursors) > 1:
+                        prev_col.button("Previous", key="mem_search_prev", on_click=cursors.pop)
+                    if next_cursor is not None:
+                        next_col.button("Next", key="mem_search_next", on_click=cursors.append, args=(next_cursor,))
+                except Exception as e:
+                    st.error(f"Search failed: {e}")
+                st.write("---")
+
             try:
                 qa_list = db.load_recent_qa(None if sel == "__group__" else sel, limit=10)
                 if not qa_list:
@@ -282,23 +445,26 @@ def render_sidebar(orch, agent_styles, servers):
             st.write("Strongly recommended: export your memories before running this.")
             export_before = st.checkbox("Export all memories before clearing", value=True, key="export_all_before_clear")
 
+            full_format = st.selectbox("Full export format", list(MIME_TYPES), index=0, key="full_export_format") if export_before else "csv"
             if export_before and st.button("Prepare full export", key="prepare_full_export"):
                 try:
-                    # Attempt to read all rows from the table
-                    rows = db._try_execute("SELECT agent_name, question, answer, conv_id, timestamp FROM agent_memory ORDER BY timestamp DESC LIMIT 100000", (), fetch=True)
-                    if not rows:
+                    # Stream every row to a file in keyset chunks; nothing is buffered in memory
+                    EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+                    fname = f"all_memories_export_{datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.{full_format}"
+                    path = EXPORTS_DIR / fname
+                    count = db.export(path, full_format)
+                    if count == 0:
+                        path.unlink()
                         st.info("No rows found to export.")
                     else:
-                        # Convert to CSV in-memory
-                        import io, csv
-                        buf = io.StringIO()
-                        writer = csv.writer(buf)
-                        writer.writerow(['agent_name', 'question', 'answer', 'conv_id', 'timestamp'])
-                        for agent_name, q, a, conv_id, ts in rows:
-                            writer.writerow([agent_name or '', q or '', a or '', conv_id or '', ts or ''])
-                        data = buf.getvalue().encode('utf-8')
-                        fname = f"all_memories_export_{datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.csv"
-                        st.download_button("Download full export", data, file_name=fname, mime='text/csv')
+                        size_mb = path.stat().st_size / 1e6
+                        st.caption(f"Wrote {count} rows ({size_mb:.1f} MB) to {path}")
+                        # st.download_button holds the whole payload in memory, so large exports stay on disk only
+                        if size_mb <= FULL_EXPORT_DOWNLOAD_MAX_MB:
+                            with path.open("rb") as f:
+                                st.download_button("Download full export", f, file_name=fname, mime=MIME_TYPES[full_format])
+                        else:
+                            st.info(f"Export is larger than {FULL_EXPORT_DOWNLOAD_MAX_MB} MB; copy it from the path above.")
                 except Exception as e:
                     st.error(f"Failed to prepare full export: {e}")
 
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from agents import Agent
+from orchestrator import MultiAgentOrchestrator
+
+
+def _client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_achat_delegation_rephrase(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.agents = {
+        'Perry': Agent('Perry', 'http://perry', 'm', ''),
+        'Netty': Agent('Netty', 'http://netty', 'm', ''),
+    }
+    seen = []
+
+    def handler(request):
+        payload = json.loads(request.content)
+        seen.append(request.url.host)
+        if request.url.host == 'netty':
+            return httpx.Response(200, json={'response': 'Netty: 9.8 km/s'})
+        if 'Other agents replied' in payload['prompt']:
+            return httpx.Response(200, json={'response': 'Perry: "Netty says 9.8 km/s"'})
+        return httpx.Response(200, json={'response': 'Perry: asking Netty'})
+
+    async def run():
+        async with _client(handler) as client:
+            return await orch.achat('Perry, ask Netty how fast we are going.', client=client)
+
+    replies = asyncio.run(run())
+    assert seen == ['perry', 'netty', 'perry']
+    assert replies['Netty'] == 'Netty: 9.8 km/s'
+    assert replies['Perry'] == 'Perry: "Netty says 9.8 km/s"'
+
+
+def test_achat_broadcast_with_moderator_and_cancellation():
+    orch = MultiAgentOrchestrator()
+    orch.agents = {
+        'A': Agent('A', 'http://a', 'm', ''),
+        'B': Agent('B', 'http://b', 'm', ''),
+    }
+    orch.moderator = Agent('Moderator', 'http://mod', 'm', '')
+    orch.use_moderator = True
+
+    def handler(request):
+        return httpx.Response(200, json={'response': f'from {request.url.host}'})
+
+    async def run():
+        async with _client(handler) as client:
+            return await orch.achat('hello all', client=client)
+
+    replies = asyncio.run(run())
+    assert list(replies) == ['A', 'B', 'Moderator']
+    assert replies['Moderator'] == 'from mod'
+
+    async def hang(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200, json={'response': 'late'})
+
+    async def run_cancelled():
+        async with _client(hang) as client:
+            async with asyncio.timeout(0.1):
+                # bypass the replies cached by the first run
+                await orch.achat('hello all', client=client, use_cache=False)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(run_cancelled())
+
+
+def test_achat_applies_budget_quorum_and_caches():
+    orch = MultiAgentOrchestrator()
+    orch.agents = {
+        'A': Agent('A', 'http://a', 'm', ''),
+        'B': Agent('B', 'http://b', 'm', ''),
+        'C': Agent('C', 'http://c', 'm', ''),
+    }
+    orch.moderator = Agent('Moderator', 'http://mod', 'm', '')
+    orch.use_moderator = True
+    orch.moderator_quorum = 2
+    posts = []
+
+    async def handler(request):
+        posts.append(request.url.host)
+        if request.url.host == 'c':
+            await asyncio.sleep(0.3)
+        if request.url.host == 'mod':
+            payload = json.loads(request.content)
+            return httpx.Response(200, json={'response': 'summary without C' if '- C:' not in payload['prompt'] else 'summary with C'})
+        return httpx.Response(200, json={'response': f'from {request.url.host}'})
+
+    async def run(**kw):
+        async with _client(handler) as client:
+            return await orch.achat('hello all', client=client, **kw)
+
+    replies = asyncio.run(run())
+    # the moderator ran on the first two replies; C still shows up
+    assert replies['Moderator'] == 'summary without C' and replies['C'] == 'from c'
+
+    # primaries now come from the response cache, so all three make the quorum
+    posts.clear()
+    assert asyncio.run(run())['Moderator'] == 'summary with C'
+    assert posts == ['mod']
+    posts.clear()
+    asyncio.run(run())
+    assert posts == []
+
+    # a budget spent before the fan-out skips the primaries and the moderator
+    snapshot = orch._memory_snapshot
+    orch._memory_snapshot = lambda *a: time.sleep(0.1) or snapshot(*a)
+    replies = asyncio.run(run(deadline_s=0.05, use_cache=False))
+    assert replies['A'] == '(Skipped: latency budget exhausted)'
+    assert replies.skipped_stages['Moderator'] == ['moderator']
@@ -0,0 +1,150 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from embedding_store import EmbeddingStore
+from test_semantic_cache import BagOfWordsEmbedder
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import backfill_embeddings as backfill  # noqa: E402
+
+
+class FakeEmbedder(BagOfWordsEmbedder):
+    def __init__(self, model_name=None):
+        pass
+
+
+class FakeDB:
+    def __init__(self, n):
+        self.rows = [(i, f'question {i}', '(Request error)' if i % 10 == 0 else f'answer {i}') for i in range(1, n + 1)]
+        self.queries = []
+
+    def _try_execute(self, sql, params=(), fetch=False, retries=1):
+        after_id, limit = params
+        self.queries.append(after_id)
+        return [r for r in self.rows if r[0] > after_id][:limit]
+
+
+def test_backfill_indexes_in_id_order_and_resumes(tmp_path):
+    out = str(tmp_path / 'index')
+    db = FakeDB(45)
+    store = EmbeddingStore(out).load()
+    scanned = backfill.run(db, store, 'fake', batch_size=10, workers=2, checkpoint_every=2, embedder_factory=FakeEmbedder)
+
+    assert scanned == 45
+    assert db.queries[:3] == [0, 10, 20]  # keyset pagination over id
+    resumed = EmbeddingStore(out).load()
+    assert resumed.state['last_id'] == 45
+    assert resumed.state['rows'] == 41  # error replies are skipped
+    assert resumed.vector(10) is None
+    assert np.allclose(resumed.vector(7), FakeEmbedder().encode(['Q: question 7 A: answer 7'])[0])
+
+    # a rerun only scans rows added since the checkpoint
+    db.rows.append((46, 'question 46', 'answer 46'))
+    assert backfill.run(db, resumed, 'fake', batch_size=10, workers=1, embedder_factory=FakeEmbedder) == 1
+    assert EmbeddingStore(out).load().state['rows'] == 42
+
+
+def _vectors(ids):
+    return np.asarray([[float(i), 1.0] for i in ids], dtype='float32')
+
+
+def test_checkpoints_append_segments_and_merge_them_logarithmically(tmp_path):
+    store = EmbeddingStore(str(tmp_path)).load()
+    for n in range(8):
+        ids = [n * 10 + i for i in range(1, 11)]
+        store.add(ids, _vectors(ids))
+        store.checkpoint(ids[-1])
+        sizes = [seg['rows'] for seg in store.state['segments']]
+        # binary-counter merging: strictly decreasing sizes, one per set bit of the checkpoint count
+        assert sizes == sorted(set(sizes), reverse=True) and len(sizes) == bin(n + 1).count('1')
+    assert sorted(os.listdir(tmp_path)) == sorted([s['file'] for s in store.state['segments']] + ['state.json'])
+
+    loaded = EmbeddingStore(str(tmp_path)).load()
+    assert loaded.state['rows'] == 80 and loaded.state['last_id'] == 80
+    assert np.allclose(loaded.vector(37), [37.0, 1.0])
+
+
+def test_interrupted_checkpoint_keeps_the_previous_one(tmp_path, monkeypatch):
+    store = EmbeddingStore(str(tmp_path)).load()
+    store.add([1, 2], _vectors([1, 2]))
+    store.checkpoint(2)
+    store.add([3], _vectors([3]))
+
+    def crash(src, dst):
+        raise OSError('power cut')
+
+    monkeypatch.setattr(os, 'replace', crash)
+    with pytest.raises(OSError):
+        store.checkpoint(3)
+    monkeypatch.undo()
+
+    resumed = EmbeddingStore(str(tmp_path)).load()
+    assert resumed.state['last_id'] == 2 and resumed.state['rows'] == 2
+    assert resumed.vector(3) is None
+
+
+def test_load_rejects_mismatched_row_counts(tmp_path):
+    store = EmbeddingStore(str(tmp_path)).load()
+    store.add([1, 2], _vectors([1, 2]))
+    store.checkpoint(2)
+    state = json.loads((tmp_path / 'state.json').read_text())
+    state['rows'] = 3
+    (tmp_path / 'state.json').write_text(json.dumps(state))
+    with pytest.raises(ValueError):
+        EmbeddingStore(str(tmp_path)).load()
+
+
+def test_semantic_memory_reuses_backfilled_vectors():
+    from semantic_memory import SemanticMemoryIndex
+
+    class NoQueryEmbedder(FakeEmbedder):
+        calls = []
+
+        def encode(self, texts):
+            self.calls.append(list(texts))
+            return super().encode(texts)
+
+    embedder = NoQueryEmbedder()
+    idx = SemanticMemoryIndex(embedder=embedder)
+    stored = FakeEmbedder().encode(['Q: capital of france A: Paris'])[0]
+    idx.add_many([('X', 'capital of france', 'Paris', 1), ('X', 'colour', 'blue', 2)], [stored, None])
+    idx.flush()
+    assert embedder.calls == [['Q: colour A: blue']]
+    assert idx.search('X', 'capital of france')[0]['a'] == 'Paris'
+
+
+def test_stored_vectors_of_another_dimension_are_re_embedded():
+    from semantic_memory import SemanticMemoryIndex
+
+    idx = SemanticMemoryIndex(embedder=FakeEmbedder())
+    idx.add_many([('X', 'capital of france', 'Paris', 1), ('X', 'colour', 'blue', 2)], [np.ones(3, dtype='float32'), None])
+    idx.flush()
+    assert idx.search('X', 'capital of france')[0]['a'] == 'Paris'
+
+
+def test_semantic_memory_ignores_a_store_built_with_another_model(tmp_path):
+    from memory import MemoryDB
+
+    class NamedEmbedder(FakeEmbedder):
+        model_name = 'other-model'
+
+    store = EmbeddingStore(str(tmp_path))
+    store.state['model'] = 'fake'
+    store.add([1], FakeEmbedder().encode(['Q: unrelated A: text']))
+    store.checkpoint(1)
+
+    db = MemoryDB.__new__(MemoryDB)
+    db.semantic = None
+    db._connected = True
+    db._try_execute = lambda *a, **k: [(1, 'X', 'capital of france', 'Paris', 1)]
+    idx = db.enable_semantic_memory(warm_rows=5, index_path=str(tmp_path), embedder=NamedEmbedder())
+    idx.flush()
+    # the stored vector was skipped, so the row was embedded from its own text
+    assert idx.search('X', 'capital of france')[0]['a'] == 'Paris'
+
+    NamedEmbedder.model_name = 'fake'
+    assert db._open_embedding_store(str(tmp_path)) is not None
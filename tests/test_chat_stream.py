@@ -0,0 +1,67 @@
+import json
+
+import transport
+from agents import Agent
+from orchestrator import MultiAgentOrchestrator
+
+
+class StreamResp:
+    def __init__(self, chunks, status=200):
+        self.status_code = status
+        self._lines = [json.dumps({'response': c, 'done': False}).encode() for c in chunks]
+        self._lines.append(json.dumps({'response': '', 'done': True}).encode())
+
+    def iter_lines(self):
+        return iter(self._lines)
+
+    def close(self):
+        pass
+
+
+def test_chat_stream_yields_deltas_per_agent(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.agents = {
+        'Perry': Agent('Perry', 'http://myplex', 'm', ''),
+        'Netty': Agent('Netty', 'http://gamer', 'm', ''),
+    }
+    orch.moderator = Agent('Moderator', 'http://mod', 'm', '')
+    orch.use_moderator = True
+    sent = []
+
+    def fake_post(url, json=None, timeout=None, stream=False):
+        sent.append(json['stream'])
+        host = url.split('//')[1].split('/')[0]
+        return StreamResp({'myplex': ['Hel', 'lo'], 'gamer': ['Hi', ' there'], 'mod': ['Perry', ' wins']}[host])
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    gen = orch.chat_stream('hello all')
+    events = []
+    try:
+        while True:
+            events.append(next(gen))
+    except StopIteration as stop:
+        replies = stop.value
+
+    assert all(sent)
+    assert [d for n, d in events if n == 'Perry'] == ['Hel', 'lo']
+    assert [d for n, d in events if n == 'Netty'] == ['Hi', ' there']
+    # moderator streams after every primary reply is complete
+    assert events[-2:] == [('Moderator', 'Perry'), ('Moderator', ' wins')]
+    assert replies == {'Perry': 'Hello', 'Netty': 'Hi there', 'Moderator': 'Perry wins'}
+
+
+def test_chat_stream_reports_errors_as_single_event(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.agents = {'X': Agent('X', 'http://x', 'm', '')}
+
+    def fake_post(url, json=None, timeout=None, stream=False):
+        return StreamResp([], status=500)
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+    monkeypatch.setattr('orchestrator.time.sleep', lambda s: None)
+
+    events = list(orch.chat_stream('X: hi'))
+    assert len(events) == 1
+    assert events[0][0] == 'X' and events[0][1].startswith('(Request error for X')
+    assert orch.agent_status['X'] == 'down'
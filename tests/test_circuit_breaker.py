@@ -15,11 +15,11 @@ def test_circuit_breaker_skips_after_failures(monkeypatch):
     orch.failure_threshold = 1
     orch.cooldown_seconds = 2
 
-    # make requests.post raise an exception to simulate failure
+    # make transport.post raise an exception to simulate failure
     def raise_exc(*args, **kwargs):
         raise requests.exceptions.RequestException("boom")
 
-    monkeypatch.setattr("requests.post", raise_exc)
+    monkeypatch.setattr("transport.post", raise_exc)
 
     replies = orch.chat("hello", messages=None)
     # first call should have a failure recorded
@@ -27,7 +27,7 @@ def test_circuit_breaker_skips_after_failures(monkeypatch):
     assert orch.cooldowns.get("TestAgent", 0) > time.time()
 
     # now call again: because cooldown is set, the orchestrator should skip the agent
-    # replace requests.post with a function that would succeed (should not be called)
+    # replace transport.post with a function that would succeed (should not be called)
     def succeed(*args, **kwargs):
         class R:
             status_code = 200
@@ -37,7 +37,7 @@ def test_circuit_breaker_skips_after_failures(monkeypatch):
 
         return R()
 
-    monkeypatch.setattr("requests.post", succeed)
+    monkeypatch.setattr("transport.post", succeed)
     replies2 = orch.chat("hello again", messages=None)
     # agent should be skipped during cooldown
     assert replies2.get("TestAgent") == "(Agent temporarily unavailable)"
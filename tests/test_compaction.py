@@ -0,0 +1,108 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import transport
+from compaction import CompactionJob, OllamaSummarizer
+from memory import MemorySnapshot
+from prompt_builder import PromptBuilder
+
+NOW = datetime(2024, 6, 15, 12, 0)
+DAY1 = datetime(2024, 6, 1, 9, 0)
+DAY2 = datetime(2024, 6, 2, 9, 0)
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        if sql.startswith('SELECT DISTINCT agent_name'):
+            self._rows = sorted({(r[1],) for r in self.rows})
+        else:
+            agent, cutoff, limit = params
+            self._rows = [(i, q, a, c, ts) for i, name, q, a, c, ts in self.rows if name == agent and ts < cutoff][:limit]
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeDB:
+    def __init__(self, rows):
+        cur = FakeCursor(rows)
+        self.cursor = contextmanager(lambda: (yield cur))
+        self.saved = []
+        self.marked = []
+
+    def save_summary(self, agent, summary, ids, **kw):
+        self.saved.append((agent, summary, ids, kw))
+
+    def mark_compacted(self, ids):
+        self.marked.append(ids)
+
+
+def _rows():
+    rows = [(i, 'Perry', f'q{i}', f'a{i}', f'c{i}', DAY1 + timedelta(minutes=i)) for i in range(1, 6)]
+    rows += [(i, 'Perry', f'q{i}', f'a{i}', f'c{i}', DAY2 + timedelta(minutes=i)) for i in range(6, 8)]
+    rows += [(8, 'Rex', 'q8', '(error) timed out', 'c8', DAY1)]
+    # too recent to compact
+    rows += [(9, 'Perry', 'q9', 'a9', 'c9', NOW - timedelta(days=1))]
+    return rows
+
+
+def test_groups_by_day_and_size_and_skips_error_only_groups():
+    db = FakeDB(_rows())
+    calls = []
+
+    def summarizer(agent, pairs):
+        calls.append(pairs)
+        return f'- {len(pairs)} exchanges'
+
+    done = CompactionJob(db, summarizer, min_age_days=7, max_rows=3).run_once(NOW)
+    assert [ids for _, _, ids, _ in db.saved] == [[1, 2, 3], [4, 5], [6, 7]]
+    assert db.saved[0][3]['first_ts'] == DAY1 + timedelta(minutes=1) and db.saved[0][3]['conversations'] == 3
+    assert calls[1] == [('q4', 'a4'), ('q5', 'a5')]
+    assert db.marked == [[8]]
+    assert done == {'summaries': 3, 'rows': 8}
+
+
+def test_summarizer_failure_leaves_rows_for_the_next_pass():
+    db = FakeDB(_rows())
+
+    def summarizer(agent, pairs):
+        raise ConnectionError('model offline')
+
+    done = CompactionJob(db, summarizer, min_age_days=7).run_once(NOW)
+    assert db.saved == [] and done['summaries'] == 0
+
+
+def test_summaries_replace_the_memories_they_cover():
+    rows = {'Perry': [
+        {'q': 'new question', 'a': 'new answer', 'ts': DAY2 + timedelta(days=1)},
+        {'q': 'old question', 'a': 'old answer', 'ts': DAY1},
+    ]}
+    summaries = {'Perry': [{'summary': '- likes chess', 'first_ts': DAY1, 'last_ts': DAY2, 'rows': 5}]}
+    snap = MemorySnapshot(rows, summaries=summaries)
+    prompt = PromptBuilder.build_prompt('hi', 'Perry', None, snap, True, False, 'Perry')
+    assert prompt.startswith('[Agent long-term summary: - likes chess]')
+    assert 'new answer' in prompt and 'old answer' not in prompt
+
+
+def test_ollama_summarizer_strips_reasoning(monkeypatch):
+    sent = []
+
+    class Resp:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {'response': '<think>let me see</think>\n- prefers tea'}
+
+    def fake_post(url, json=None, timeout=None):
+        sent.append((url, json))
+        return Resp()
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+    summary = OllamaSummarizer('http://mod/', 'small')('Perry', [('what do you drink?', 'tea')])
+    assert summary == '- prefers tea'
+    assert sent[0][0] == 'http://mod/api/generate' and 'Q: what do you drink?' in sent[0][1]['prompt']
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import requests
+
+import transport
+from agents import Agent
+from orchestrator import MultiAgentOrchestrator
+
+
+class DummyMemoryDB:
+    def __init__(self):
+        self.rows = []
+
+    def load_recent_qa(self, agent_name=None, limit=10):
+        return []
+
+    def save_qa(self, agent_name, question, answer, conv_id=None):
+        self.rows.append((agent_name, answer))
+
+
+class DummyResp:
+    def __init__(self, text):
+        self._text = text
+        self.status_code = 200
+
+    def json(self):
+        return {'response': self._text}
+
+
+def _make_orch():
+    orch = MultiAgentOrchestrator()
+    orch.memory_db = DummyMemoryDB()
+    orch.use_group_memory = False
+    orch.agents = {
+        'Perry': Agent('Perry', 'http://myplex', 'm', ''),
+        'Netty': Agent('Netty', 'http://gamer', 'm', ''),
+        'Netty P': Agent('Netty P', 'http://netty', 'm', ''),
+    }
+    return orch
+
+
+def test_broadcast_runs_agents_concurrently(monkeypatch):
+    orch = _make_orch()
+    delays = {'myplex': 0.3, 'gamer': 0.1, 'netty': 0.2}
+    active = {'n': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    def fake_post(url, json=None, timeout=30):
+        host = url.split('//')[1].split('/')[0]
+        with lock:
+            active['n'] += 1
+            active['peak'] = max(active['peak'], active['n'])
+        time.sleep(delays[host])
+        with lock:
+            active['n'] -= 1
+        return DummyResp(f"reply from {host}")
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    start = time.monotonic()
+    replies = orch.chat('hello everyone')
+    elapsed = time.monotonic() - start
+
+    # wall time tracks the slowest agent rather than the sum of all three
+    assert elapsed < 0.5
+    assert active['peak'] > 1
+    # reply order and persistence order follow the configured agent order
+    assert list(replies.keys()) == ['Perry', 'Netty', 'Netty P']
+    assert replies['Netty'] == 'reply from gamer'
+    assert [r[0] for r in orch.memory_db.rows] == ['Perry', 'Netty', 'Netty P']
+    assert all(orch.agent_status[n] == 'ok' for n in replies)
+
+
+def test_concurrent_failures_update_circuit_breaker(monkeypatch):
+    orch = _make_orch()
+    orch.failure_threshold = 2
+
+    def fail_post(url, json=None, timeout=30):
+        raise requests.exceptions.ConnectionError('down')
+
+    monkeypatch.setattr(transport, 'post', fail_post)
+    monkeypatch.setattr('orchestrator.time.sleep', lambda s: None)
+
+    orch.chat('hello everyone')
+    for name in ('Perry', 'Netty', 'Netty P'):
+        assert orch.fail_counts[name] == 2
+        assert orch.cooldowns[name] > time.time()
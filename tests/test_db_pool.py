@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConn:
+    def __init__(self, n):
+        self.n = n
+        self.closed = False
+        self.alive = True
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise RuntimeError('gone')
+
+    def close(self):
+        self.closed = True
+
+
+class Lost(Exception):
+    errno = 2013
+
+
+def _pool(**kwargs):
+    made = []
+
+    def factory():
+        made.append(FakeConn(len(made)))
+        return made[-1]
+
+    return ConnectionPool(factory, **kwargs), made
+
+
+def test_reuses_connections_and_bounds_size():
+    pool, made = _pool(max_size=2, timeout_s=0.1)
+    with pool.connection() as a:
+        pass
+    with pool.connection() as b:
+        assert b is a
+    c1 = pool.acquire()
+    c2 = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert len(made) == 2
+    stats = pool.stats()
+    assert stats['in_use'] == 2 and stats['utilization'] == 1.0 and stats['timeouts'] == 1
+    pool.release(c1)
+    pool.release(c2)
+
+
+def test_waiters_get_released_connections():
+    pool, _ = _pool(max_size=1, timeout_s=2)
+    held = pool.acquire()
+    threading.Timer(0.1, pool.release, args=(held,)).start()
+    with pool.connection() as conn:
+        assert conn is held
+    assert pool.stats()['max_wait_ms'] >= 50
+
+
+def test_health_check_and_retry_on_lost_connection():
+    pool, made = _pool(max_size=2, ping_interval_s=0)
+    with pool.connection() as conn:
+        pass
+    conn.alive = False
+    with pool.connection() as fresh:
+        assert fresh is not conn
+    assert conn.closed
+
+    calls = []
+
+    def op(c):
+        calls.append(c)
+        if len(calls) == 1:
+            raise Lost('lost connection')
+        return 'ok'
+
+    assert pool.run(op) == 'ok'
+    assert calls[0] is not calls[1] and calls[0].closed
+    assert pool.stats()['discarded'] == 2
+
+
+def test_concurrent_checkouts_never_exceed_max_size():
+    pool, made = _pool(max_size=3)
+    peak = []
+
+    def work():
+        with pool.connection():
+            peak.append(pool.stats()['in_use'])
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=work) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) <= 3 and len(made) <= 3
@@ -1,10 +1,10 @@
-import requests
+import transport
 from orchestrator import MultiAgentOrchestrator
 from agents import Agent
 
 
 def test_delegation_primary_rephrase_and_moderator(monkeypatch):
-    import requests
+    import transport
     from orchestrator import MultiAgentOrchestrator
     from agents import Agent
 
@@ -74,7 +74,7 @@ def test_delegation_primary_rephrase_and_moderator(monkeypatch):
 
             return R()
 
-        monkeypatch.setattr(requests, 'post', fake_post)
+        monkeypatch.setattr(transport, 'post', fake_post)
 
         query = "Perry, ask Netty what is PI to the 10 power"
         replies = orch.chat(query)
@@ -1,4 +1,5 @@
 import requests
+import transport
 from orchestrator import MultiAgentOrchestrator
 from agents import Agent
 
@@ -16,7 +17,7 @@ def test_check_agents_sets_status(monkeypatch, tmp_path):
             status_code = 200
         return R()
 
-    monkeypatch.setattr(requests, 'get', fake_get)
+    monkeypatch.setattr(transport, 'get', fake_get)
 
     res = orch.check_agents()
     assert res['A'] == 'ok'
@@ -43,7 +44,7 @@ def test_chat_retries_on_failure(monkeypatch):
 
             return R()
 
-    monkeypatch.setattr(requests, 'post', fake_post)
+    monkeypatch.setattr(transport, 'post', fake_post)
 
     replies = orch.chat('hello')
     assert 'X' in replies
@@ -0,0 +1,109 @@
+import json
+import time
+
+import transport
+from agents import Agent
+from hedging import LatencyTracker
+from orchestrator import MultiAgentOrchestrator
+
+
+class StreamResp:
+    def __init__(self, host, delay, closed):
+        self.status_code = 200
+        self._host = host
+        self._delay = delay
+        self._closed = closed
+
+    def iter_lines(self):
+        yield json.dumps({'response': 'hi from ', 'done': False}).encode()
+        time.sleep(self._delay)
+        yield json.dumps({'response': self._host, 'done': True}).encode()
+
+    def close(self):
+        self._closed.append(self._host)
+
+
+def test_latency_tracker_p95():
+    t = LatencyTracker(min_samples=3)
+    assert t.percentile('A') is None
+    for s in (0.1, 0.2, 0.3, 0.4, 5.0):
+        t.record('A', s)
+    assert t.percentile('A') == 5.0
+    assert t.percentile('A', 50) == 0.3
+
+
+def test_hedged_request_wins_on_replica_and_cancels_primary(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.servers = {'myplex': 'http://myplex', 'gamer': 'http://gamer'}
+    orch.agents = {'Perry': Agent('Perry', 'http://myplex', 'qwen3', '')}
+    orch.use_hedging = True
+    orch.hedge_delay_s = 0.05
+    closed = []
+
+    monkeypatch.setattr('orchestrator.get_models_cached', lambda host: ['qwen3'])
+
+    def fake_post(url, json=None, timeout=None, stream=False):
+        assert json['stream'] is True
+        if 'myplex' in url:
+            return StreamResp('myplex', 1.0, closed)
+        return StreamResp('gamer', 0.0, closed)
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    start = time.monotonic()
+    replies = orch.chat('Perry: hello')
+    assert time.monotonic() - start < 0.8
+    assert replies['Perry'] == 'hi from gamer'
+    # the slower primary's response is closed as soon as the replica wins,
+    # not when its stalled stream next yields
+    assert 'myplex' in closed
+
+
+class SlowStartResp:
+    """Stream whose first token arrives after `delay` seconds."""
+
+    def __init__(self, host, delay, closed):
+        self.status_code = 200
+        self._host = host
+        self._delay = delay
+        self._closed = closed
+
+    def iter_lines(self):
+        time.sleep(self._delay)
+        yield json.dumps({'response': 'hi from ', 'done': False}).encode()
+        yield json.dumps({'response': self._host, 'done': True}).encode()
+
+    def close(self):
+        self._closed.append(self._host)
+
+
+def test_hedged_stream_races_for_first_token(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.servers = {'myplex': 'http://myplex', 'gamer': 'http://gamer'}
+    orch.agents = {'Perry': Agent('Perry', 'http://myplex', 'qwen3', '')}
+    orch.use_hedging = True
+    orch.hedge_delay_s = 0.05
+    closed = []
+
+    monkeypatch.setattr('orchestrator.get_models_cached', lambda host: ['qwen3'])
+
+    def fake_post(url, json=None, timeout=None, stream=False):
+        if 'myplex' in url:
+            return SlowStartResp('myplex', 0.5, closed)
+        return SlowStartResp('gamer', 0.0, closed)
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    start = time.monotonic()
+    gen = orch.chat_stream('Perry: hello')
+    events = []
+    try:
+        while True:
+            events.append(next(gen))
+    except StopIteration as stop:
+        replies = stop.value
+    assert time.monotonic() - start < 0.4
+    # only the winner's deltas reach the reader
+    assert events == [('Perry', 'hi from '), ('Perry', 'gamer')]
+    assert replies['Perry'] == 'hi from gamer'
+    assert 'myplex' in closed
@@ -0,0 +1,83 @@
+import time
+
+from keyword_memory import KeywordMemoryIndex, tokenize
+from memory import MemoryDB, MemorySnapshot, RecentQABuffer
+from prompt_builder import PromptBuilder
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize('What is the capital of France?') == ['capital', 'france']
+
+
+def test_bm25_prefers_rare_terms_and_skips_unrelated():
+    idx = KeywordMemoryIndex()
+    idx.add_many([
+        ('X', 'what is the capital of france', 'Paris is the capital', 1),
+        ('X', 'capital gains tax', 'depends on the country', 2),
+        ('X', 'favourite colour', 'blue', 3),
+        ('X', 'broken', '(Request error for X: boom)', 4),
+    ])
+    hits = idx.search('X', 'france capital', limit=3)
+    assert [h['a'] for h in hits] == ['Paris is the capital', 'depends on the country']
+    assert idx.search('X', 'weather') == []
+    assert idx.search('Y', 'france') is None
+    assert idx.stats()['memories'] == 3
+
+
+def test_not_ready_index_falls_back_to_recency():
+    idx = KeywordMemoryIndex()
+    idx.add('X', 'capital of france', 'Paris')
+    idx.ready = False
+    assert idx.search('X', 'france') is None
+
+
+def test_prompt_builder_injects_keyword_matches_via_snapshot():
+    idx = KeywordMemoryIndex()
+    idx.add_many([('X', 'capital of france', 'Paris', 1), ('X', 'favourite colour', 'blue', 2)])
+    snap = MemorySnapshot({'X': [{'q': 'favourite colour', 'a': 'blue', 'ts': 2}]}, keyword=idx)
+    prompt = PromptBuilder.build_prompt('capital of france', 'X', None, snap, True, False, 'X')
+    assert 'Paris' in prompt and 'blue' not in prompt
+
+
+def test_save_qa_indexes_incrementally_and_rebuild_pages_by_id():
+    db = MemoryDB.__new__(MemoryDB)
+    db.hot = RecentQABuffer(0)
+    db.writer = None
+    db.semantic = None
+    db.keyword = KeywordMemoryIndex()
+    db.summaries = {}
+    db._try_execute = lambda *a, **k: True
+    db.save_qa('X', 'capital of france', 'Paris')
+    assert db.relevant_qa('X', 'france')[0]['a'] == 'Paris'
+    db.clear_memory('X')
+    assert db.relevant_qa('X', 'france') is None
+
+    table = [(i, 'Y', f'question {i}', f'answer {i}', i) for i in range(1, 26)]
+    calls = []
+
+    def fake_execute(sql, params=(), fetch=False, retries=1):
+        calls.append(params)
+        if 'MAX(id)' in sql:
+            return [(25,)]
+        after_id, upper, size = params
+        return [r for r in table if after_id < r[0] <= upper][:size]
+
+    db._try_execute = fake_execute
+    idx = KeywordMemoryIndex()
+    idx.ready = False
+    db._rebuild_keyword_index(idx, page_size=10)
+    assert idx.ready and idx.stats()['memories'] == 25
+    assert [p[0] for p in calls[1:]] == [0, 10, 20, 25]
+
+
+def test_rebuild_of_100k_rows_takes_seconds():
+    words = [f'term{i}' for i in range(2000)]
+    rows = [('X' if i % 2 else 'Y', f'{words[i % 2000]} {words[(i * 7) % 2000]}',
+             f'{words[(i * 13) % 2000]} {words[(i * 31) % 2000]} answer', i) for i in range(100_000)]
+    idx = KeywordMemoryIndex()
+    started = time.monotonic()
+    for i in range(0, len(rows), 10_000):
+        idx.add_many(rows[i:i + 10_000])
+    assert time.monotonic() - started < 10
+    assert idx.stats()['memories'] == 100_000
+    assert idx.search('X', 'term7')
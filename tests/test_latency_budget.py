@@ -0,0 +1,96 @@
+import json
+import time
+
+import transport
+from agents import Agent
+from budget import LatencyBudget
+from orchestrator import MultiAgentOrchestrator
+
+
+class DummyResp:
+    def __init__(self, text):
+        self._text = text
+        self.status_code = 200
+
+    def json(self):
+        return {'response': self._text}
+
+
+def test_budget_clips_timeouts():
+    assert LatencyBudget(None).timeout(30) == 30
+    assert not LatencyBudget(None).exhausted()
+    b = LatencyBudget(5)
+    assert 4 < b.timeout(30) <= 5
+    assert b.timeout(1) == 1
+
+
+def test_chat_skips_optional_stages_when_budget_exhausted(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.agents = {
+        'Perry': Agent('Perry', 'http://perry', 'm', ''),
+        'Netty': Agent('Netty', 'http://netty', 'm', ''),
+    }
+    timeouts = []
+
+    def fake_post(url, json=None, timeout=30):
+        timeouts.append(timeout)
+        time.sleep(0.2)
+        return DummyResp('Perry reply')
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    replies = orch.chat('Perry, ask Netty how fast we are going.', deadline_s=0.1)
+    # only the primary call ran, with its timeout clipped to the budget
+    assert len(timeouts) == 1 and timeouts[0] <= 0.1
+    assert replies['Perry'] == 'Perry reply'
+    assert 'Netty' not in replies
+    assert replies.skipped_stages['Perry'] == ['memory', 'delegation', 'rephrase']
+
+
+class SlowStream:
+    def __init__(self, chunks, delay):
+        self.status_code = 200
+        self._chunks = chunks
+        self._delay = delay
+
+    def iter_lines(self):
+        for chunk in self._chunks:
+            yield json.dumps({'response': chunk, 'done': False}).encode()
+            time.sleep(self._delay)
+        yield json.dumps({'response': '', 'done': True}).encode()
+
+    def close(self):
+        pass
+
+
+def test_chat_stream_uses_the_default_budget(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.agents = {
+        'Perry': Agent('Perry', 'http://perry', 'm', ''),
+        'Netty': Agent('Netty', 'http://netty', 'm', ''),
+    }
+    # what the sidebar sets; the app calls chat_stream without a deadline
+    orch.deadline_s = 0.1
+    timeouts = []
+
+    def fake_post(url, json=None, timeout=30, stream=False):
+        timeouts.append(timeout)
+        return SlowStream(['Perry', ' reply', ' never sent'], delay=0.15)
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    gen = orch.chat_stream('Perry, ask Netty how fast we are going.')
+    events = []
+    try:
+        while True:
+            events.append(next(gen))
+    except StopIteration as stop:
+        replies = stop.value
+
+    # the stream stops once the budget is spent, keeping what was shown
+    assert len(timeouts) == 1 and timeouts[0] <= 0.1
+    assert events == [('Perry', 'Perry'), ('Perry', ' reply')]
+    assert replies['Perry'] == 'Perry reply' and 'Netty' not in replies
+    assert replies.skipped_stages['Perry'] == ['memory', 'delegation', 'rephrase']
+    # a reply cut short is not cached
+    assert orch.response_cache.stats()['entries'] == 0
@@ -8,7 +8,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from config import MultiAgentOrchestrator
 from memory import MemoryDB
-import requests
+import transport
 
 
 class FakeResponse:
@@ -57,8 +57,8 @@ def test_live_memory_flow():
     }
 
     # Monkeypatch
-    orig_post = requests.post
-    requests.post = make_fake_post(mapping)
+    orig_post = transport.post
+    transport.post = make_fake_post(mapping)
 
     try:
         # Addressed
@@ -85,7 +85,7 @@ def test_live_memory_flow():
 
     finally:
         # restore and cleanup
-        requests.post = orig_post
+        transport.post = orig_post
         try:
             db.clear_memory(agent_name)
             db.clear_memory("__group__")
@@ -0,0 +1,102 @@
+import csv
+import datetime
+import io
+import json
+
+from memory import MemoryDB
+from memory_export import write_rows
+
+TS = datetime.datetime(2024, 5, 1, 12, 0, 0)
+
+
+class FakeCursor:
+    def __init__(self, table, queries):
+        self.table = table
+        self.queries = queries
+        self.rows = []
+
+    def execute(self, sql, params):
+        self.queries.append((sql, params))
+        last_id, *filters, limit = params
+        rows = [r for r in self.table if r[0] > last_id]
+        if 'agent_name=%s' in sql:
+            agent = filters.pop(0)
+            rows = [r for r in rows if r[1] == agent]
+        if 'conv_id=%s' in sql:
+            conv_id = filters.pop(0)
+            rows = [r for r in rows if r[4] == conv_id]
+        self.rows = rows[:limit]
+
+    def fetchmany(self, n):
+        batch, self.rows = self.rows[:n], self.rows[n:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, buffered=True):
+        assert buffered is False
+        return FakeCursor(self.db.table, self.db.queries)
+
+
+class FakePool:
+    def __init__(self, db):
+        self.db = db
+        self.in_use = 0
+
+    def run(self, fn, retries=1):
+        self.in_use += 1
+        try:
+            return fn(FakeConn(self.db))
+        finally:
+            self.in_use -= 1
+
+
+def _db(n=7):
+    db = MemoryDB.__new__(MemoryDB)
+    db.writer = None
+    db.table = [(i, 'X' if i % 2 else 'Y', f'q{i}', f'a, "{i}"', 'c1' if i <= 3 else None, TS) for i in range(1, n + 1)]
+    db.queries = []
+    db.pool = FakePool(db)
+    return db
+
+
+def test_iter_export_rows_reads_keyset_chunks_lazily():
+    db = _db()
+    rows = db.iter_export_rows(chunk_size=3)
+    first = [next(rows) for _ in range(3)]
+    assert [r[0] for r in first] == [1, 2, 3]
+    assert len(db.queries) == 1 and db.pool.in_use == 0
+    assert [r[0] for r in rows] == [4, 5, 6, 7]
+    assert [q[1][0] for q in db.queries] == [0, 3, 6]
+    assert 'ORDER BY id LIMIT %s' in db.queries[0][0]
+
+    assert [r[0] for r in db.iter_export_rows(agent='X', chunk_size=2)] == [1, 3, 5, 7]
+    assert [r[0] for r in db.iter_export_rows(conv_id='c1')] == [1, 2, 3]
+
+
+def test_export_formats_round_trip(tmp_path):
+    db = _db()
+    path = tmp_path / 'out.csv'
+    assert db.export(path, 'csv', chunk_size=2) == 7
+    with path.open(newline='', encoding='utf-8') as f:
+        parsed = list(csv.DictReader(f))
+    assert parsed[0] == {'id': '1', 'agent_name': 'X', 'question': 'q1', 'answer': 'a, "1"',
+                         'conv_id': 'c1', 'timestamp': '2024-05-01T12:00:00'}
+    assert parsed[-1]['conv_id'] == ''
+
+    buf = io.StringIO()
+    assert db.export(buf, 'jsonl', agent='Y') == 3
+    lines = [json.loads(line) for line in buf.getvalue().splitlines()]
+    assert [r['id'] for r in lines] == [2, 4, 6] and lines[0]['timestamp'] == '2024-05-01T12:00:00'
+
+    buf = io.StringIO()
+    db.export(buf, 'json')
+    assert [r['id'] for r in json.loads(buf.getvalue())] == list(range(1, 8))
+    empty = io.StringIO()
+    assert write_rows([], empty, 'json') == 0 and json.loads(empty.getvalue()) == []
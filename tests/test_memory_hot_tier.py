@@ -0,0 +1,119 @@
+import time
+from contextlib import nullcontext
+
+from memory import MemoryDB, RecentQABuffer
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self._result = []
+
+    def execute(self, sql, params=()):
+        self.executed.append((sql, params))
+        if sql.startswith('SELECT MAX(id)'):
+            self._result = [(max((r[5] for r in self.rows), default=None),)]
+        elif sql.startswith('SELECT DISTINCT agent_name'):
+            self._result = sorted({(r[0],) for r in self.rows})
+        else:
+            agents = set(params[::2])
+            legacy = 'question IS NULL AND answer IS NULL' in sql
+            self._result = [r for r in self.rows if r[0] in agents and (r[1] is None and r[2] is None) == legacy]
+
+    def fetchall(self):
+        return self._result
+
+
+def _offline_db(rows, size=3):
+    db = MemoryDB.__new__(MemoryDB)
+    db.hot = RecentQABuffer(size)
+    db.fake_cursor = FakeCursor(rows)
+    db.cursor = lambda: nullcontext(db.fake_cursor)
+    db._connected = True
+    db.writer = None
+    db.semantic = None
+    db.keyword = None
+    db.summaries = {}
+    db.writes = []
+
+    def fake_execute(sql, params=(), fetch=False, retries=1):
+        if fetch:
+            raise AssertionError('read reached MySQL: ' + sql)
+        db.writes.append(sql)
+        return True
+
+    db._try_execute = fake_execute
+    return db
+
+
+def test_warm_buffer_serves_reads_and_tracks_writes():
+    db = _offline_db([
+        ('Netty', 'q1', 'a1', 'Q: q1 A: a1', 1, 1),
+        ('Rex', None, None, 'legacy note', 1, 2),
+    ])
+    assert db.warm_hot_tier()
+    # MAX(id), agent list, one QA query, legacy rows only for Rex
+    executed = db.fake_cursor.executed
+    assert len(executed) == 4 and 'ROW_NUMBER' not in ''.join(sql for sql, _ in executed)
+    assert executed[2][1] == ('Netty', 3, 'Rex', 3) and executed[3][1] == ('Rex', 3)
+    assert db.hot.max_id == 2
+
+    assert db.load_recent_qa('Netty', limit=3) == [{'q': 'q1', 'a': 'a1', 'ts': 1}]
+    assert db.load_recent_qa('Rex', limit=2)[0]['a'] == 'legacy note'
+    assert db.load_recent_qa(None, limit=2) == []
+
+    for i in range(2, 5):
+        db.save_qa('Netty', f'q{i}', f'a{i}')
+    assert [r['a'] for r in db.load_recent_qa('Netty', limit=3)] == ['a4', 'a3', 'a2']
+
+    db.save_qa('Rex', 'new q', 'new a')
+    assert db.load_recent_qa('Rex', limit=1)[0]['a'] == 'new a'
+    assert db.load_recent_qa_many(['Netty', None], limit=2)['Netty'][0]['a'] == 'a4'
+
+    db.clear_memory('Netty')
+    assert db.load_recent_qa('Netty', limit=3) == []
+    assert len(db.writes) == 6
+
+
+def test_cold_buffer_falls_back_to_sql():
+    buf = RecentQABuffer(5)
+    buf.add('X', 'q', 'a')
+    assert buf.get('X', 3) is None
+
+
+def test_failed_insert_is_not_served_from_the_buffer():
+    db = _offline_db([('Netty', 'q1', 'a1', 'Q: q1 A: a1', 1, 1)])
+    assert db.warm_hot_tier()
+    db._try_execute = lambda *a, **k: None  # the INSERT failed
+    db.save_qa('Netty', 'lost q', 'lost a')
+    assert [r['a'] for r in db.load_recent_qa('Netty', limit=3)] == ['a1']
+
+
+def test_rows_from_other_writers_trigger_a_rewarm():
+    rows = [('Netty', 'q1', 'a1', 'Q: q1 A: a1', 1, 1)]
+    db = _offline_db(rows)
+    db.hot.ttl_s = 0.01
+    assert db.warm_hot_tier()
+    reads = []
+
+    def fake_execute(sql, params=(), fetch=False, retries=1):
+        if fetch:
+            reads.append(sql)
+            return [(max(r[5] for r in rows),)]
+        return True
+
+    db._try_execute = fake_execute
+    db.save_qa('Netty', 'q2', 'a2')
+    rows.append(('Netty', 'q2', 'a2', 'Q: q2 A: a2', 2, 2))
+    time.sleep(0.02)
+    # our own write explains the new MAX(id): no re-warm
+    assert [r['a'] for r in db.load_recent_qa('Netty', limit=3)] == ['a2', 'a1']
+    assert len(reads) == 1 and len(db.fake_cursor.executed) == 3
+
+    # another session writes; the next check after the TTL re-warms
+    rows.append(('Netty', 'q3', 'from elsewhere', 'Q: q3 A: from elsewhere', 3, 3))
+    assert db.load_recent_qa('Netty', limit=1)[0]['a'] == 'a2'
+    time.sleep(0.02)
+    assert db.load_recent_qa('Netty', limit=1)[0]['a'] == 'from elsewhere'
+    assert len(reads) == 2 and db.hot.max_id == 3
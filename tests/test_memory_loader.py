@@ -0,0 +1,39 @@
+import time
+
+from memory_loader import READY, MemoryDBLoader
+
+
+class FlakyDB:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def connect(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            return False
+        return True
+
+
+def test_retries_with_backoff_then_hands_over_the_store():
+    db = FlakyDB(failures=2)
+    ready = []
+    started = time.monotonic()
+    loader = MemoryDBLoader(on_ready=ready.append, factory=lambda: db, initial_backoff_s=0.05, max_backoff_s=0.1)
+    loader.start()
+    assert time.monotonic() - started < 0.05  # start() never blocks on the DB
+
+    assert loader.wait(timeout=2)
+    assert loader.state == READY
+    assert ready == [db]
+    assert loader.attempts == 3
+    assert loader.retry_in() is None
+
+
+def test_stop_ends_retrying():
+    loader = MemoryDBLoader(factory=lambda: FlakyDB(failures=10**6), initial_backoff_s=0.05)
+    loader.start()
+    time.sleep(0.1)
+    assert loader.last_error
+    loader.stop()
+    assert not loader.wait(timeout=0.5)
@@ -0,0 +1,88 @@
+import datetime
+
+import pytest
+
+from memory import MemoryDB, RecentQABuffer
+
+
+class FakeConn:
+    def __init__(self, log):
+        self.log = log
+
+    def cursor(self):
+        return self
+
+    def start_transaction(self):
+        self.log.append('begin')
+
+    def executemany(self, sql, rows):
+        self.log.append((sql, list(rows)))
+
+    def commit(self):
+        self.log.append('commit')
+
+    def rollback(self):
+        self.log.append('rollback')
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self):
+        self.log = []
+
+    def run(self, fn, retries=1):
+        return fn(FakeConn(self.log))
+
+
+def _db():
+    db = MemoryDB.__new__(MemoryDB)
+    db.writer = None
+    db.hot = RecentQABuffer(0)
+    db.pool = FakePool()
+    return db
+
+
+def _rows(n, day=datetime.datetime(2024, 5, 1, 8, 0)):
+    return [(i, 'X' if i % 2 else '__group__', f'q{i}', f'a{i}', 'c1' if i < 3 else None,
+             day + datetime.timedelta(hours=10 * i)) for i in range(1, n + 1)]
+
+
+def test_import_rows_batches_multi_row_inserts():
+    db = _db()
+    assert db.import_rows(iter(_rows(5)), batch_size=2) == 5
+    inserts = [e for e in db.pool.log if isinstance(e, tuple)]
+    assert [len(rows) for _, rows in inserts] == [2, 2, 1]
+    sql, rows = inserts[0]
+    assert sql.startswith('INSERT INTO agent_memory (agent_name, memory_text, question, answer, conv_id, timestamp)')
+    assert rows[0][:5] == ('X', 'Q: q1 A: a1', 'q1', 'a1', 'c1')
+    assert db.pool.log.count('commit') == 3
+
+    db = _db()
+    db.import_rows(_rows(1), keep_ids=True)
+    sql, rows = db.pool.log[1]
+    assert sql.startswith('INSERT INTO agent_memory (id, agent_name') and rows[0][0] == 1
+
+
+def test_parquet_round_trip_is_partitioned_by_day(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    from memory_parquet import iter_parquet_rows, parquet_files, write_parquet
+
+    rows = _rows(7)
+    stats = write_parquet(iter(rows), str(tmp_path), batch_rows=3, max_open_files=1)
+    assert stats['rows'] == 7
+    days = sorted(p.name for p in tmp_path.iterdir())
+    assert days == ['date=2024-05-01', 'date=2024-05-02', 'date=2024-05-03', 'date=2024-05-04']
+
+    schema = pq.ParquetFile(parquet_files(str(tmp_path))[0]).schema_arrow
+    assert str(schema.field('agent_name').type).startswith('dictionary')
+    assert sorted(iter_parquet_rows(str(tmp_path))) == rows
+
+
+def test_export_parquet_streams_from_db(tmp_path):
+    pytest.importorskip('pyarrow')
+    db = _db()
+    rows = _rows(4)
+    db.iter_export_rows = lambda **kw: iter(rows)
+    assert db.export(tmp_path / 'archive', 'parquet') == 4
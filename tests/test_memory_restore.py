@@ -0,0 +1,98 @@
+import datetime
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+import migrations
+from memory import MemoryDB, RecentQABuffer
+from memory_export import detect_format, iter_file_rows, write_rows
+from test_memory_parquet import FakePool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import restore_memories  # noqa: E402
+
+TS = datetime.datetime(2024, 5, 1, 12, 30)
+ROWS = [
+    (1, 'X', 'q, "quoted"', 'multi\nline', 'c1', TS),
+    (2, '__group__', '', 'a2', None, TS),
+]
+
+
+def _db():
+    db = MemoryDB.__new__(MemoryDB)
+    db.writer = None
+    db.hot = RecentQABuffer(0)
+    db.pool = FakePool()
+    return db
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'jsonl', 'json'])
+def test_exports_read_back_unchanged(tmp_path, fmt):
+    path = tmp_path / f'export.{fmt}'
+    with path.open('w', encoding='utf-8', newline='') as f:
+        write_rows(ROWS, f, fmt)
+    assert detect_format(str(path)) == fmt
+    assert list(iter_file_rows(str(path))) == ROWS
+
+
+def test_older_exports_without_ids_are_accepted(tmp_path):
+    legacy_csv = tmp_path / 'all.csv'
+    legacy_csv.write_text('agent_name,question,answer,conv_id,timestamp\r\nX,q,a,,2024-05-01 12:30:00\r\n', encoding='utf-8')
+    assert list(iter_file_rows(str(legacy_csv))) == [(None, 'X', 'q', 'a', None, TS)]
+
+    sidebar_json = tmp_path / 'X_memories.json'
+    sidebar_json.write_text(json.dumps([{'q': 'q', 'a': 'a', 'ts': '2024-05-01 12:30:00', 'agent_name': 'X'}]), encoding='utf-8')
+    assert list(iter_file_rows(str(sidebar_json))) == [(None, 'X', 'q', 'a', None, TS)]
+
+    db = _db()
+    with pytest.raises(ValueError):
+        db.import_rows(iter_file_rows(str(legacy_csv)), keep_ids=True)
+
+
+def test_restore_reports_progress_per_batch(tmp_path):
+    path = tmp_path / 'export.jsonl'
+    rows = [(i, 'X', f'q{i}', f'a{i}', None, TS) for i in range(1, 11)]
+    with path.open('w', encoding='utf-8') as f:
+        write_rows(rows, f, 'jsonl')
+    seen = []
+    db = _db()
+    assert restore_memories.restore(db, str(path), 'jsonl', batch_size=4, keep_ids=True, progress=seen.append) == 10
+    assert seen == [4, 8, 10]
+    sql, batch = db.pool.log[1]
+    assert 'COALESCE(%s, CURRENT_TIMESTAMP)' in sql and batch[0][0] == 1
+
+    with pytest.raises(ValueError):
+        restore_memories.restore(db, str(path), 'jsonl', method='load-data')
+
+
+class IndexCursor:
+    def __init__(self, existing):
+        self.existing = set(existing)
+        self.executed = []
+        self._result = None
+
+    def execute(self, sql, params=()):
+        self.executed.append(sql)
+        if 'information_schema.STATISTICS' in sql:
+            self._result = (1 if params[1] in self.existing else 0,)
+        elif sql.startswith('ALTER TABLE agent_memory DROP'):
+            self.existing.clear()
+        elif sql.startswith('CREATE'):
+            self.existing.add(sql.split()[3 if 'FULLTEXT' in sql else 2])
+
+    def fetchone(self):
+        return self._result
+
+
+def test_deferred_indexes_are_dropped_then_rebuilt():
+    cur = IndexCursor(['idx_agent_ts', 'ft_qa'])
+    db = _db()
+    db.cursor = contextmanager(lambda: (yield cur))
+    with db.deferred_indexes() as dropped:
+        assert dropped == ['idx_agent_ts', 'ft_qa'] and not cur.existing
+    assert cur.existing == {'idx_agent_ts', 'ft_qa'}
+    assert 'ALTER TABLE agent_memory DROP INDEX idx_agent_ts, DROP INDEX ft_qa' in cur.executed
+    assert migrations.SECONDARY_INDEXES['ft_qa'] in cur.executed
@@ -0,0 +1,49 @@
+from memory import MemoryDB, fulltext_query
+
+
+def test_fulltext_query_requires_every_word_and_drops_operators():
+    assert fulltext_query('spaceship "launch" -date') == '+spaceship* +launch* +date*'
+    assert fulltext_query('a to') == ''
+
+
+def _db(table):
+    db = MemoryDB.__new__(MemoryDB)
+    db.calls = []
+
+    def fake_execute(sql, params=(), fetch=False, retries=1):
+        db.calls.append((sql, params))
+        rows = [r for r in table if 'spaceship' in r[2]]
+        if 'agent_name=%s' in sql:
+            rows = [r for r in rows if r[1] == params[1]]
+        if 'id < %s' in sql:
+            rows = [r for r in rows if r[0] < params[-2]]
+        return sorted(rows, reverse=True)[:params[-1]]
+
+    db._try_execute = fake_execute
+    return db
+
+
+def test_search_pages_by_id_with_cursor():
+    table = [(i, 'X' if i % 2 else 'Y', f'spaceship {i}', 'answer', None, i) for i in range(1, 8)]
+    db = _db(table)
+
+    rows, cursor = db.search('spaceship', limit=3)
+    assert [r['id'] for r in rows] == [7, 6, 5] and cursor == 5
+    sql, params = db.calls[-1]
+    assert 'MATCH(question, answer) AGAINST (%s IN BOOLEAN MODE)' in sql
+    assert 'LIKE' not in sql and params == ('+spaceship*', 4)
+
+    rows, cursor = db.search('spaceship', limit=3, cursor=cursor)
+    assert [r['id'] for r in rows] == [4, 3, 2] and cursor == 2
+    rows, cursor = db.search('spaceship', limit=3, cursor=cursor)
+    assert [r['id'] for r in rows] == [1] and cursor is None
+
+    rows, cursor = db.search('spaceship', agent='X', limit=10)
+    assert {r['agent_name'] for r in rows} == {'X'} and cursor is None
+    assert rows[0] == {'id': 7, 'agent_name': 'X', 'question': 'spaceship 7', 'answer': 'answer', 'conv_id': None, 'timestamp': 7}
+
+
+def test_search_without_usable_words_skips_the_database():
+    db = _db([])
+    assert db.search('?!') == ([], None)
+    assert db.calls == []
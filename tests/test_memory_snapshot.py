@@ -0,0 +1,90 @@
+import transport
+from agents import Agent
+from memory import MemoryDB, MemorySnapshot, RecentQABuffer
+from orchestrator import MultiAgentOrchestrator
+
+
+def recent_rows(rows, sql, params):
+    """Answer a `migrations.recent_rows_sql` query: rows of the requested agents and kind (QA or legacy)."""
+    agents = set(params[::2])
+    legacy = 'question IS NULL AND answer IS NULL' in sql
+    return [r for r in rows if r[0] in agents and (r[1] is None and r[2] is None) == legacy]
+
+
+def _offline_db(rows):
+    db = MemoryDB.__new__(MemoryDB)
+    db.hot = RecentQABuffer(0)
+    db.semantic = None
+    db.keyword = None
+    db.summaries = {}
+    db.queries = []
+
+    def fake_execute(sql, params=(), fetch=False, retries=1):
+        db.queries.append((sql, params))
+        return recent_rows(rows, sql, params)
+
+    db._try_execute = fake_execute
+    return db
+
+
+def test_load_recent_qa_many_uses_indexed_branches_with_legacy_fallback():
+    rows = [
+        ('Netty', 'q1', 'a1', 'Q: q1 A: a1', 1, 11),
+        ('Netty', 'q2', 'a2', 'Q: q2 A: a2', 2, 12),
+        ('Netty', None, None, 'old note', 0, 10),
+        ('Rex', None, None, 'legacy only', 0, 20),
+        ('__group__', 'hello', '', 'Q: hello A: ', 3, 30),
+    ]
+    db = _offline_db(rows)
+    out = db.load_recent_qa_many(['Netty', None, 'Netty'], limit=5)
+
+    # every agent has QA rows: one query, one LIMIT branch per agent, no window function
+    assert len(db.queries) == 1
+    sql, params = db.queries[0]
+    assert sql.count('UNION ALL') == 1 and 'OVER (' not in sql
+    assert sql.count('WHERE agent_name=%s') == 2 and 'ORDER BY timestamp DESC, id DESC LIMIT %s' in sql
+    assert params == ('Netty', 5, '__group__', 5)
+    assert [r['a'] for r in out['Netty']] == ['a2', 'a1']
+
+    # legacy rows are only read for agents without QA rows
+    out = db.load_recent_qa_many(['Netty', 'Rex'], limit=5)
+    assert db.queries[-1][1] == ('Rex', 5)
+    assert out['Rex'] == [{'q': '', 'a': 'legacy only', 'ts': 0}]
+    assert [r['a'] for r in out['Netty']] == ['a2', 'a1']
+
+
+def test_snapshot_serves_load_recent_qa():
+    snap = MemorySnapshot({'X': [{'q': 'q', 'a': 'a', 'ts': 1}] * 4, '__group__': [{'q': 'g', 'a': 'ga', 'ts': 1}]})
+    assert len(snap.load_recent_qa('X', limit=3)) == 3
+    assert snap.load_recent_qa(None)[0]['a'] == 'ga'
+    assert snap.load_recent_qa('unknown') == []
+
+
+class DummyResp:
+    status_code = 200
+
+    def json(self):
+        return {'response': 'ok'}
+
+
+def test_broadcast_builds_all_prompts_from_one_query(monkeypatch):
+    db = _offline_db([(n, 'earlier', f'remembered by {n}', 'x', 1, i) for i, n in enumerate(['A', 'B', 'C', '__group__'])])
+    db.save_qa = lambda *args, **kwargs: None
+    db.load_recent_qa = lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError('per-agent query'))
+
+    orch = MultiAgentOrchestrator()
+    orch.memory_db = db
+    orch.use_memory = True
+    orch.agents = {n: Agent(n, f'http://{n}', 'm', '') for n in ('A', 'B', 'C')}
+    prompts = {}
+
+    def fake_post(url, json=None, timeout=30):
+        prompts[url] = json['prompt']
+        return DummyResp()
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+    replies = orch.chat('hello everyone', use_cache=False)
+
+    assert set(replies) == {'A', 'B', 'C'}
+    assert len(db.queries) == 1
+    assert 'remembered by A' in prompts['http://A/api/generate']
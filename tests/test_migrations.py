@@ -0,0 +1,73 @@
+import migrations
+
+
+class FakeCursor:
+    """Records statements and answers the migration bookkeeping queries."""
+
+    def __init__(self, version=0, columns=(), indexes=()):
+        self.version = version
+        self.columns = set(columns)
+        self.indexes = set(indexes)
+        self.executed = []
+        self._result = None
+        self.description = None
+
+    def execute(self, sql, params=()):
+        self.executed.append(sql.strip())
+        if 'MAX(version)' in sql:
+            self._result = (self.version,)
+        elif 'information_schema.COLUMNS' in sql:
+            self._result = (1 if params[1] in self.columns else 0,)
+        elif 'information_schema.STATISTICS' in sql:
+            self._result = (1 if params[1] in self.indexes else 0,)
+        elif sql.startswith('INSERT INTO schema_version'):
+            self.version = params[0]
+        elif sql.startswith('EXPLAIN'):
+            self.description = [('table',), ('type',), ('key',), ('Extra',)]
+            self._result = None
+            self._rows = [('agent_memory', 'ALL', None, 'Using where; Using filesort')] if 'conv_id' in sql else [('agent_memory', 'ref', 'idx_agent_ts', 'Using where')]
+        else:
+            self._result = (1,)
+
+    def fetchone(self):
+        return self._result
+
+    def fetchall(self):
+        return self._rows
+
+
+def test_fresh_database_runs_every_step():
+    cur = FakeCursor()
+    assert migrations.migrate(cur) == migrations.LATEST_VERSION
+    ddl = '\n'.join(cur.executed)
+    assert 'CREATE TABLE IF NOT EXISTS agent_memory' in ddl
+    assert 'ALTER TABLE agent_memory ADD COLUMN question TEXT' in ddl
+    assert 'CREATE INDEX idx_agent_ts ON agent_memory (agent_name, timestamp)' in ddl
+    assert 'CREATE INDEX idx_conv_ts ON agent_memory (conv_id, timestamp)' in ddl
+    assert 'CREATE FULLTEXT INDEX ft_qa ON agent_memory (question, answer)' in ddl
+    assert 'CREATE TABLE IF NOT EXISTS agent_memory_rollup' in ddl
+    assert 'ALTER TABLE agent_memory ADD COLUMN compacted TINYINT(1) NOT NULL DEFAULT 0' in ddl
+    assert any(s.startswith('SELECT GET_LOCK') for s in cur.executed)
+
+
+def test_only_pending_steps_run_and_current_schema_is_cheap():
+    cur = FakeCursor(version=2, columns=('question', 'answer', 'conv_id', 'compacted'))
+    migrations.migrate(cur)
+    assert not any('ALTER TABLE' in s for s in cur.executed)
+    assert any(s.startswith('CREATE INDEX idx_agent_ts') for s in cur.executed)
+
+    cur = FakeCursor(version=migrations.LATEST_VERSION)
+    migrations.migrate(cur, key='db-a')
+    assert not any('GET_LOCK' in s or 'CREATE INDEX' in s for s in cur.executed)
+    again = FakeCursor(version=0)
+    migrations.migrate(again, key='db-a')
+    assert again.executed == []
+
+
+def test_explain_flags_full_scans_and_filesorts():
+    report = migrations.explain_hot_queries(FakeCursor())
+    assert report['load_recent_qa']['warnings'] == []
+    # the chat snapshot / hot-tier warm-up statements are covered too
+    assert {'recent_qa_many', 'recent_legacy_many', 'hot_tier_agents', 'hot_tier_max_id'} <= set(report)
+    assert report['recent_qa_many']['warnings'] == []
+    assert report['conversation_export']['warnings'] == ['full scan of agent_memory', 'filesort on agent_memory']
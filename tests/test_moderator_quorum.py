@@ -0,0 +1,181 @@
+import json
+import threading
+
+import transport
+from agents import Agent
+from orchestrator import MultiAgentOrchestrator
+
+
+class DummyResp:
+    def __init__(self, text):
+        self._text = text
+        self.status_code = 200
+
+    def json(self):
+        return {'response': self._text}
+
+
+def test_moderator_runs_on_quorum_and_excludes_late_reply(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.agents = {
+        'Fast': Agent('Fast', 'http://fast', 'm', ''),
+        'Slow': Agent('Slow', 'http://slow', 'm', ''),
+    }
+    orch.moderator = Agent('Moderator', 'http://mod', 'm', '')
+    orch.use_moderator = True
+    orch.moderator_quorum = 1
+    release_slow = threading.Event()
+    moderator_prompts = []
+
+    def fake_post(url, json=None, timeout=30):
+        if 'slow' in url:
+            # only answers after the moderator has been asked
+            release_slow.wait(5)
+            return DummyResp('slow reply')
+        if 'mod' in url:
+            moderator_prompts.append(json['prompt'])
+            release_slow.set()
+            return DummyResp('Fast is best')
+        return DummyResp('fast reply')
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    replies = orch.chat('hello all')
+    assert list(replies) == ['Fast', 'Slow', 'Moderator']
+    # the late reply is still shown ...
+    assert replies['Slow'] == 'slow reply'
+    # ... but the moderator summarized without it
+    assert 'fast reply' in moderator_prompts[0]
+    assert 'Slow' not in moderator_prompts[0]
+    assert replies['Moderator'] == 'Fast is best'
+
+
+def test_moderator_deadline_bounds_wait(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.agents = {
+        'A': Agent('A', 'http://a', 'm', ''),
+        'B': Agent('B', 'http://b', 'm', ''),
+    }
+    orch.moderator = Agent('Moderator', 'http://mod', 'm', '')
+    orch.use_moderator = True
+    orch.moderator_deadline_s = 0.05
+    hang = threading.Event()
+    moderator_prompts = []
+
+    def fake_post(url, json=None, timeout=30):
+        if 'mod' in url:
+            moderator_prompts.append(json['prompt'])
+            hang.set()
+            return DummyResp('summary')
+        hang.wait(5)
+        return DummyResp('agent reply')
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    replies = orch.chat('hello all')
+    assert 'agent reply' not in moderator_prompts[0]
+    assert replies['A'] == 'agent reply' and replies['B'] == 'agent reply'
+
+
+class StreamResp:
+    def __init__(self, text, wait=None, then=None):
+        self.status_code = 200
+        self._text = text
+        self._wait = wait
+        self._then = then
+
+    def iter_lines(self):
+        if self._wait is not None:
+            self._wait.wait(5)
+        yield json.dumps({'response': self._text, 'done': False}).encode()
+        if self._then is not None:
+            self._then.set()
+        yield json.dumps({'response': '', 'done': True}).encode()
+
+    def close(self):
+        pass
+
+
+def test_chat_stream_moderator_starts_on_quorum(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.agents = {
+        'Fast': Agent('Fast', 'http://fast', 'm', ''),
+        'Slow': Agent('Slow', 'http://slow', 'm', ''),
+    }
+    orch.moderator = Agent('Moderator', 'http://mod', 'm', '')
+    orch.use_moderator = True
+    orch.moderator_quorum = 1
+    release_slow = threading.Event()
+    moderator_prompts = []
+
+    def fake_post(url, json=None, timeout=30, stream=False):
+        if 'slow' in url:
+            # only finishes once the moderator has been asked
+            return StreamResp('slow reply', wait=release_slow)
+        if 'mod' in url:
+            moderator_prompts.append(json['prompt'])
+            return StreamResp('Fast is best', then=release_slow)
+        return StreamResp('fast reply')
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    gen = orch.chat_stream('hello all')
+    events = []
+    try:
+        while True:
+            events.append(next(gen))
+    except StopIteration as stop:
+        replies = stop.value
+
+    assert 'fast reply' in moderator_prompts[0] and 'Slow' not in moderator_prompts[0]
+    # the moderator streamed before the late agent finished
+    assert events.index(('Moderator', 'Fast is best')) < events.index(('Slow', 'slow reply'))
+    assert replies == {'Fast': 'fast reply', 'Slow': 'slow reply', 'Moderator': 'Fast is best'}
+
+
+class OneHitSemanticCache:
+    """Answers agent A from the cache, misses for everyone else."""
+
+    def lookup(self, agent, query):
+        return 'cached answer' if agent == 'A' else None
+
+    def add(self, agent, query, answer, latency_s=0.0):
+        pass
+
+
+def test_quorum_summary_includes_semantic_cache_hits(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.agents = {
+        'A': Agent('A', 'http://a', 'm', ''),
+        'B': Agent('B', 'http://b', 'm', ''),
+        'C': Agent('C', 'http://c', 'm', ''),
+    }
+    orch.moderator = Agent('Moderator', 'http://mod', 'm', '')
+    orch.use_moderator = True
+    orch.moderator_quorum = 2
+    orch.use_semantic_cache = True
+    orch.semantic_cache = OneHitSemanticCache()
+    moderator_prompts = []
+
+    def fake_post(url, json=None, timeout=30):
+        if 'mod' in url:
+            moderator_prompts.append(json['prompt'])
+            return DummyResp('A is best')
+        return DummyResp('live reply')
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    replies = orch.chat('hello all')
+    assert replies['A'] == 'cached answer'
+    assert '- A: cached answer' in moderator_prompts[0]
+    assert 'temporarily unavailable' not in moderator_prompts[0]
+
+
+def test_quorum_summary_marks_budget_skipped_agents():
+    items = [('A', None), ('B', None), ('C', None), ('D', None)]
+    summarized = MultiAgentOrchestrator._quorum_replies(items, {'A': 'a reply'}, late=['C'], skipped=['B'])
+    assert summarized == {
+        'A': 'a reply',
+        'B': '(Skipped: latency budget exhausted)',
+        'D': '(Agent temporarily unavailable)',
+    }
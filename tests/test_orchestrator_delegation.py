@@ -40,7 +40,7 @@ def test_delegation_chaining(monkeypatch):
         'Netty': Agent('Netty', 'http://netty:11434', 'm', 'persona'),
     }
 
-    # Stub requests.post to return different replies based on URL
+    # Stub transport.post to return different replies based on URL
     def fake_post(url, json=None, timeout=60):
         if 'perry' in url:
             return DummyResp("Perry reply: asking Netty now.")
@@ -48,7 +48,7 @@ def test_delegation_chaining(monkeypatch):
             return DummyResp("Netty reply: current speed is 9.8 km/s")
         return DummyResp("unknown")
 
-    monkeypatch.setattr('orchestrator.requests.post', fake_post)
+    monkeypatch.setattr('orchestrator.transport.post', fake_post)
 
     # Run chat with delegation
     q = "Perry, ask Netty how fast we are going."
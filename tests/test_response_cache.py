@@ -0,0 +1,113 @@
+import json
+import sqlite3
+import threading
+
+import transport
+from agents import Agent
+from orchestrator import MultiAgentOrchestrator
+from response_cache import ResponseCache
+
+
+def _payload(prompt, model='m'):
+    return {'model': model, 'system': 'You are X.', 'prompt': prompt, 'stream': False}
+
+
+def test_lru_ttl_and_error_replies(monkeypatch):
+    cache = ResponseCache(max_entries=2, ttl_s=60)
+    cache.put(_payload('a'), 'A')
+    cache.put(_payload('b'), 'B')
+    assert cache.get(_payload('a')) == 'A'
+    cache.put(_payload('c'), 'C')  # evicts 'b', the least recently used
+    assert cache.get(_payload('b')) is None
+    # stream flag is not part of the key
+    assert cache.get(dict(_payload('a'), stream=True)) == 'A'
+    # different model is a different entry
+    assert cache.get(_payload('a', model='other')) is None
+
+    cache.put(_payload('err'), '(Request error for X: boom)')
+    assert cache.get(_payload('err')) is None
+
+    monkeypatch.setattr('response_cache.time.time', lambda: 10**10)
+    assert cache.get(_payload('a')) is None
+    assert cache.stats()['hits'] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    ResponseCache(disk_path=path).put(_payload('q'), 'answer')
+    fresh = ResponseCache(disk_path=path)
+    assert fresh.get(_payload('q')) == 'answer'
+    assert fresh.stats()['disk_hits'] == 1
+
+
+class DummyResp:
+    status_code = 200
+
+    def json(self):
+        return {'response': 'fresh reply'}
+
+
+def test_chat_serves_repeats_from_cache_unless_bypassed(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.response_cache = ResponseCache()
+    orch.agents = {'X': Agent('X', 'http://x', 'm', '')}
+    calls = []
+
+    def fake_post(url, json=None, timeout=30):
+        calls.append(url)
+        return DummyResp()
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    assert orch.chat('X: hi')['X'] == 'fresh reply'
+    assert orch.chat('X: hi')['X'] == 'fresh reply'
+    assert len(calls) == 1
+    orch.chat('X: hi', use_cache=False)
+    assert len(calls) == 2
+
+
+class BrokenCache(ResponseCache):
+    def get(self, payload):
+        raise sqlite3.OperationalError('database is locked')
+
+    def put(self, payload, reply):
+        raise sqlite3.OperationalError('database is locked')
+
+
+class StreamResp:
+    status_code = 200
+
+    def iter_lines(self):
+        yield json.dumps({'response': 'streamed reply', 'done': True}).encode()
+
+    def close(self):
+        pass
+
+
+def test_chat_stream_survives_a_failing_cache(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.response_cache = BrokenCache()
+    orch.agents = {'X': Agent('X', 'http://x', 'm', ''), 'Y': Agent('Y', 'http://y', 'm', '')}
+    monkeypatch.setattr(transport, 'post', lambda url, json=None, timeout=30, stream=False: StreamResp())
+
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(events=list(orch.chat_stream('hello all'))), daemon=True)
+    worker.start()
+    worker.join(5)
+    # used to hang forever waiting for the worker's end-of-stream marker
+    assert not worker.is_alive()
+    assert sorted(result['events']) == [('X', 'streamed reply'), ('Y', 'streamed reply')]
+
+
+def test_cache_settings_survive_save_config(tmp_path):
+    path = str(tmp_path / 'agents_config.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'agents': [], 'response_cache': {'enabled': False, 'max_entries': 32, 'ttl_s': 60}}, f)
+    orch = MultiAgentOrchestrator()
+    orch.load_config(path)
+    orch.save_config(path)
+
+    again = MultiAgentOrchestrator()
+    again.load_config(path)
+    assert again.use_response_cache is False
+    assert (again.response_cache.max_entries, again.response_cache.ttl_s) == (32, 60.0)
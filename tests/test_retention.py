@@ -0,0 +1,99 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+from memory import RecentQABuffer
+from retention import RetentionJob, RetentionPolicy, ensure_partitions, partition_table
+
+NOW = datetime(2024, 6, 15, 12, 0)
+
+
+def test_policy_from_env(monkeypatch):
+    monkeypatch.setenv('MEMORY_RETENTION_DAYS', '90')
+    monkeypatch.setenv('MEMORY_RETENTION_AGENT_DAYS', 'Moderator=7, __group__=0')
+    policy = RetentionPolicy.from_env()
+    assert policy.ttl_days('Perry') == 90 and policy.ttl_days('Moderator') == 7
+    assert policy.ttl_days('__group__') is None
+    assert policy.cutoff('Moderator', NOW) == datetime(2024, 6, 8, 12, 0)
+    # the group keeps rows forever, so no month is expired for everyone
+    assert policy.horizon(['Perry', 'Moderator'], NOW) is None
+    assert RetentionPolicy(30, {'Moderator': 7}).horizon(['Perry'], NOW) == datetime(2024, 5, 16, 12, 0)
+    assert not RetentionPolicy()
+
+
+class FakeCursor:
+    def __init__(self, partitions=(), agents=('Perry', 'Moderator'), expired=12000, fulltext=False):
+        self.partitions = list(partitions)
+        self.agents = agents
+        self.expired = {a: expired for a in agents}
+        self.fulltext = fulltext
+        self.executed = []
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.executed.append((sql, params))
+        if 'information_schema.PARTITIONS' in sql:
+            self._rows = self.partitions
+        elif 'information_schema.STATISTICS' in sql:
+            self._rows = [(1 if self.fulltext else 0,)]
+        elif sql.startswith('SELECT DISTINCT agent_name'):
+            self._rows = [(a,) for a in self.agents]
+        elif sql.startswith('SELECT COUNT(*) FROM agent_memory WHERE agent_name'):
+            self._rows = [(self.expired[params[0]],)]
+        elif sql.startswith('SELECT COUNT(*) FROM agent_memory PARTITION'):
+            self._rows = [(5,)]
+        elif sql.startswith('DELETE'):
+            agent, _, limit = params
+            self.rowcount = min(limit, self.expired[agent])
+            self.expired[agent] -= self.rowcount
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0]
+
+
+class FakeDB:
+    def __init__(self, cur):
+        self.cur = cur
+        self.hot = RecentQABuffer(0)
+        self.cursor = contextmanager(lambda: (yield cur))
+
+    def flush(self):
+        pass
+
+
+def test_rows_are_rolled_up_before_chunked_deletes():
+    cur = FakeCursor()
+    report = RetentionJob(FakeDB(cur), RetentionPolicy(None, {'Moderator': 7}), archive_dir=None).run(NOW)
+    assert report['pruned'] == 12000
+    statements = [s for s, _ in cur.executed]
+    rollup = next(i for i, s in enumerate(statements) if s.startswith('INSERT INTO agent_memory_rollup'))
+    deletes = [i for i, s in enumerate(statements) if s.startswith('DELETE')]
+    assert len(deletes) == 3 and rollup < deletes[0]
+    assert all(p[0] == 'Moderator' for s, p in cur.executed if s.startswith('DELETE'))
+
+
+def test_expired_months_are_dropped_as_partitions():
+    april, may = datetime(2024, 4, 1).timestamp(), datetime(2024, 5, 1).timestamp()
+    cur = FakeCursor(partitions=[('p202403', int(april)), ('p202404', int(may)), ('pmax', 'MAXVALUE')], expired=0)
+    report = RetentionJob(FakeDB(cur), RetentionPolicy(30), archive_dir=None).run(NOW)
+    # horizon is 2024-05-16: March and April are gone for everyone
+    assert report['dropped_partitions'] == ['p202403', 'p202404'] and report['pruned'] == 10
+    assert report['new_partitions'] == ['p202405', 'p202406', 'p202407', 'p202408']
+    assert any(s.startswith('ALTER TABLE agent_memory REORGANIZE PARTITION pmax') for s, _ in cur.executed)
+
+
+def test_partitioning_needs_the_fulltext_index_gone():
+    with pytest.raises(RuntimeError):
+        partition_table(FakeCursor(fulltext=True), datetime(2024, 4, 3), NOW)
+    cur = FakeCursor()
+    partition_table(cur, datetime(2024, 4, 3), NOW, months_ahead=1)
+    ddl = cur.executed[-1][0]
+    assert ddl.startswith('ALTER TABLE agent_memory PARTITION BY RANGE (UNIX_TIMESTAMP(timestamp))')
+    assert [p for p in ('p202404', 'p202405', 'p202406', 'p202407', 'pmax') if p in ddl] == ['p202404', 'p202405', 'p202406', 'p202407', 'pmax']
+    assert 'p202408' not in ddl
+    assert ensure_partitions(FakeCursor(partitions=[('p202407', int(datetime(2024, 8, 1).timestamp())), ('pmax', 'MAXVALUE')]), NOW, 1) == []
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import scheduler
+from scheduler import ServerScheduler
+
+
+def _patch(monkeypatch, tags, ps):
+    monkeypatch.setattr(scheduler, 'get_models_for_server', lambda host: tags.get(host, []))
+    monkeypatch.setattr(scheduler, 'get_running_models', lambda host: ps.get(host, []))
+
+
+def test_pick_prefers_resident_then_least_loaded(monkeypatch):
+    servers = {'myplex': 'http://myplex', 'gamer': 'http://gamer', 'netty': 'http://netty'}
+    tags = {'http://myplex': ['llama3.2'], 'http://gamer': ['llama3.2', 'qwen3'], 'http://netty': ['llama3.2']}
+    ps = {'http://gamer': ['qwen3'], 'http://netty': ['llama3.2']}
+    _patch(monkeypatch, tags, ps)
+    s = ServerScheduler(servers)
+    s.refresh()
+
+    # resident model wins even over the configured host
+    assert s.pick('llama3.2', 'http://gamer') == 'http://netty'
+    # residency outranks load
+    with s.track('http://netty'):
+        assert s.pick('llama3.2', 'http://gamer') == 'http://netty'
+    # nothing resident: fewest in flight, ties to the configured host
+    ps.clear()
+    s.refresh()
+    assert s.pick('llama3.2', 'http://gamer') == 'http://gamer'
+    with s.track('http://gamer'):
+        assert s.pick('llama3.2', 'http://gamer') in ('http://myplex', 'http://netty')
+    assert s.in_flight('http://gamer') == 0
+
+
+def test_pick_falls_back_to_configured_host(monkeypatch):
+    _patch(monkeypatch, {}, {})
+    s = ServerScheduler({'myplex': 'http://myplex'})
+    assert s.pick('unknown-model', 'http://configured') == 'http://configured'
+    assert s.pick(None, 'http://configured') == 'http://configured'
+
+
+def test_pick_never_waits_for_a_probe(monkeypatch):
+    release = threading.Event()
+
+    def slow_ps(host):
+        release.wait(2)
+        return ['llama3.2']
+
+    monkeypatch.setattr(scheduler, 'get_models_for_server', lambda host: ['llama3.2'])
+    monkeypatch.setattr(scheduler, 'get_running_models', slow_ps)
+    s = ServerScheduler({'myplex': 'http://myplex', 'gamer': 'http://gamer'}, ps_ttl=60)
+
+    start = time.monotonic()
+    # cold: nothing probed yet, so the configured host is used at once
+    assert s.pick('llama3.2', 'http://gamer') == 'http://gamer'
+    # /api/tags has landed, /api/ps is still hanging: still no wait
+    deadline = time.monotonic() + 2
+    while not s.candidates('llama3.2') and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert s.pick('llama3.2', 'http://gamer') == 'http://gamer'
+    assert time.monotonic() - start < 0.5
+
+    release.set()
+    deadline = time.monotonic() + 2
+    while not s.resident_models('http://myplex') and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with s.track('http://gamer'):
+        assert s.pick('llama3.2', 'http://gamer') == 'http://myplex'
@@ -0,0 +1,110 @@
+import json
+import re
+import zlib
+
+import numpy as np
+
+import transport
+from agents import Agent
+from orchestrator import MultiAgentOrchestrator
+from response_cache import ResponseCache
+from semantic_cache import SemanticCache
+
+
+class BagOfWordsEmbedder:
+    """Deterministic stand-in for the sentence-transformers model."""
+
+    dim = 64
+
+    def encode(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype='float32')
+        for i, text in enumerate(texts):
+            for word in re.findall(r'[a-z]+', text.lower()):
+                out[i, zlib.crc32(word.encode()) % self.dim] += 1.0
+            norm = np.linalg.norm(out[i])
+            if norm:
+                out[i] /= norm
+        return out
+
+
+def test_lookup_threshold_and_per_agent_indexes():
+    cache = SemanticCache(threshold=0.8, embedder=BagOfWordsEmbedder())
+    cache.add('X', 'what is the capital of france', 'Paris', latency_s=2.0)
+    cache.add('X', 'bad', '(Request error for X: boom)')
+
+    assert cache.lookup('X', 'What is the capital of France?') == 'Paris'
+    assert cache.lookup('X', 'how do rockets work') is None
+    assert cache.lookup('Y', 'what is the capital of france') is None
+
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 2
+    assert stats['saved_latency_s'] == 2.0
+
+
+def test_a_chat_embeds_the_question_once_for_all_agents():
+    class CountingEmbedder(BagOfWordsEmbedder):
+        calls = 0
+
+        def encode(self, texts):
+            CountingEmbedder.calls += 1
+            return super().encode(texts)
+
+    cache = SemanticCache(threshold=0.8, embedder=CountingEmbedder())
+    for agent in ('X', 'Y', 'Z'):
+        cache.add(agent, 'what is the capital of france', 'Paris')
+    CountingEmbedder.calls = 0
+    for agent in ('X', 'Y', 'Z'):
+        assert cache.lookup(agent, 'how do rockets work') is None
+        cache.add(agent, 'how do rockets work', 'thrust')
+    assert CountingEmbedder.calls == 1
+
+
+def test_eviction_keeps_newest_entries():
+    cache = SemanticCache(threshold=0.99, max_entries_per_agent=4, embedder=BagOfWordsEmbedder())
+    for i, word in enumerate(['alpha', 'bravo', 'charlie', 'delta', 'echo']):
+        cache.add('X', word, f'answer {i}')
+    assert cache.lookup('X', 'alpha') is None
+    assert cache.lookup('X', 'echo') == 'answer 4'
+
+
+class DummyResp:
+    status_code = 200
+
+    def json(self):
+        return {'response': 'fresh reply'}
+
+
+def test_chat_reuses_answer_for_paraphrased_question(monkeypatch):
+    orch = MultiAgentOrchestrator()
+    orch.response_cache = ResponseCache()
+    orch.use_semantic_cache = True
+    orch.semantic_cache = SemanticCache(threshold=0.8, embedder=BagOfWordsEmbedder())
+    orch.agents = {'X': Agent('X', 'http://x', 'm', '')}
+    calls = []
+
+    def fake_post(url, json=None, timeout=30):
+        calls.append(url)
+        return DummyResp()
+
+    monkeypatch.setattr(transport, 'post', fake_post)
+
+    assert orch.chat('X: what is the capital of france')['X'] == 'fresh reply'
+    assert orch.chat('X: What is the capital of France?')['X'] == 'fresh reply'
+    assert len(calls) == 1
+    assert orch.semantic_cache.stats()['hits'] == 1
+
+    orch.chat('X: What is the capital of France?', use_cache=False)
+    assert len(calls) == 2
+
+
+def test_semantic_cache_settings_survive_save_config(tmp_path):
+    path = str(tmp_path / 'agents_config.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'agents': [], 'semantic_cache': {'enabled': True, 'threshold': 0.8}}, f)
+    orch = MultiAgentOrchestrator()
+    orch.load_config(path)
+    orch.save_config(path)
+
+    again = MultiAgentOrchestrator()
+    again.load_config(path)
+    assert again.use_semantic_cache is True and again.semantic_cache.threshold == 0.8
@@ -0,0 +1,64 @@
+
+from memory import MemoryDB, MemorySnapshot, RecentQABuffer
+from prompt_builder import PromptBuilder
+from semantic_memory import SemanticMemoryIndex
+from test_semantic_cache import BagOfWordsEmbedder
+
+
+def _index(**kwargs):
+    return SemanticMemoryIndex(embedder=BagOfWordsEmbedder(), **kwargs)
+
+
+def test_search_prefers_relevant_memories_and_drops_unrelated():
+    idx = _index()
+    idx.add_many([
+        ('X', 'what is the capital of france', 'Paris is the capital', 1),
+        ('X', 'favourite colour', 'blue', 2),
+        ('X', 'broken', '(Request error for X: boom)', 3),
+        ('X', 'how tall is the eiffel tower', 'about 330 metres', 4),
+    ])
+    idx.flush()
+
+    hits = idx.search('X', 'capital of france?', limit=3)
+    assert hits[0]['a'] == 'Paris is the capital'
+    assert all(h['a'] != 'blue' for h in hits)
+    assert idx.search('Y', 'capital of france?') is None
+    assert idx.stats()['memories'] == 3
+
+
+def test_recency_breaks_ties_between_similar_memories():
+    idx = _index(recency_weight=0.5, half_life=1)
+    idx.add_many([('X', 'weather today', 'old answer', 1), ('X', 'weather today', 'new answer', 2)])
+    idx.flush()
+    assert [h['a'] for h in idx.search('X', 'weather today', limit=2)] == ['new answer', 'old answer']
+
+
+def test_prompt_builder_injects_relevant_memories_via_snapshot():
+    idx = _index()
+    idx.add_many([
+        ('X', 'what is the capital of france', 'Paris', 1),
+        ('X', 'favourite colour', 'blue', 2),
+    ])
+    idx.flush()
+    snap = MemorySnapshot({'X': [{'q': 'favourite colour', 'a': 'blue', 'ts': 2}]}, semantic=idx)
+    prompt = PromptBuilder.build_prompt('capital of france', 'X', None, snap, True, False, 'X')
+    assert 'Paris' in prompt and 'blue' not in prompt
+
+    # without a semantic index the most recent memories are used
+    prompt = PromptBuilder.build_prompt('capital of france', 'X', None, MemorySnapshot(snap.rows), True, False, 'X')
+    assert 'blue' in prompt
+
+
+def test_save_qa_embeds_new_rows():
+    db = MemoryDB.__new__(MemoryDB)
+    db.hot = RecentQABuffer(0)
+    db.writer = None
+    db.semantic = _index()
+    db.keyword = None
+    db.summaries = {}
+    db._try_execute = lambda *a, **k: True
+    db.save_qa('X', 'what is the capital of france', 'Paris')
+    db.semantic.flush()
+    assert db.relevant_qa('X', 'capital of france')[0]['a'] == 'Paris'
+    db.clear_memory('X')
+    assert db.relevant_qa('X', 'capital of france') is None
@@ -0,0 +1,55 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import transport
+from orchestrator import MultiAgentOrchestrator
+from transport import HttpTransport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"models": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_transport_reuses_keepalive_connections():
+    server = HTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    t = HttpTransport(pool_connections=1, pool_maxsize=2)
+    try:
+        for _ in range(5):
+            assert t.get(f"{url}/api/tags", timeout=2).status_code == 200
+        stats = t.stats()[url]
+        assert stats["requests"] == 5
+        assert stats["connections"] == 1
+        assert stats["reused"] == 4
+        # one session per host
+        assert t.session_for(f"{url}/api/generate") is t.session_for(f"{url}/api/tags")
+    finally:
+        t.close()
+        server.shutdown()
+
+
+def test_http_pool_sizing_survives_save_config(tmp_path):
+    path = str(tmp_path / "agents_config.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"agents": [], "http": {"pool_connections": 2, "pool_maxsize": 3}}, f)
+    orch = MultiAgentOrchestrator()
+    orch.load_config(path)
+    orch.save_config(path)
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f)["http"] == {"pool_connections": 2, "pool_maxsize": 3}
+    assert transport.get_transport().pool_maxsize == 3
+    transport.configure()
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from memory import MemoryDB, RecentQABuffer
+from write_behind import WriteBehindQueue
+
+
+def test_batches_by_size_and_interval():
+    batches = []
+    wb = WriteBehindQueue(batches.append, batch_size=3, flush_interval_ms=50)
+    for i in range(7):
+        wb.submit((i,))
+    assert wb.flush(timeout=2)
+    assert [len(b) for b in batches][:2] == [3, 3]
+    assert sum(len(b) for b in batches) == 7
+    wb.close()
+    assert wb.stats()['written'] == 7
+
+
+def test_close_flushes_pending_rows():
+    batches = []
+    wb = WriteBehindQueue(batches.append, batch_size=100, flush_interval_ms=10_000)
+    wb.submit(('a',))
+    wb.submit(('b',))
+    wb.close()
+    assert [r for b in batches for r in b] == [('a',), ('b',)]
+    # after close rows are written synchronously
+    wb.submit(('c',))
+    assert batches[-1] == [('c',)]
+
+
+def test_rows_are_counted_before_the_flusher_sees_them():
+    wb = WriteBehindQueue(lambda rows: None, batch_size=1, flush_interval_ms=0)
+    put = wb._queue.put
+    seen = []
+
+    def put_then_wait_for_the_flusher(item, *args, **kwargs):
+        put(item, *args, **kwargs)
+        deadline = time.monotonic() + 2
+        while wb.stats()['written'] < 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        seen.append((wb.queued, wb._settled))
+
+    wb._queue.put = put_then_wait_for_the_flusher
+    assert wb.submit(('a',))
+    # the row was written while submit was still running; it must already be counted
+    assert seen == [(1, 1)]
+    del wb._queue.put
+    wb.submit(('b',))
+    assert wb.flush(timeout=2) and wb.stats()['written'] == 2
+    wb.close()
+
+
+def test_backpressure_policies():
+    gate = threading.Event()
+    written = []
+
+    def slow_flush(rows):
+        gate.wait(2)
+        written.extend(rows)
+
+    wb = WriteBehindQueue(slow_flush, max_queue=1, batch_size=1, flush_interval_ms=0, on_full='drop')
+    for i in range(5):
+        wb.submit((i,))
+        time.sleep(0.01)
+    assert wb.stats()['dropped'] >= 1
+    gate.set()
+    wb.close()
+
+    gate.clear()
+    wb = WriteBehindQueue(slow_flush, max_queue=1, batch_size=1, flush_interval_ms=0, on_full='sync')
+    threading.Timer(0.2, gate.set).start()
+    for i in range(3):
+        wb.submit((i,))
+    wb.close()
+    assert wb.stats()['sync_writes'] >= 1
+    assert wb.stats()['dropped'] == 0
+
+
+def test_save_qa_goes_through_the_queue():
+    db = MemoryDB.__new__(MemoryDB)
+    db.hot = RecentQABuffer(0)
+    db.writer = None
+    db.semantic = None
+    db.keyword = None
+    db.summaries = {}
+    flushed = []
+    db._insert_qa_rows = flushed.extend
+    db._try_execute = lambda *a, **k: (_ for _ in ()).throw(AssertionError('synchronous insert'))
+
+    db.enable_write_behind(batch_size=10, flush_interval_ms=20)
+    db.save_qa('Netty', 'q', 'a', conv_id='c1')
+    db.flush()
+    assert flushed == [('Netty', 'Q: q A: a', 'q', 'a', 'c1')]
+    db.disable_write_behind()
+    assert db.writer is None
@@ -0,0 +1,150 @@
+"""Pooled keep-alive HTTP transport shared by every backend call.
+
+All traffic to the Ollama servers (`/api/generate`, `/api/tags`, health
+probes) goes through this module instead of module-level `requests.post` /
+`requests.get`, so each backend host gets one `requests.Session` whose
+connection pool is reused across calls (no new TCP handshake or DNS lookup per
+request).
+
+Pool sizes come from `HTTP_POOL_CONNECTIONS` / `HTTP_POOL_MAXSIZE` or
+`configure(...)`. `stats()` reports per-host request and connection counts so
+connection reuse can be confirmed.
+
+Tests and offline scripts patch `transport.post` / `transport.get`.
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+class HttpTransport:
+    """One pooled `requests.Session` per backend host (scheme://host:port)."""
+
+    def __init__(self, pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None):
+        self.pool_connections = pool_connections or _env_int("HTTP_POOL_CONNECTIONS", 4)
+        self.pool_maxsize = pool_maxsize or _env_int("HTTP_POOL_MAXSIZE", 8)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def session_for(self, url: str) -> requests.Session:
+        key = self.host_key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[key] = session
+            self._requests[key] = self._requests.get(key, 0) + 1
+        return session
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.session_for(url).post(url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.session_for(url).get(url, **kwargs)
+
+    def async_client(self, **kwargs):
+        """Return a new `httpx.AsyncClient` sized like the sync pools.
+
+        Async services should create one and pass it to every `achat` call so
+        keep-alive connections are shared across conversations.
+        """
+        import httpx
+
+        size = self.pool_connections * self.pool_maxsize
+        kwargs.setdefault("limits", httpx.Limits(max_connections=size, max_keepalive_connections=size))
+        return httpx.AsyncClient(**kwargs)
+
+    def stats(self) -> Dict[str, dict]:
+        """Return {host: {'requests', 'connections', 'reused'}} for every host seen.
+
+        `connections` counts TCP connections urllib3 actually opened; the
+        difference to `requests` is the number of calls that reused a
+        keep-alive connection.
+        """
+        out: Dict[str, dict] = {}
+        with self._lock:
+            items = list(self._sessions.items())
+            counts = dict(self._requests)
+        for key, session in items:
+            connections = 0
+            try:
+                pools = session.get_adapter(key).poolmanager.pools
+                for pool_key in list(pools.keys()):
+                    pool = pools.get(pool_key)
+                    connections += getattr(pool, "num_connections", 0) if pool is not None else 0
+            except Exception:
+                pass
+            total = counts.get(key, 0)
+            out[key] = {"requests": total, "connections": connections, "reused": max(0, total - connections)}
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions = {}
+            self._requests = {}
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                pass
+
+
+_default: Optional[HttpTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HttpTransport()
+        return _default
+
+
+def configure(pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None) -> HttpTransport:
+    """Replace the shared transport with one using the given pool sizes."""
+    global _default
+    with _default_lock:
+        old = _default
+        _default = HttpTransport(pool_connections, pool_maxsize)
+    if old is not None:
+        old.close()
+    return _default
+
+
+def post(url: str, **kwargs):
+    return get_transport().post(url, **kwargs)
+
+
+def get(url: str, **kwargs):
+    return get_transport().get(url, **kwargs)
+
+
+def async_client(**kwargs):
+    return get_transport().async_client(**kwargs)
+
+
+def stats() -> Dict[str, dict]:
+    return get_transport().stats()
@@ -0,0 +1,172 @@
+"""Write-behind queue for MemoryDB inserts.
+
+Rows are put on a bounded queue and a daemon thread hands them to
+`flush_fn(rows)` in batches: whenever `batch_size` rows are waiting or
+`flush_interval_ms` has passed since the first queued row. `flush_fn` is
+expected to write the whole batch in one transaction (see
+`MemoryDB._insert_qa_rows`).
+
+When the queue is full the `on_full` policy decides what `submit` does:
+
+- ``"block"``: wait up to `block_timeout_s` for space, then write the row
+  synchronously so it is never lost (default);
+- ``"sync"``: write the row synchronously straight away;
+- ``"drop"``: discard the row and count it in `stats()["dropped"]`.
+
+`close()` drains the queue and stops the thread; it is registered with
+`atexit` so queued rows are flushed on interpreter shutdown.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+ON_FULL_POLICIES = ("block", "sync", "drop")
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    def __init__(self,
+                 flush_fn: Callable[[List[tuple]], None],
+                 max_queue: int = 1000,
+                 batch_size: int = 50,
+                 flush_interval_ms: float = 200.0,
+                 on_full: str = "block",
+                 block_timeout_s: float = 2.0):
+        if on_full not in ON_FULL_POLICIES:
+            raise ValueError(f"on_full must be one of {ON_FULL_POLICIES}, got {on_full!r}")
+        self.flush_fn = flush_fn
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = max(0.0, flush_interval_ms) / 1000.0
+        self.on_full = on_full
+        self.block_timeout_s = block_timeout_s
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max(1, max_queue))
+        self._closed = False
+        self._lock = threading.Lock()
+        self.queued = 0
+        self._settled = 0  # queued rows that were written or failed
+        self.written = 0
+        self.batches = 0
+        self.sync_writes = 0
+        self.dropped = 0
+        self.failed = 0
+        self.logger = logging.getLogger(__name__)
+        self._thread = threading.Thread(target=self._run, name="memory-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, row: tuple) -> bool:
+        """Queue `row` (or write it, see `on_full`). Returns False if it was dropped or its synchronous write failed."""
+        if self._closed:
+            return self._write([row], sync=True)
+        # count the row before the flusher can see it, or flush() may find settled > queued
+        with self._lock:
+            self.queued += 1
+        try:
+            if self.on_full == "block":
+                self._queue.put(row, timeout=self.block_timeout_s)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.queued -= 1
+            if self.on_full == "drop":
+                with self._lock:
+                    self.dropped += 1
+                self.logger.warning("[MemoryDB] write-behind queue full, dropping row")
+                return False
+            return self._write([row], sync=True)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval_s
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, rows: List[tuple], sync: bool = False) -> bool:
+        try:
+            self.flush_fn(rows)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(rows)
+                if not sync:
+                    self._settled += len(rows)
+            self.logger.warning(f"[MemoryDB] write-behind flush of {len(rows)} rows failed: {e}")
+            return False
+        with self._lock:
+            self.written += len(rows)
+            if sync:
+                self.sync_writes += len(rows)
+            else:
+                self._settled += len(rows)
+                self.batches += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Wait until every row queued so far has been written. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                settled = self._settled >= self.queued
+            if settled:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Flush queued rows and stop the background thread (idempotent)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        # rows that raced with close() land behind the stop marker
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._write(leftovers)
+        try:
+            atexit.unregister(self.close)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "pending": self._queue.qsize(),
+                "written": self.written,
+                "batches": self.batches,
+                "sync_writes": self.sync_writes,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }